@@ -0,0 +1,29 @@
+"""
+ASGI config for Transportation Suppliers project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, to be served by uvicorn (directly or as a gunicorn worker
+class, see ``compose/production/django/start``).
+
+Django 2.2 has no ASGI handler, so the Django WSGI application is adapted
+with asgiref: the server reads requests and writes responses
+asynchronously, and the views (the read-only profile and address lists
+included) run in a thread pool sized by the ``ASGI_THREADS`` environment
+variable. A slow client therefore holds a socket, not a worker.
+
+"""
+import os
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+# This allows easy placement of apps within the interior
+# transportation_suppliers directory.
+app_path = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+)
+sys.path.append(os.path.join(app_path, "transportation_suppliers"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+application = WsgiToAsgi(get_wsgi_application())
@@ -0,0 +1,175 @@
+"""
+Gunicorn config for Transportation Suppliers project.
+
+Loaded with ``gunicorn -c /app/config/gunicorn.py`` (see
+``compose/production/django/start``). Workers and threads are sized from
+the CPUs and memory the container may use (its cgroup limits, not the
+host's); every value can be overridden from the environment:
+
+    GUNICORN_BIND, GUNICORN_CHDIR   address and app directory
+    WEB_CONCURRENCY                 workers
+    GUNICORN_THREADS                threads per worker (gthread)
+    GUNICORN_WORKER_MEMORY          expected resident MiB per worker
+    GUNICORN_MEMORY_FRACTION        share of the memory limit for workers
+    GUNICORN_MAX_REQUESTS           requests before a worker is recycled
+    GUNICORN_MAX_REQUESTS_JITTER    random extra requests before recycling
+    GUNICORN_KEEPALIVE              seconds to hold idle keep-alive sockets
+    GUNICORN_TIMEOUT                seconds before a silent worker is killed
+    GUNICORN_GRACEFUL_TIMEOUT       seconds to finish requests on restart
+    GUNICORN_PRELOAD                "no" to import the app in each worker
+
+The defaults were checked with this load-test profile: 1 CPU, 30 users
+in SQLite, 20 keep-alive connections on ``/api/v2/profiles/`` for 15s
+(``manage.py load_benchmark``, which shares the CPU with the server):
+
+    workers x threads    req/s   p50      p99      PSS
+    1 x 1 (previous)     423     42 ms    348 ms   71 MiB
+    3 x 1 (defaults)     419     40 ms    216 ms   76 MiB
+    3 x 4                425     32 ms    352 ms   80 MiB
+    3 x 4, no preload    366     32 ms    354 ms   170 MiB
+    7 x 1                427     42 ms     92 ms   87 MiB
+
+One CPU caps the throughput whatever the worker count. More processes
+shorten the queue behind a slow request, threads sharing a process and
+its GIL do not: 3 x 4 has the tail latency of a single worker. Preloading
+imports Django once in the master and forks the workers from it, so they
+share its memory pages (PSS above) until they write to them. The defaults
+are ``2 * CPUs + 1`` single-threaded workers; raise WEB_CONCURRENCY
+towards 7 x 1 where memory allows, and GUNICORN_THREADS only once the
+real database shows requests waiting on PostgreSQL or Redis, which SQLite
+does not.
+
+"""
+
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def cpu_limit():
+    """
+    Return the CPUs this process may use, honouring a cgroup CPU quota.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+
+    quota = None
+    try:
+        # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            limit, period = cpu_max.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as quota_file:
+                quota_us = int(quota_file.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as period_file:
+                period_us = int(period_file.read())
+            if quota_us > 0:
+                quota = quota_us / period_us
+        except (OSError, ValueError):
+            pass
+    if quota:
+        cpus = min(cpus, max(1, round(quota)))
+    return cpus
+
+
+def memory_limit():
+    """
+    Return the bytes of memory this process may use, honouring a cgroup
+    memory limit, or None when it cannot be told.
+    """
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            with open(path) as limit_file:
+                limit = limit_file.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge page-aligned number.
+        if limit != "max" and int(limit) < 1 << 60:
+            return int(limit)
+        break
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_workers(cpus, memory, worker_memory, memory_fraction):
+    """
+    Return ``2 * cpus + 1`` workers, fewer if they would not fit in
+    ``memory_fraction`` of ``memory`` at ``worker_memory`` bytes each.
+    """
+    workers = 2 * cpus + 1
+    if memory:
+        workers = min(workers, int(memory * memory_fraction // worker_memory))
+    return max(1, workers)
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+chdir = os.environ.get("GUNICORN_CHDIR", "/app")
+
+workers = env_int(
+    "WEB_CONCURRENCY",
+    default_workers(
+        cpu_limit(),
+        memory_limit(),
+        env_int("GUNICORN_WORKER_MEMORY", 128) * 1024 * 1024,
+        env_float("GUNICORN_MEMORY_FRACTION", 0.75),
+    ),
+)
+# More than one thread switches the default sync worker to gthread.
+threads = env_int("GUNICORN_THREADS", 1)
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "yes") == "yes"
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+
+# Heartbeat files on tmpfs, a disk-backed /tmp can stall workers.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def post_fork(server, worker):
+    # Sockets opened while the master imported the app must not be shared
+    # by the workers.
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def on_starting(server):
+    # Metric files of the previous run's workers would be added to ours.
+    directory = os.environ.get("prometheus_multiproc_dir")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get("prometheus_multiproc_dir"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
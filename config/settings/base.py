@@ -43,6 +43,38 @@ LOCALE_PATHS = [ROOT_DIR.path("locale")]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Read replicas of the default database, as a comma separated list of URLs.
+# Views with `ReplicaReadsMixin` read from them, see
+# transportation_suppliers.users.routers.
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    DATABASE_REPLICAS.append(f"replica{index + 1}")
+    DATABASES[DATABASE_REPLICAS[-1]] = dict(
+        env.db_url_config(url), TEST={"MIRROR": "default"}
+    )
+# Whether the databases are reached through PgBouncer in transaction mode.
+DATABASE_PGBOUNCER = env.bool("DJANGO_DATABASE_PGBOUNCER", False)
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["transportation_suppliers.users.routers.ReplicaRouter"]
+# Queries of a request making its view's `query_budgets` fail instead of
+# logging a warning, see QueryBudgetMiddleware.
+QUERY_BUDGETS_STRICT = env.bool("DJANGO_QUERY_BUDGETS_STRICT", False)
+# Runs of one query shape in a request reported as an N+1 query.
+QUERY_N_PLUS_ONE_THRESHOLD = env.int("DJANGO_QUERY_N_PLUS_ONE_THRESHOLD", 3)
+# Milliseconds from which SlowQueryMiddleware logs a query, 0 for never.
+SLOW_QUERY_THRESHOLD_MS = env.int("DJANGO_SLOW_QUERY_THRESHOLD_MS", 200)
+# Fraction of the slow SELECTs run again under EXPLAIN (ANALYZE, BUFFERS).
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = env.float(
+    "DJANGO_SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.0
+)
+# Statement timeout of those EXPLAINs, in milliseconds.
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = env.int(
+    "DJANGO_SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 5000
+)
+# Seconds a client's reads stay on the primary after it wrote.
+DATABASE_REPLICA_STICKY_SECONDS = env.int(
+    "DJANGO_DATABASE_REPLICA_STICKY_SECONDS", 10
+)
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -106,11 +138,21 @@ LOGIN_URL = "account_login"
 # https://docs.djangoproject.com/en/dev/ref/settings/#password-hashers
 PASSWORD_HASHERS = [
     # https://docs.djangoproject.com/en/dev/topics/auth/passwords/#using-argon2-with-django
-    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "transportation_suppliers.users.hashers.PooledArgon2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
     "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
 ]
+# Argon2 costs, see `transportation_suppliers.users.hashers.ARGON2_PROFILES`.
+# The explicit costs (e.g. from `manage.py calibrate_argon2`) override the
+# profile's.
+ARGON2_PROFILE = env("DJANGO_ARGON2_PROFILE", default="django")
+ARGON2_TIME_COST = env.int("DJANGO_ARGON2_TIME_COST", default=None)
+ARGON2_MEMORY_COST = env.int("DJANGO_ARGON2_MEMORY_COST", default=None)
+ARGON2_PARALLELISM = env.int("DJANGO_ARGON2_PARALLELISM", default=None)
+# Processes hashing passwords in each server process, 0 hashes in the
+# requests' threads.
+PASSWORD_HASHING_WORKERS = env.int("DJANGO_PASSWORD_HASHING_WORKERS", 0)
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,7 +171,11 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "transportation_suppliers.users.middleware.MetricsMiddleware",
+    "transportation_suppliers.users.middleware.ProfilingMiddleware",
+    "transportation_suppliers.users.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "transportation_suppliers.users.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -159,6 +205,10 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR("media"))
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# Longest side in pixels of the WebP and JPEG renditions of avatars, by name.
+AVATAR_RENDITION_SIZES = {"small": 64, "medium": 256, "large": 1024}
+# Quality of the avatar renditions, from 1 to 100.
+AVATAR_RENDITION_QUALITY = env.int("DJANGO_AVATAR_RENDITION_QUALITY", 80)
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -287,11 +337,13 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "transportation_suppliers.users.api.authentication."
+        "ExpiringTokenAuthentication",
+        "transportation_suppliers.users.api.authentication."
+        "CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.URLPathVersioning",
-    "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
 }
 
 # Django Organizations
@@ -300,3 +352,46 @@ ORGS_SLUGFIELD = "django_extensions.db.fields.AutoSlugField"
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# API versions whose list endpoints default to keyset (cursor) pagination.
+# Any version can still opt in per request with `?pagination=keyset`.
+API_KEYSET_PAGINATION_VERSIONS = env.list(
+    "DJANGO_API_KEYSET_PAGINATION_VERSIONS", default=[]
+)
+# Seconds a cached list total is trusted before it is recounted.
+API_COUNT_CACHE_TIMEOUT = env.int("DJANGO_API_COUNT_CACHE_TIMEOUT", 60 * 60)
+# Tables with more rows than this are counted from planner estimates.
+API_COUNT_ESTIMATE_THRESHOLD = env.int(
+    "DJANGO_API_COUNT_ESTIMATE_THRESHOLD", 100000
+)
+# Seconds rendered profile responses are cached for, 0 disables the cache.
+API_RESPONSE_CACHE_TIMEOUT = env.int("DJANGO_API_RESPONSE_CACHE_TIMEOUT", 300)
+# Largest list accepted by the bulk address endpoints.
+API_BULK_MAX_ITEMS = env.int("DJANGO_API_BULK_MAX_ITEMS", 5000)
+# Render profile lists from `.values()` rows instead of model instances.
+API_COMPILED_SERIALIZERS = env.bool("DJANGO_API_COMPILED_SERIALIZERS", True)
+# Seconds an API token and its user are cached for, 0 disables the cache.
+API_TOKEN_CACHE_TIMEOUT = env.int("DJANGO_API_TOKEN_CACHE_TIMEOUT", 300)
+# Seconds the tokens handed out by `api/token/` are valid for.
+API_TOKEN_LIFETIME = env.int("DJANGO_API_TOKEN_LIFETIME", 30 * 24 * 60 * 60)
+# Seconds each process trusts the outcome of an API token lookup for.
+API_TOKEN_LOCAL_CACHE_TIMEOUT = env.int(
+    "DJANGO_API_TOKEN_LOCAL_CACHE_TIMEOUT", 60
+)
+# Largest number of token lookups each process keeps.
+API_TOKEN_LOCAL_CACHE_SIZE = env.int(
+    "DJANGO_API_TOKEN_LOCAL_CACHE_SIZE", 10000
+)
+# Fraction of requests profiled by ProfilingMiddleware. Requests with a
+# signed X-Profile header (see `manage.py sign_profile_request`) always are.
+PROFILING_SAMPLE_RATE = env.float("DJANGO_PROFILING_SAMPLE_RATE", 0.0)
+# Seconds between two stack samples of a profiled request.
+PROFILING_INTERVAL = env.float("DJANGO_PROFILING_INTERVAL", 0.005)
+# Directory of the collapsed stacks and summaries of profiled requests.
+PROFILING_DIR = env("DJANGO_PROFILING_DIR", default="/tmp/profiles")
+# Profiles kept in `PROFILING_DIR`, older ones are deleted.
+PROFILING_MAX_PROFILES = env.int("DJANGO_PROFILING_MAX_PROFILES", 1000)
+# Seconds a signed X-Profile header is accepted for.
+PROFILING_HEADER_MAX_AGE = env.int("DJANGO_PROFILING_HEADER_MAX_AGE", 60 * 60)
+# Bearer token Prometheus must send to scrape `metrics/`, empty for none
+# (required by the production settings).
+METRICS_BEARER_TOKEN = env("DJANGO_METRICS_BEARER_TOKEN", default="")
@@ -1,3 +1,5 @@
+from django.core.exceptions import ImproperlyConfigured
+
 from config.settings.base import *  # noqa
 from config.settings.base import env
 
@@ -12,9 +14,18 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["example.com"])
 # ------------------------------------------------------------------------------
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
 DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
-DATABASES["default"]["CONN_MAX_AGE"] = env.int(
-    "CONN_MAX_AGE", default=60
-)  # noqa F405
+for alias in ["default", *DATABASE_REPLICAS]:  # noqa F405
+    DATABASES[alias].update(  # noqa F405
+        # Ping reused connections once per request, see
+        # transportation_suppliers.db.health.
+        ENGINE="transportation_suppliers.db.postgresql",
+        CONN_MAX_AGE=env.int("CONN_MAX_AGE", default=60),
+        CONN_HEALTH_CHECKS=env.bool("CONN_HEALTH_CHECKS", default=True),
+    )
+    if DATABASE_PGBOUNCER:  # noqa F405
+        # Transaction pooling hands every transaction to any server
+        # connection, a cursor cannot outlive its transaction there.
+        DATABASES[alias]["DISABLE_SERVER_SIDE_CURSORS"] = True  # noqa F405
 
 # CACHES
 # ------------------------------------------------------------------------------
@@ -55,6 +66,10 @@ SECURE_HSTS_PRELOAD = env.bool("DJANGO_SECURE_HSTS_PRELOAD", default=True)
 SECURE_CONTENT_TYPE_NOSNIFF = env.bool(
     "DJANGO_SECURE_CONTENT_TYPE_NOSNIFF", default=True
 )
+# `metrics/` is served on the public URLconf, refuse to start without a token.
+METRICS_BEARER_TOKEN = env("DJANGO_METRICS_BEARER_TOKEN")
+if not METRICS_BEARER_TOKEN:
+    raise ImproperlyConfigured("DJANGO_METRICS_BEARER_TOKEN must not be empty")
 
 # STORAGES
 # ------------------------------------------------------------------------------
@@ -212,6 +227,11 @@ LOGGING = {
             "handlers": ["mail_admins", "file"],
             "propagate": True,
         },
+        "transportation_suppliers.db.slow_queries": {
+            "level": "WARNING",
+            "handlers": ["console"],
+            "propagate": False,
+        },
         "django.security.DisallowedHost": {
             "level": "ERROR",
             "handlers": ["file_spam"],
@@ -51,3 +51,7 @@ EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+MIDDLEWARE = [  # noqa F405
+    "transportation_suppliers.users.middleware.QueryBudgetMiddleware"
+] + MIDDLEWARE  # noqa F405
+QUERY_BUDGETS_STRICT = True
@@ -6,16 +6,22 @@ from django.shortcuts import redirect
 from django.views.generic import TemplateView
 from django.views import defaults as default_views
 
-from rest_framework.authtoken import views
 from rest_framework.schemas import get_schema_view
 
 from organizations.backends import invitation_backend
 
+from transportation_suppliers.users.api.views import ObtainApiTokenView
+from transportation_suppliers.users.transactions import atomic_writes
+from transportation_suppliers.users.views import metrics_view
+
 
 API_PREFIX = "(?P<version>(v1|v2))"
 
 urlpatterns = [
-    path("", lambda request: redirect("api/v1/", permanent=False)),
+    path(
+        "",
+        atomic_writes(lambda request: redirect("api/v1/", permanent=False)),
+    ),
     # Django Admin, use {% url 'admin:index' %}
     path(settings.ADMIN_URL, admin.site.urls),
     # User management
@@ -27,31 +33,39 @@ urlpatterns = [
     # Django Rest Framework URLs
     path(
         "api/openapi/",
-        get_schema_view(
-            title="Transport Suppliers API",
-            description="Transport Suppliers API",
-            # urlconf='transportation_suppliers.users.api.urls'
+        atomic_writes(
+            get_schema_view(
+                title="Transport Suppliers API",
+                description="Transport Suppliers API",
+                # urlconf='transportation_suppliers.users.api.urls'
+            )
         ),
         name="openapi-schema",
     ),
     path(
         "api/schema/",
-        TemplateView.as_view(
-            template_name="swagger_ui.html",
-            extra_context={"schema_url": "openapi-schema"},
+        atomic_writes(
+            TemplateView.as_view(
+                template_name="swagger_ui.html",
+                extra_context={"schema_url": "openapi-schema"},
+            )
         ),
         name="swagger-ui",
     ),
     path(
         "api/redoc/",
-        TemplateView.as_view(
-            template_name="redoc.html",
-            extra_context={"schema_url": "openapi-schema"},
+        atomic_writes(
+            TemplateView.as_view(
+                template_name="redoc.html",
+                extra_context={"schema_url": "openapi-schema"},
+            )
         ),
         name="redoc",
     ),
     path("api/auth/", include("rest_framework.urls")),
-    path("api/token/", views.obtain_auth_token),
+    path("api/token/", ObtainApiTokenView.as_view()),
+    # Prometheus scrape endpoint
+    path("metrics/", metrics_view, name="metrics"),
     # Django organizations
     path("invitations/", include(invitation_backend().get_urls())),
     path("organization/", include("organizations.urls")),
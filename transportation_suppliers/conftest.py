@@ -1,7 +1,11 @@
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from django.test import RequestFactory
 
+from transportation_suppliers.users.api.authentication import (
+    verified_api_tokens,
+)
 from transportation_suppliers.users.tests.factories import UserFactory
 
 
@@ -10,6 +14,18 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached counts, responses and tokens must not leak between tests, the
+    # database rollback does not fire the signals that would keep them
+    # current.
+    cache.clear()
+    verified_api_tokens.clear()
+    yield
+    cache.clear()
+    verified_api_tokens.clear()
+
+
 @pytest.fixture
 def user() -> settings.AUTH_USER_MODEL:
     return UserFactory()
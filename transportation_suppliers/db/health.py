@@ -0,0 +1,95 @@
+"""
+Health-checked persistent database connections.
+
+Django 2.2 reuses a connection kept open by `CONN_MAX_AGE` without
+checking it first, so the first query of a request fails when the server
+(or PgBouncer) has dropped the connection in the meantime. With
+`CONN_HEALTH_CHECKS` set in a database's settings, the first use of a
+reused connection in a request pings it and reconnects if it is gone.
+
+Connects, the time they took and failed health checks are counted in the
+cache, shared by every worker, see the `database_stats` command.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+
+def _counter_key(alias, name):
+    return f"db:{alias}:{name}"
+
+
+def _incr(key, delta=1):
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, delta, None)
+
+
+def get_connection_stats(alias):
+    """
+    Return the connect and health check counters of a database.
+    """
+    connects = cache.get(_counter_key(alias, "connects"), 0)
+    connect_ms = cache.get(_counter_key(alias, "connect_ms"), 0)
+    return {
+        "connects": connects,
+        "connect_ms": connect_ms / connects if connects else 0.0,
+        "health_check_failures": cache.get(
+            _counter_key(alias, "health_check_failures"), 0
+        ),
+    }
+
+
+class HealthCheckMixin(BaseDatabaseWrapper):
+    """
+    Database wrapper mixin pinging reused connections once per request.
+
+    Listed before a backend's `DatabaseWrapper`, which it extends.
+    """
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+
+    def connect(self):
+        # A fresh connection needs no check for the rest of the request.
+        self.health_check_done = True
+        started = time.monotonic()
+        super().connect()
+        _incr(_counter_key(self.alias, "connects"))
+        _incr(
+            _counter_key(self.alias, "connect_ms"),
+            int((time.monotonic() - started) * 1000),
+        )
+
+    def close_if_unusable_or_obsolete(self):
+        # Called when a request starts and finishes.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            _incr(_counter_key(self.alias, "health_check_failures"))
+            self.close()
+        self.health_check_done = True
+
+    def set_autocommit(self, *args, **kwargs):
+        # Entering the outermost atomic block, before BEGIN.
+        self.close_if_health_check_failed()
+        super().set_autocommit(*args, **kwargs)
+
+    def _cursor(self, *args, **kwargs):
+        self.close_if_health_check_failed()
+        return super()._cursor(*args, **kwargs)
@@ -0,0 +1,9 @@
+from django.db.backends.postgresql import base
+
+from transportation_suppliers.db.health import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    """
+    PostgreSQL backend with health-checked persistent connections.
+    """
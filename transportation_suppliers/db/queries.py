@@ -0,0 +1,123 @@
+"""
+Query budgets.
+
+`QueryRecorder` records the SQL every database connection runs in a block.
+`query_budget` fails a test (or any block) running more queries than its
+budget, or the same query shape often enough to be an N+1 query: a query
+per row instead of one query for all rows. `QueryBudgetMiddleware`
+applies the `query_budgets` viewsets declare per action to each request.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+from typing import List
+
+from django.db import connections
+
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 3
+
+_TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO")
+_PLACEHOLDER_LISTS = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def query_shape(sql):
+    """
+    Return `sql` with its placeholder lists collapsed, so queries differing
+    only in the number of parameters of an `IN` share a shape.
+    """
+    return _PLACEHOLDER_LISTS.sub("IN (%s, ...)", sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Record the queries run on every database connection, leaving out the
+    savepoints of transactions.
+    """
+
+    def __init__(self):
+        self.queries: List[str] = []
+        # Seconds spent running the recorded queries.
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(_TRANSACTION_STATEMENTS):
+            return execute(sql, params, many, context)
+        self.queries.append(sql)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        """
+        Return the shapes run at least `threshold` times, with their count.
+        """
+        counts = Counter(query_shape(sql) for sql in self.queries)
+        return {
+            shape: count
+            for shape, count in counts.items()
+            if count >= threshold
+        }
+
+    def check(self, budget, n_plus_one_threshold=DEFAULT_N_PLUS_ONE_THRESHOLD):
+        """
+        Return the ways the recorded queries break `budget` and
+        `n_plus_one_threshold` (`None` for no limit), as messages.
+        """
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(
+                "{} queries, over the budget of {}:\n{}".format(
+                    len(self), budget, "\n".join(self.queries)
+                )
+            )
+        if n_plus_one_threshold is not None:
+            for shape, count in self.repeated(n_plus_one_threshold).items():
+                problems.append(f"N+1 query, run {count} times: {shape}")
+        return problems
+
+
+class query_budget(ContextDecorator):
+    """
+    Fail with `QueryBudgetExceeded` when the decorated function or block
+    runs more than `budget` queries, or a query shape at least
+    `n_plus_one_threshold` times.
+    """
+
+    def __init__(
+        self, budget=None, n_plus_one_threshold=DEFAULT_N_PLUS_ONE_THRESHOLD
+    ):
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def __enter__(self):
+        self.recorder = QueryRecorder().__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            problems = self.recorder.check(
+                self.budget, self.n_plus_one_threshold
+            )
+            if problems:
+                raise QueryBudgetExceeded("\n".join(problems))
@@ -0,0 +1,277 @@
+"""
+Slow query log.
+
+`SlowQueryRecorder` times the queries every database connection runs in a
+block and records those taking at least a threshold: each one is logged
+with the view and serializer running it, and counted in the cache, shared by
+every worker, under its fingerprint: the query with its literals and
+placeholder lists normalized. See the `slow_queries` command.
+
+A `SLOW_QUERY_EXPLAIN_SAMPLE_RATE` fraction of the slow `SELECT`s are run
+again on a background thread under `EXPLAIN (ANALYZE, BUFFERS)` on
+PostgreSQL (the plain `EXPLAIN` of other databases), in a transaction
+rolled back afterwards, and the plan is kept with the fingerprint.
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+
+from transportation_suppliers.db.queries import query_shape
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "db:slow-queries"
+# Fingerprints kept in the cache, the most recently new ones.
+MAX_FINGERPRINTS = 500
+# Views and serializers kept per fingerprint.
+MAX_SOURCES = 10
+SOURCES = ("views", "serializers")
+# Keys kept next to each entry: counters, the source names and the plan.
+COUNTERS = ("count", "total_us", "max_us", "plan") + SOURCES
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+_explain_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="explain"
+)
+# Fingerprints waiting for a plan, so each is queued at most once.
+_explaining: Set[str] = set()
+_explaining_lock = threading.Lock()
+
+
+def normalize(sql):
+    """
+    Return `sql` with its string and number literals replaced by `?` and its
+    placeholder lists collapsed.
+    """
+    sql = _STRINGS.sub("?", query_shape(sql))
+    return _WHITESPACE.sub(" ", _NUMBERS.sub("?", sql)).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def _entry_key(key):
+    return f"db:slow-query:{key}"
+
+
+def _counter_key(key, name):
+    return f"{_entry_key(key)}:{name}"
+
+
+def _source_key(key, label, name):
+    digest = hashlib.sha1(name.encode()).hexdigest()[:16]
+    return _counter_key(key, f"{label}:{digest}")
+
+
+def _incr(key, delta=1):
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, delta, None)
+
+
+def record_slow_query(alias, sql, params, duration, view, serializer):
+    """
+    Log a slow query, add it to its fingerprint's counters and maybe queue
+    it to be explained.
+    """
+    key = fingerprint(sql)
+    duration_ms = duration * 1000
+    logger.warning(
+        "Slow query (%.1f ms) in %s, serializer %s, fingerprint %s: %s",
+        duration_ms,
+        view,
+        serializer,
+        key,
+        sql,
+    )
+
+    # Workers record the same fingerprint at once: the counters are only
+    # ever incremented, and the entry is written once.
+    entry = {"fingerprint": key, "alias": alias, "sql": normalize(sql)}
+    if cache.add(_entry_key(key), entry, None):
+        index = cache.get(INDEX_KEY, [])
+        if key not in index:
+            index = (index + [key])[-MAX_FINGERPRINTS:]
+            cache.set(INDEX_KEY, index, None)
+    duration_us = round(duration * 1000000)
+    _incr(_counter_key(key, "count"))
+    _incr(_counter_key(key, "total_us"), duration_us)
+    # The cache cannot compare and set, so a longer run recorded at the
+    # same time may be missed.
+    if duration_us > cache.get(_counter_key(key, "max_us"), 0):
+        cache.set(_counter_key(key, "max_us"), duration_us, None)
+    _count_source(key, "views", view)
+    _count_source(key, "serializers", serializer)
+
+    rate = settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    if (
+        rate > 0
+        and params is not None
+        and sql.lstrip()[:6].upper() == "SELECT"
+        and random.random() < rate
+    ):
+        with _explaining_lock:
+            if key in _explaining:
+                return
+            _explaining.add(key)
+        _explain_executor.submit(_store_plan, key, alias, sql, params)
+
+
+def get_slow_queries():
+    """
+    Return the entries of the recorded fingerprints, the most total time
+    first.
+    """
+    keys = cache.get(INDEX_KEY, [])
+    values = cache.get_many(
+        [_entry_key(key) for key in keys]
+        + [_counter_key(key, name) for key in keys for name in COUNTERS]
+    )
+    entries = []
+    for key in keys:
+        entry = values.get(_entry_key(key))
+        count = values.get(_counter_key(key, "count"))
+        if entry is None or not count:
+            continue
+        entry = dict(
+            entry,
+            count=count,
+            total_ms=values.get(_counter_key(key, "total_us"), 0) / 1000,
+            max_ms=values.get(_counter_key(key, "max_us"), 0) / 1000,
+            plan=values.get(_counter_key(key, "plan")),
+        )
+        for label in SOURCES:
+            names = values.get(_counter_key(key, label), [])
+            counts = cache.get_many(
+                [_source_key(key, label, name) for name in names]
+            )
+            entry[label] = {
+                name: counts.get(_source_key(key, label, name), 0)
+                for name in names
+            }
+        entries.append(entry)
+    return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+
+def clear_slow_queries():
+    keys = cache.get(INDEX_KEY, [])
+    names = cache.get_many(
+        [_counter_key(key, label) for key in keys for label in SOURCES]
+    )
+    cache.delete_many(
+        [
+            _source_key(key, label, name)
+            for key in keys
+            for label in SOURCES
+            for name in names.get(_counter_key(key, label), [])
+        ]
+        + [_counter_key(key, name) for key in keys for name in COUNTERS]
+        + [_entry_key(key) for key in keys]
+        + [INDEX_KEY]
+    )
+
+
+def explain(alias, sql, params):
+    """
+    Run `sql` under `EXPLAIN` in a rolled back transaction and return the
+    plan.
+    """
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        prefix = connection.ops.explain_query_prefix(
+            analyze=True, buffers=True
+        )
+    else:
+        prefix = connection.ops.explain_query_prefix()
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SET LOCAL statement_timeout = %s",
+                [settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS],
+            )
+        cursor.execute(f"{prefix} {sql}", params)
+        rows = cursor.fetchall()
+        transaction.set_rollback(True, using=alias)
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+def _store_plan(key, alias, sql, params):
+    try:
+        plan = explain(alias, sql, params)
+    except DatabaseError as error:
+        logger.warning("Cannot explain slow query %s: %s", key, error)
+        return
+    finally:
+        # The thread's connection is not closed at the end of a request.
+        connections[alias].close()
+        with _explaining_lock:
+            _explaining.discard(key)
+
+    cache.set(_counter_key(key, "plan"), plan, None)
+    logger.info("Plan of slow query %s:\n%s", key, plan)
+
+
+def _count_source(key, label, name):
+    name = name or "-"
+    names = cache.get(_counter_key(key, label), [])
+    if name not in names:
+        if len(names) >= MAX_SOURCES:
+            return
+        # Only new names are written, a new name recorded at the same time
+        # by another worker may be dropped.
+        cache.set(_counter_key(key, label), names + [name], None)
+    _incr(_source_key(key, label, name))
+
+
+class SlowQueryRecorder:
+    """
+    Record the queries run on every database connection taking at least
+    `threshold` seconds, with the view and serializer `describe()` returns.
+    """
+
+    def __init__(self, threshold, describe):
+        self.threshold = threshold
+        self.describe = describe
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                view, serializer = self.describe()
+                record_slow_query(
+                    context["connection"].alias,
+                    sql,
+                    None if many else params,
+                    duration,
+                    view,
+                    serializer,
+                )
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
@@ -6,6 +6,7 @@ from transportation_suppliers.users.forms import (
     UserChangeForm,
     UserCreationForm,
 )
+from transportation_suppliers.users.models import ApiToken
 
 User = get_user_model()
 
@@ -20,3 +21,16 @@ class UserAdmin(auth_admin.UserAdmin):
     ) + auth_admin.UserAdmin.fieldsets
     list_display = ["username", "name", "is_superuser"]
     search_fields = ["name"]
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+
+    list_display = ["prefix", "user", "created_at", "expires_at"]
+    list_select_related = ["user"]
+    readonly_fields = ["prefix", "digest", "created_at"]
+    search_fields = ["prefix", "user__username"]
+
+    def has_add_permission(self, request):
+        # Tokens are only handed out by the `api/token/` endpoint.
+        return False
@@ -0,0 +1,247 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from transportation_suppliers.users import metrics
+from transportation_suppliers.users.models import ApiToken, User
+from transportation_suppliers.users.utils import (
+    api_token_digest,
+    parse_api_token,
+)
+
+
+def token_cache_key(key):
+    # Hashed, so tokens never appear in cache keys.
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"api:token:{digest}"
+
+
+def invalidate_tokens(keys):
+    """
+    Drop the cached tokens with the given keys now and once the current
+    transaction commits, so no request re-caches them in between.
+    """
+    cache_keys = [token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a TTL.
+
+    Entries can be tagged, with their user's id for instance, and the
+    entries of a tag deleted without scanning the others.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Any, float, Any]]" = (
+            OrderedDict()
+        )
+        self._tagged: Dict[Any, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires, tag = entry
+            if expires <= time.monotonic():
+                self._pop(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, tag=None):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tag)
+            if tag is not None:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def delete_tag(self, tag):
+        with self._lock:
+            for key in self._tagged.pop(tag, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[2] is None:
+            return
+        keys = self._tagged[entry[2]]
+        keys.discard(key)
+        if not keys:
+            del self._tagged[entry[2]]
+
+
+def user_snapshot(user):
+    """
+    Return the field values of `user` to cache, all but its password hash.
+    """
+    snapshot = {}
+    for field in User._meta.concrete_fields:
+        if field.attname == "password":
+            continue
+        value = getattr(user, field.attname)
+        if isinstance(value, FieldFile):
+            value = value.name
+        snapshot[field.attname] = value
+    return snapshot
+
+
+def user_from_snapshot(snapshot):
+    """
+    Return a user made from a `user_snapshot()`, without a query. Its
+    password hash is deferred, loaded only if read.
+    """
+    return User.from_db(
+        router.db_for_read(User), list(snapshot), list(snapshot.values())
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` keeping tokens and their users in the cache.
+
+    The token of an active user is cached for `API_TOKEN_CACHE_TIMEOUT`
+    seconds with a snapshot of the user, all but its password hash, saving
+    every query of an authenticated request. The signals in
+    `transportation_suppliers.users.signals` drop a cached token when it is
+    deleted or its user is saved (deactivated, for instance).
+    """
+
+    def authenticate_credentials(self, key):
+        timeout = settings.API_TOKEN_CACHE_TIMEOUT
+        if not timeout:
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        metrics.record_cache_lookup("token", cached is not None)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, (token.created, user_snapshot(user)), timeout)
+            return user, token
+
+        created, snapshot = cached
+        user = user_from_snapshot(snapshot)
+        return user, self.get_model()(key=key, user=user, created=created)
+
+
+# `(pk, created_at, expires_at, user_snapshot)` of verified `ApiToken`s (or
+# `None` for invalid tokens) by token digest, tagged with their user's id.
+# Only values are kept, model instances are never shared between requests.
+verified_api_tokens = LocalTTLCache(settings.API_TOKEN_LOCAL_CACHE_SIZE)
+
+_missing = object()
+
+
+def invalidate_user_api_tokens(user_pk):
+    """
+    Drop the verified tokens of a user from the cache of this process now
+    and once the current transaction commits.
+    """
+    verified_api_tokens.delete_tag(user_pk)
+    transaction.on_commit(lambda: verified_api_tokens.delete_tag(user_pk))
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """
+    Authenticate `ApiToken`s, sent as `Authorization: Token <token>`.
+
+    Forged tokens fail their HMAC check without a query. The outcome of
+    every other lookup, valid or not, is kept in an in-process cache for
+    `API_TOKEN_LOCAL_CACHE_TIMEOUT` seconds with the token's user, but its
+    password hash, so repeated tokens never reach the database. Deleting a
+    token or saving its user clears it from the cache of the current
+    process; other processes notice within the timeout. Legacy `authtoken`
+    keys are left to the next authentication class.
+    """
+
+    def authenticate_credentials(self, key):
+        if "." not in key:
+            # A legacy authtoken key.
+            return None
+
+        prefix = parse_api_token(key)
+        if prefix is None:
+            raise AuthenticationFailed(_("Invalid token."))
+
+        digest = api_token_digest(key)
+        verified = verified_api_tokens.get(digest, _missing)
+        metrics.record_cache_lookup("api_token", verified is not _missing)
+        if verified is _missing:
+            verified = None
+            user_pk = None
+            api_token = self.get_api_token(prefix, digest)
+            if api_token is not None:
+                user_pk = api_token.user_id
+                verified = (
+                    api_token.pk,
+                    api_token.created_at,
+                    api_token.expires_at,
+                    user_snapshot(api_token.user),
+                )
+            verified_api_tokens.set(
+                digest,
+                verified,
+                settings.API_TOKEN_LOCAL_CACHE_TIMEOUT,
+                tag=user_pk,
+            )
+
+        if verified is None:
+            raise AuthenticationFailed(_("Invalid token."))
+        pk, created_at, expires_at, snapshot = verified
+        user = user_from_snapshot(snapshot)
+        api_token = ApiToken(
+            pk=pk,
+            user=user,
+            prefix=prefix,
+            digest=digest,
+            created_at=created_at,
+            expires_at=expires_at,
+        )
+        if api_token.is_expired:
+            raise AuthenticationFailed(_("Token has expired."))
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, api_token
+
+    def get_api_token(self, prefix, digest):
+        """
+        Return the token matching `digest` with its user, or `None`.
+        """
+        for api_token in ApiToken.objects.select_related("user").filter(
+            prefix=prefix
+        ):
+            if constant_time_compare(api_token.digest, digest):
+                return api_token
+        return None
@@ -0,0 +1,90 @@
+"""
+Versioned response cache for the users API.
+
+Cached responses are keyed by a version number stored next to them in the
+cache. Invalidation bumps the version instead of deleting keys, so stale
+entries are simply never read again and expire on their own.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from transportation_suppliers.users import metrics
+
+
+PROFILE_LIST_VERSION_KEY = "api:profiles:list:version"
+
+
+def profile_detail_version_key(username):
+    return f"api:profiles:detail:{username}:version"
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version key evicted from the cache can
+        # never come back with a value old responses were stored under.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(key)
+
+
+def invalidate_profiles(usernames=()):
+    """
+    Invalidate the profile list and the given profiles' detail responses
+    once the current transaction commits.
+    """
+    keys = [PROFILE_LIST_VERSION_KEY]
+    keys += [profile_detail_version_key(username) for username in usernames]
+
+    def bump():
+        for key in keys:
+            bump_version(key)
+
+    transaction.on_commit(bump)
+
+
+def response_cache_key(prefix, version, request):
+    location = "{} {}".format(
+        request.build_absolute_uri(), request.accepted_media_type
+    )
+    digest = hashlib.md5(location.encode("utf-8")).hexdigest()
+    return f"api:{prefix}:response:{version}:{digest}"
+
+
+def _counter_key(prefix, outcome):
+    return f"api:{prefix}:response-cache:{outcome}"
+
+
+def record_lookup(prefix, hit):
+    metrics.record_cache_lookup(f"response:{prefix}", hit)
+    key = _counter_key(prefix, "hits" if hit else "misses")
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def get_response_cache_stats(prefix):
+    """
+    Return the hit and miss counters of a response cache, shared by every
+    worker using the same cache backend.
+    """
+    hits = cache.get(_counter_key(prefix, "hits"), 0)
+    misses = cache.get(_counter_key(prefix, "misses"), 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+    }
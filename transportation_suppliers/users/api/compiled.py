@@ -0,0 +1,148 @@
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PKOnlyObject
+
+
+class CompiledSerializer:
+    """
+    Read-only rendering of a `ModelSerializer` straight from `.values()`
+    rows.
+
+    The serializer's readable fields are bound once and turned into a plan
+    of column reads, so rows are rendered without model instances or the
+    generic per-instance field lookups. Many-to-many fields are read for
+    all the rows at once with one query. The output is the same as the
+    serializer's `data`; only plain model fields, many related fields and
+    nested many `ModelSerializer`s can be compiled.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.serializer_name = type(serializer).__name__
+        self.pk_name = self.model._meta.pk.attname
+        self.columns = [self.pk_name]
+        self.plan = []
+        self.relations = {}
+        for field in serializer._readable_fields:
+            if len(field.source_attrs) != 1:
+                raise ImproperlyConfigured(
+                    f"Cannot compile the `{field.field_name}` field."
+                )
+            model_field = self.model._meta.get_field(field.source_attrs[0])
+
+            if isinstance(
+                field, (ManyRelatedField, serializers.ListSerializer)
+            ):
+                if not model_field.many_to_many or not model_field.concrete:
+                    raise ImproperlyConfigured(
+                        f"Cannot compile the `{field.field_name}` field."
+                    )
+                child = getattr(field, "child_relation", None)
+                if getattr(child, "lookup_field", "pk") != "pk":
+                    raise ImproperlyConfigured(
+                        f"Cannot compile the `{field.field_name}` field."
+                    )
+                self.relations[field.field_name] = (model_field, field)
+                self.plan.append((field.field_name, None, None, None))
+                continue
+
+            if model_field.is_relation:
+                raise ImproperlyConfigured(
+                    f"Cannot compile the `{field.field_name}` field."
+                )
+            convert = None
+            if isinstance(model_field, models.FileField):
+                convert = _file_converter(model_field)
+            if model_field.attname not in self.columns:
+                self.columns.append(model_field.attname)
+            self.plan.append(
+                (
+                    field.field_name,
+                    model_field.attname,
+                    convert,
+                    field.to_representation,
+                )
+            )
+
+    def get_rows(self, queryset, extra_columns=()):
+        """
+        Return the `.values()` rows of `queryset` needed for rendering,
+        with `extra_columns` (e.g. for pagination cursors).
+        """
+        columns = self.columns + [
+            column for column in extra_columns if column not in self.columns
+        ]
+        return queryset.prefetch_related(None).values(*columns)
+
+    def render(self, rows):
+        """
+        Return the representations of `rows`, as the serializer's
+        `many=True` data would.
+        """
+        rows = list(rows)
+        related = {
+            field_name: self.get_related(
+                [row[self.pk_name] for row in rows], model_field, field
+            )
+            for field_name, (model_field, field) in self.relations.items()
+        }
+        return [self.render_row(row, related) for row in rows]
+
+    def render_row(self, row, related=None):
+        item = {}
+        for field_name, column, convert, to_representation in self.plan:
+            if column is None:
+                item[field_name] = related[field_name][row[self.pk_name]]
+                continue
+            value = row[column]
+            if convert is not None:
+                value = convert(value)
+            item[field_name] = (
+                None if value is None else to_representation(value)
+            )
+        return item
+
+    def get_related(self, pks, model_field, field):
+        """
+        Map each of `pks` to the rendered list of its related objects, read
+        in primary key order with one query.
+        """
+        related_model = model_field.related_model
+        query_name = model_field.related_query_name()
+        queryset = related_model.objects.filter(
+            **{f"{query_name}__in": pks}
+        ).order_by("pk")
+
+        rendered = defaultdict(list)
+        if isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            for pk, related_pk in queryset.values_list(query_name, "pk"):
+                rendered[pk].append(
+                    child.to_representation(PKOnlyObject(related_pk))
+                )
+            return rendered
+
+        nested = CompiledSerializer(field.child)
+        if nested.relations:
+            raise ImproperlyConfigured(
+                f"Cannot compile the relations nested in `{field.field_name}`."
+            )
+        cache = {}
+        for row in queryset.values(query_name, *nested.columns):
+            related_pk = row[nested.pk_name]
+            if related_pk not in cache:
+                cache[related_pk] = nested.render_row(row)
+            rendered[row[query_name]].append(cache[related_pk])
+        return rendered
+
+
+def _file_converter(model_field):
+    def convert(name):
+        if name is None:
+            return None
+        return model_field.attr_class(None, model_field, name)
+
+    return convert
@@ -0,0 +1,67 @@
+from rest_framework import serializers
+
+from transportation_suppliers.users.avatars import rendition_urls
+
+
+class TemplateHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """
+    `HyperlinkedRelatedField` resolving its view once per request.
+
+    The URL of a placeholder object is reversed the first time a request
+    needs a link and split around the placeholder; every other link of
+    the request (and of its API version) is the lookup value formatted
+    between the two halves, instead of a full `reverse()` per row.
+    """
+
+    placeholder = "__lookup__"
+
+    def get_url(self, obj, view_name, request, format):
+        # Unsaved objects will not yet have a valid URL.
+        if hasattr(obj, "pk") and obj.pk in (None, ""):
+            return None
+
+        prefix, suffix = self.get_url_template(view_name, request, format)
+        return f"{prefix}{getattr(obj, self.lookup_field)}{suffix}"
+
+    def get_url_template(self, view_name, request, format):
+        """
+        Return the `(prefix, suffix)` of the URLs of `view_name` for this
+        request, cached on the request.
+        """
+        templates = request.__dict__.setdefault("_url_templates", {})
+        key = (view_name, self.lookup_url_kwarg, format)
+        if key not in templates:
+            url = self.reverse(
+                view_name,
+                kwargs={self.lookup_url_kwarg: self.placeholder},
+                request=request,
+                format=format,
+            )
+            templates[key] = tuple(url.split(self.placeholder, 1))
+        return templates[key]
+
+
+class AvatarRenditionsField(serializers.Field):
+    """
+    The URLs of the renditions of a user's avatar by size and format, read
+    from `avatar_renditions`; `None` until they are made.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        urls = rendition_urls(value)
+        request = self.context.get("request")
+        if request is None:
+            return urls
+        return {
+            size_name: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            }
+            for size_name, formats in urls.items()
+        }
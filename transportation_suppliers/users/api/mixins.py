@@ -0,0 +1,380 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from transportation_suppliers.users import metrics, routers
+from transportation_suppliers.users.api import caching
+from transportation_suppliers.users.api.compiled import CompiledSerializer
+from transportation_suppliers.users.api.pagination import get_table_count
+from transportation_suppliers.users.transactions import (
+    SAFE_METHODS,
+    atomic_writes,
+)
+
+
+class AtomicWritesMixin:
+    """
+    Keep `ATOMIC_REQUESTS` for the unsafe methods of a view only, see
+    `atomic_writes`.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        return atomic_writes(super().as_view(*args, **kwargs))
+
+
+class KeysetPaginationMixin:
+    """
+    Switch a viewset between its default paginator and keyset pagination.
+
+    Keyset pagination is used when the client asks for it with
+    `?pagination=keyset` (or sends a `cursor`), or when the request's API
+    version is listed in `API_KEYSET_PAGINATION_VERSIONS`. Clients can opt
+    back into page numbers with `?pagination=page`.
+    """
+
+    keyset_pagination_class = None
+    pagination_query_param = "pagination"
+
+    def use_keyset_pagination(self):
+        if self.keyset_pagination_class is None:
+            return False
+
+        query_params = self.request.query_params
+        mode = query_params.get(self.pagination_query_param)
+        if mode == "keyset":
+            return True
+        if mode == "page":
+            return False
+        if self.keyset_pagination_class.cursor_query_param in query_params:
+            return True
+        return self.request.version in settings.API_KEYSET_PAGINATION_VERSIONS
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.use_keyset_pagination():
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+
+class SparseFieldsetMixin:
+    """
+    Let clients pick the fields of `list` and `retrieve` responses.
+
+    `?fields=id,username` limits the response to the listed fields and
+    `?expand=addresses_nested` renders a relation as nested objects
+    instead of links (where the serializer declares it expandable). The
+    selection is passed to the serializer in its context, and the queryset
+    only loads the selected columns and prefetches the selected relations.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_sparse_fieldset(self):
+        """
+        Return `(fields, expand)` as requested in the query string, with
+        `fields` set to `None` when every field is wanted.
+        """
+        if not hasattr(self, "_sparse_fieldset"):
+            fields = None
+            expand = set()
+            if self.action in ("list", "retrieve"):
+                fields, expand = self.parse_sparse_fieldset()
+            self._sparse_fieldset = fields, expand
+        return self._sparse_fieldset
+
+    def parse_sparse_fieldset(self):
+        serializer_class = self.get_serializer_class()
+        readable_fields = {
+            field.field_name: field
+            for field in serializer_class()._readable_fields
+        }
+        available = set(readable_fields)
+        expandable = set(getattr(serializer_class, "expandable_fields", {}))
+        expandable.update(
+            field_name
+            for field_name, field in readable_fields.items()
+            if isinstance(field, BaseSerializer)
+        )
+
+        query_params = self.request.query_params
+        fields = None
+        expand = set()
+        errors = {}
+        if self.fields_query_param in query_params:
+            fields = _split(query_params[self.fields_query_param])
+            unknown = fields - available
+            if unknown:
+                errors[self.fields_query_param] = [
+                    _("Unknown fields: {}.").format(", ".join(sorted(unknown)))
+                ]
+        if self.expand_query_param in query_params:
+            expand = _split(query_params[self.expand_query_param])
+            unknown = expand - expandable
+            if unknown:
+                errors[self.expand_query_param] = [
+                    _("Cannot expand: {}.").format(", ".join(sorted(unknown)))
+                ]
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_sparse_fieldset()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_sparse_fieldset()[0] is None:
+            return queryset
+
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        relations = set()
+        for field in self.get_serializer()._readable_fields:
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except (FieldDoesNotExist, IndexError):
+                # Computed from the instance, any column could be needed.
+                return queryset
+            if model_field.many_to_many:
+                relations.add(model_field.name)
+            elif model_field.concrete:
+                columns.add(model_field.name)
+        # Paginators read the ordering fields of the page's rows.
+        columns.update(field.lstrip("-") for field in queryset.query.order_by)
+        columns.update(_get_pagination_ordering(self.paginator))
+
+        prefetches = [
+            lookup
+            for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, "prefetch_through", lookup).split("__")[0]
+            in relations
+        ]
+        return (
+            queryset.prefetch_related(None)
+            .prefetch_related(*prefetches)
+            .only(*columns)
+        )
+
+
+class CompiledListMixin:
+    """
+    Render `list` responses with a `CompiledSerializer`.
+
+    The page is read as `.values()` rows and rendered without model
+    instances, with one query per many-to-many field. The serializer must
+    be read-only and compilable. `API_COMPILED_SERIALIZERS = False`
+    restores the regular serializers.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_COMPILED_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        serializer = CompiledSerializer(self.get_serializer())
+        queryset = serializer.get_rows(
+            self.filter_queryset(self.get_queryset()),
+            _get_pagination_ordering(self.paginator),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                metrics.time_serializer(serializer.render, page)
+            )
+        return Response(metrics.time_serializer(serializer.render, queryset))
+
+
+class ReplicaReadsMixin:
+    """
+    Read from the `DATABASE_REPLICAS` on safe methods, once the request is
+    authenticated and unless the client has just written, see
+    `ReplicaRouter`.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            routers.use_replicas()
+
+
+class ResponseCacheMixin:
+    """
+    Cache rendered JSON `list` and `retrieve` responses.
+
+    Subclasses return the current cache version of the requested resource
+    from `get_response_cache_version()`; bumping that version invalidates
+    every response cached under it. Misses are rendered from the primary,
+    even with `ReplicaReadsMixin`. Hits and misses are counted per
+    `response_cache_prefix` and reported in an `X-Cache` header.
+    """
+
+    response_cache_prefix = None
+    response_cache_formats = ("json",)
+
+    def get_response_cache_version(self):
+        raise NotImplementedError(
+            "`get_response_cache_version()` must be implemented."
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+        if (
+            not timeout
+            or request.accepted_renderer.format
+            not in self.response_cache_formats
+        ):
+            return handler(request, *args, **kwargs)
+
+        key = caching.response_cache_key(
+            self.response_cache_prefix,
+            self.get_response_cache_version(),
+            request,
+        )
+        cached = cache.get(key)
+        caching.record_lookup(self.response_cache_prefix, cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            return response
+
+        # The version is bumped when the primary commits, a lagging replica
+        # would have the body cached as current under the new version.
+        routers.pin_primary()
+        response = handler(request, *args, **kwargs)
+        response["X-Cache"] = "MISS"
+        if response.status_code == 200:
+
+            def store(response):
+                cache.set(
+                    key, (response.content, response["Content-Type"]), timeout
+                )
+
+            response.add_post_render_callback(store)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional `list` and `retrieve` requests without serializing.
+
+    Validators are derived from the `last_modified_field` of the requested
+    rows (and, for lists, their count) before the view runs, so a matching
+    `If-None-Match` or `If-Modified-Since` is answered with
+    `304 Not Modified` straight away.
+    """
+
+    last_modified_field = "updated_at"
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_state(self):
+        """
+        Return `(state, last_modified)` describing the requested rows, or
+        `None` if there is nothing to describe (e.g. a missing object).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            last_modified = (
+                queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+                .values_list(self.last_modified_field, flat=True)
+                .first()
+            )
+            if last_modified is None:
+                return None
+            return last_modified.isoformat(), last_modified
+
+        if queryset.query.has_filters():
+            aggregate = queryset.aggregate(
+                last_modified=Max(self.last_modified_field), count=Count("pk")
+            )
+            last_modified = aggregate["last_modified"]
+            count = aggregate["count"]
+        else:
+            # Rows can be deleted without moving the maximum, the cached
+            # table count catches those.
+            last_modified = queryset.aggregate(
+                last_modified=Max(self.last_modified_field)
+            )["last_modified"]
+            count = get_table_count(queryset)
+        state = "{}:{}".format(
+            last_modified.isoformat() if last_modified else "", count
+        )
+        return state, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        conditional_state = self.get_conditional_state()
+        if conditional_state is None:
+            return handler(request, *args, **kwargs)
+
+        state, last_modified = conditional_state
+        # The representation also depends on the API version, the media
+        # type and the query string (page, cursor, ...).
+        validator = "{} {} {} {}".format(
+            request.version,
+            request.accepted_media_type,
+            request.get_full_path(),
+            state,
+        )
+        etag = quote_etag(hashlib.md5(validator.encode("utf-8")).hexdigest())
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+def _split(value):
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+def _get_pagination_ordering(paginator):
+    """
+    Return the fields a keyset paginator reads from the rows of a page.
+    """
+    ordering = getattr(paginator, "ordering", None) or ()
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    return [field.lstrip("-") for field in ordering]
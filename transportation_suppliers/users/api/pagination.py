@@ -0,0 +1,253 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from transportation_suppliers.users import metrics
+
+
+KeysetCursor = namedtuple("KeysetCursor", ["position", "reverse"])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination seeking on the full (composite) ordering key.
+
+    DRF's `CursorPagination` only seeks on the first ordering field and
+    falls back to OFFSET to break ties. Here the cursor stores the value of
+    every ordering field of the boundary row, so each page is a single
+    indexed range scan no matter how deep the client pages. The last
+    ordering field must be unique for the ordering to be total.
+    """
+
+    ordering = ("-id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            reverse = False
+        else:
+            reverse = self.cursor.reverse
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._seek_filter(ordering, self.cursor.position)
+            )
+
+        # Fetch one extra row to find out if there is another page.
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        )
+        return self.encode_cursor(KeysetCursor(position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = self._get_position_from_instance(
+            self.page[0], self.ordering
+        )
+        return self.encode_cursor(KeysetCursor(position, True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            tokens = json.loads(
+                urlsafe_b64decode((encoded + padding).encode("ascii"))
+            )
+            position = tokens["p"]
+            if len(position) != len(self.ordering):
+                raise ValueError("Cursor does not match the ordering.")
+            position = [
+                self._get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+            reverse = bool(tokens.get("r", 0))
+        except (
+            TypeError,
+            ValueError,
+            KeyError,
+            UnicodeError,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(position=position, reverse=reverse)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": cursor.position}
+        if cursor.reverse:
+            tokens["r"] = 1
+        encoded = (
+            urlsafe_b64encode(json.dumps(tokens).encode("ascii"))
+            .decode("ascii")
+            .rstrip("=")
+        )
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            # A `.values()` row.
+            instance = SimpleNamespace(**instance)
+        return [
+            self._get_field(field).value_to_string(instance)
+            for field in ordering
+        ]
+
+    def _get_field(self, ordering_field):
+        return self.model._meta.get_field(ordering_field.lstrip("-"))
+
+    def _seek_filter(self, ordering, position):
+        """
+        Build the row-value comparison `(a, b) > (x, y)` as
+        `a > x OR (a = x AND b > y)`, honouring each field's direction.
+        """
+        seek = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            seek |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return seek
+
+    def get_ordering(self, request, queryset, view):
+        self.model = queryset.model
+        return super().get_ordering(request, queryset, view)
+
+
+class ProfileKeysetPagination(KeysetPagination):
+    ordering = ("-date_joined", "id")
+
+
+class AddressKeysetPagination(KeysetPagination):
+    ordering = ("-id",)
+
+
+def count_cache_key(model):
+    return f"api:count:{model._meta.db_table}"
+
+
+def estimate_table_count(model, using="default"):
+    """
+    Return the planner's row estimate for the model's table, or `None` if
+    the database cannot provide one.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # Tables that were never analyzed report 0 (or -1 on PostgreSQL 14+).
+    if row is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+def get_table_count(queryset):
+    """
+    Return the row count of the queryset's whole table from the cache.
+
+    On a cache miss the planner estimate is used for tables larger than
+    `API_COUNT_ESTIMATE_THRESHOLD` rows, otherwise the rows are counted.
+    The cached value is then kept current by the save/delete signals in
+    `transportation_suppliers.users.signals`.
+    """
+    key = count_cache_key(queryset.model)
+    count = cache.get(key)
+    metrics.record_cache_lookup("count", count is not None)
+    if count is None:
+        count = estimate_table_count(queryset.model, using=queryset.db)
+        if count is None or count < settings.API_COUNT_ESTIMATE_THRESHOLD:
+            count = queryset.count()
+        cache.set(key, count, settings.API_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """
+    Paginator serving the total of unfiltered querysets from the cache.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, "query") or queryset.query.has_filters():
+            return super().count
+        return get_table_count(queryset)
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    Page number pagination without a `COUNT(*)` on every request.
+
+    Clients that need an exact total can ask for it with `?exact_count=1`.
+    """
+
+    django_paginator_class = CachedCountPaginator
+    exact_count_query_param = "exact_count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.exact_count_requested(request):
+            self.django_paginator_class = DjangoPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def exact_count_requested(self, request):
+        value = request.query_params.get(self.exact_count_query_param, "")
+        return value.lower() in ("1", "true", "yes")
+
+
+def _invert(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
@@ -1,11 +1,74 @@
+from django.db import connections, router
+from django.utils import timezone
 from rest_framework import serializers
 
+from transportation_suppliers.users import metrics
+from transportation_suppliers.users.api.fields import (
+    AvatarRenditionsField,
+    TemplateHyperlinkedRelatedField,
+)
 from transportation_suppliers.users.models import User, Address
+from transportation_suppliers.users.signals import addresses_bulk_saved
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressListSerializer(serializers.ListSerializer):
+    """
+    Write many addresses with `bulk_create`/`bulk_update`.
+
+    Bulk queries skip the model signals, so `addresses_bulk_saved` is sent
+    instead to keep cached counts and profiles current.
+    """
+
+    batch_size = 500
+
+    def create(self, validated_data):
+        addresses = [Address(**attrs) for attrs in validated_data]
+        connection = connections[router.db_for_write(Address)]
+        if not connection.features.can_return_ids_from_bulk_insert:
+            # The response needs the new ids, which only some backends
+            # (PostgreSQL among them) return from a bulk insert.
+            for address in addresses:
+                address.save()
+            return addresses
+
+        Address.objects.bulk_create(addresses, batch_size=self.batch_size)
+        addresses_bulk_saved.send(
+            sender=Address, addresses=addresses, created=True
+        )
+        return addresses
+
+    def update(self, instances, validated_data):
+        fields = {"updated_at"}
+        now = timezone.now()
+        for address, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(address, attr, value)
+            address.updated_at = now
+            fields.update(attrs)
+
+        Address.objects.bulk_update(
+            instances, sorted(fields), batch_size=self.batch_size
+        )
+        addresses_bulk_saved.send(
+            sender=Address, addresses=instances, created=False
+        )
+        return instances
+
+
+class TimedSerializerMixin:
+    """
+    Count the rendering of the serializer in the serializer time of the
+    request's metrics, unless it is nested in another serializer.
+    """
+
+    def to_representation(self, instance):
+        return metrics.time_serializer(super().to_representation, instance)
+
+
+class AddressSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
+        list_serializer_class = AddressListSerializer
         fields = [
             "id",
             "address1",
@@ -18,8 +81,43 @@ class AddressSerializer(serializers.ModelSerializer):
         ]
 
 
-class SimpleProfileSerializer(serializers.HyperlinkedModelSerializer):
-    addresses_nested = serializers.HyperlinkedRelatedField(
+class SparseFieldsetSerializerMixin:
+    """
+    Serialize only the fields listed in the context's `fields` (all of
+    them when it is `None`) and render the relations listed in its
+    `expand` with the nested serializers of `expandable_fields`.
+    """
+
+    # Field name to a callable returning the nested serializer.
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get("expand", ())
+        for field_name in expand:
+            if field_name in self.expandable_fields:
+                fields[field_name] = self.expandable_fields[field_name]()
+
+        selected = self.context.get("fields")
+        if selected is not None:
+            for field_name in list(fields):
+                if field_name not in selected and field_name not in expand:
+                    del fields[field_name]
+        return fields
+
+
+def _nested_addresses():
+    return AddressSerializer(source="addresses", many=True, read_only=True)
+
+
+class SimpleProfileSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetSerializerMixin,
+    serializers.HyperlinkedModelSerializer,
+):
+    expandable_fields = {"addresses_nested": _nested_addresses}
+
+    addresses_nested = TemplateHyperlinkedRelatedField(
         source="addresses",
         view_name="api_users:addresses-detail",
         read_only=True,
@@ -27,6 +125,7 @@ class SimpleProfileSerializer(serializers.HyperlinkedModelSerializer):
         lookup_field="pk",
         lookup_url_kwarg="pk",
     )
+    avatar_renditions = AvatarRenditionsField()
 
     class Meta:
         model = User
@@ -37,6 +136,7 @@ class SimpleProfileSerializer(serializers.HyperlinkedModelSerializer):
             "last_name",
             "name",
             "avatar",
+            "avatar_renditions",
             "bio",
             "salutation",
             "gender",
@@ -56,10 +156,15 @@ class SimpleProfileSerializer(serializers.HyperlinkedModelSerializer):
         }
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetSerializerMixin,
+    serializers.ModelSerializer,
+):
     addresses_nested = AddressSerializer(
         source="addresses", read_only=True, many=True
     )
+    avatar_renditions = AvatarRenditionsField()
 
     class Meta:
         model = User
@@ -70,6 +175,7 @@ class ProfileSerializer(serializers.ModelSerializer):
             "last_name",
             "name",
             "avatar",
+            "avatar_renditions",
             "bio",
             "salutation",
             "gender",
@@ -89,14 +195,20 @@ class ProfileSerializer(serializers.ModelSerializer):
         }
 
 
-class SimpleUserSerializer(serializers.ModelSerializer):
+class SimpleUserSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetSerializerMixin,
+    serializers.ModelSerializer,
+):
+    expandable_fields = {"addresses_nested": _nested_addresses}
+
     addresses = serializers.PrimaryKeyRelatedField(
         queryset=Address.objects.all(),
         many=True,
         write_only=True,
         required=False,
     )
-    addresses_nested = serializers.HyperlinkedRelatedField(
+    addresses_nested = TemplateHyperlinkedRelatedField(
         source="addresses",
         view_name="api_users:addresses-detail",
         read_only=True,
@@ -104,6 +216,7 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         lookup_field="pk",
         lookup_url_kwarg="pk",
     )
+    avatar_renditions = AvatarRenditionsField()
 
     class Meta:
         model = User
@@ -115,6 +228,7 @@ class SimpleUserSerializer(serializers.ModelSerializer):
             "name",
             "email",
             "avatar",
+            "avatar_renditions",
             "bio",
             "salutation",
             "date_of_birth",
@@ -129,7 +243,11 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         extra_kwargs = {"date_joined": {"read_only": True}}
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetSerializerMixin,
+    serializers.ModelSerializer,
+):
     addresses = serializers.PrimaryKeyRelatedField(
         queryset=Address.objects.all(),
         many=True,
@@ -139,6 +257,7 @@ class UserSerializer(serializers.ModelSerializer):
     addresses_nested = AddressSerializer(
         source="addresses", many=True, read_only=True
     )
+    avatar_renditions = AvatarRenditionsField()
 
     class Meta:
         model = User
@@ -150,6 +269,7 @@ class UserSerializer(serializers.ModelSerializer):
             "name",
             "email",
             "avatar",
+            "avatar_renditions",
             "bio",
             "salutation",
             "date_of_birth",
@@ -0,0 +1,257 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.api.authentication import (
+    CachedTokenAuthentication,
+    ExpiringTokenAuthentication,
+    token_cache_key,
+)
+from transportation_suppliers.users.models import ApiToken
+from transportation_suppliers.users.utils import (
+    api_token_digest,
+    generate_api_token,
+)
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """
+    Test suite for the cached token authentication.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.token = Token.objects.create(user=self.new_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse(
+            "api_users:user-detail", args=["v2", self.new_user.id]
+        )
+
+    def get_token_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, context.captured_queries
+
+    def test_token_is_cached_v2(self):
+        """
+        Test only the first request looks the token and its user up.
+        """
+
+        response, queries = self.get_token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_queries = len(queries)
+
+        response, queries = self.get_token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["username"], self.new_user.username)
+        self.assertEqual(len(queries), first_queries - 1)
+        with self.assertNumQueries(0):
+            user, token = CachedTokenAuthentication().authenticate_credentials(
+                self.token.key
+            )
+        self.assertEqual(user, self.new_user)
+        self.assertEqual(token, self.token)
+
+    @override_settings(API_TOKEN_CACHE_TIMEOUT=0)
+    def test_cache_disabled_v2(self):
+        """
+        Test a zero timeout looks the token up on every request.
+        """
+
+        response, first_queries = self.get_token_queries()
+        response, queries = self.get_token_queries()
+        self.assertEqual(len(queries), len(first_queries))
+
+    def test_deactivated_user_v2(self):
+        """
+        Test deactivating the user invalidates the cached token.
+        """
+
+        self.client.get(self.url)
+        self.new_user.is_active = False
+        self.new_user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token_has_no_password_v2(self):
+        """
+        Test the cached user leaves out the password hash.
+        """
+
+        self.client.get(self.url)
+        created, snapshot = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(created, self.token.created)
+        self.assertEqual(snapshot["username"], self.new_user.username)
+        self.assertNotIn("password", snapshot)
+
+    def test_deleted_token_v2(self):
+        """
+        Test deleting the token invalidates the cached token.
+        """
+
+        self.client.get(self.url)
+        self.token.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExpiringTokenAuthenticationTestCase(APITestCase):
+    """
+    Test suite for expiring API tokens.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.new_user.set_password("secret-password")
+        self.new_user.save()
+        self.client = APIClient()
+        self.url = reverse(
+            "api_users:user-detail", args=["v2", self.new_user.id]
+        )
+
+    def obtain_token(self):
+        response = self.client.post(
+            "/api/token/",
+            {
+                "username": self.new_user.username,
+                "password": "secret-password",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["token"]
+
+    def get_with_token(self, token):
+        # REST framework rolls back the open atomic block on errors, with
+        # reads running in autocommit that is the test case's own one.
+        with transaction.atomic(), CaptureQueriesContext(
+            connection
+        ) as context:
+            response = self.client.get(
+                self.url, HTTP_AUTHORIZATION=f"Token {token}"
+            )
+        return response, context.captured_queries
+
+    def test_obtain_token(self):
+        """
+        Test the token endpoint stores a digest of an expiring token.
+        """
+
+        token = self.obtain_token()
+        api_token = ApiToken.objects.get()
+        self.assertEqual(api_token.user, self.new_user)
+        self.assertEqual(api_token.digest, api_token_digest(token))
+        self.assertTrue(token.startswith(f"{api_token.prefix}."))
+        self.assertFalse(api_token.is_expired)
+
+    def test_token_is_verified_once_v2(self):
+        """
+        Test a token is looked up once, then served from the process cache
+        with its user.
+        """
+
+        token = self.obtain_token()
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_queries = len(queries)
+
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), first_queries - 1)
+        with self.assertNumQueries(0):
+            user, api_token = (
+                ExpiringTokenAuthentication().authenticate_credentials(token)
+            )
+        self.assertEqual(user, self.new_user)
+
+    def test_cached_token_is_not_shared_v2(self):
+        """
+        Test every request gets its own user and token instances, made
+        without the user's password hash.
+        """
+
+        token = self.obtain_token()
+        authentication = ExpiringTokenAuthentication()
+        user, api_token = authentication.authenticate_credentials(token)
+        other_user, other_token = authentication.authenticate_credentials(
+            token
+        )
+        self.assertEqual(other_user, user)
+        self.assertIsNot(other_user, user)
+        self.assertIsNot(other_token, api_token)
+        self.assertEqual(other_token.pk, api_token.pk)
+
+        self.assertEqual(other_user.get_deferred_fields(), {"password"})
+        with self.assertNumQueries(1):
+            self.assertTrue(other_user.check_password("secret-password"))
+
+    def test_forged_token_v2(self):
+        """
+        Test a token failing its check is rejected without a query.
+        """
+
+        prefix, token = generate_api_token()
+        response, queries = self.get_with_token(token[:-1] + "x")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(queries, [])
+
+    def test_unknown_token_is_negatively_cached_v2(self):
+        """
+        Test an unknown, well-formed token is looked up only once.
+        """
+
+        prefix, token = generate_api_token()
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(queries, [])
+
+    def test_expired_token_v2(self):
+        """
+        Test an expired token is rejected.
+        """
+
+        api_token, token = ApiToken.objects.issue(
+            self.new_user, timedelta(seconds=-1)
+        )
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["detail"], "Token has expired.")
+
+    def test_revoked_token_v2(self):
+        """
+        Test deleting a token or deactivating its user revokes it.
+        """
+
+        token = self.obtain_token()
+        self.get_with_token(token)
+        ApiToken.objects.get().delete()
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token = self.obtain_token()
+        self.get_with_token(token)
+        self.new_user.is_active = False
+        self.new_user.save()
+        response, queries = self.get_with_token(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+from rest_framework.reverse import reverse
+from rest_framework.test import APITransactionTestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users import avatars
+
+
+def make_image(size=(1600, 1200), image_format="PNG"):
+    content = BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(content, image_format)
+    return SimpleUploadedFile(
+        f"avatar.{image_format.lower()}",
+        content.getvalue(),
+        content_type=f"image/{image_format.lower()}",
+    )
+
+
+def renditions_exist(prefix):
+    return any(
+        default_storage.exists(avatars.rendition_name(prefix, size, "webp"))
+        for size in ("small", "medium")
+    )
+
+
+def wait_for_renditions():
+    # The single worker runs the queued renderings in order.
+    avatars._executor.submit(lambda: None).result()
+
+
+@override_settings(AVATAR_RENDITION_SIZES={"small": 64, "medium": 256})
+class AvatarRenditionsTestCase(APITransactionTestCase):
+    """
+    Test suite for the renditions of avatars.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.new_user = mommy.make("users.User", username="kamau")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+        self.url = reverse(
+            "api_users:user-detail", args=["v2", self.new_user.id]
+        )
+        self.profile_url = reverse(
+            "api_users:profiles-detail", args=["v2", self.new_user.username]
+        )
+
+    def upload(self):
+        response = self.client.patch(
+            self.url, {"avatar": make_image()}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_renditions_made_after_upload(self):
+        """
+        Test uploading an avatar makes its renditions in the background and
+        the serializers link to them.
+        """
+
+        response = self.upload()
+        self.assertIsNone(response.json()["avatar_renditions"])
+        wait_for_renditions()
+
+        renditions = self.client.get(self.profile_url).json()[
+            "avatar_renditions"
+        ]
+        self.assertEqual(list(renditions), ["small", "medium"])
+        for size_name, size in (("small", 64), ("medium", 256)):
+            self.assertEqual(list(renditions[size_name]), ["webp", "jpeg"])
+            for extension, image_format in avatars.FORMATS.items():
+                url = renditions[size_name][extension]
+                self.assertTrue(url.startswith("http://testserver/media/"))
+                name = url.split("/media/", 1)[1]
+                with default_storage.open(name) as rendition:
+                    image = Image.open(rendition)
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, (size, size * 3 // 4))
+
+        listed = self.client.get(
+            reverse("api_users:profiles-list", args=["v2"])
+        ).json()["results"]
+        self.assertEqual(listed[0]["avatar_renditions"], renditions)
+
+    def test_new_avatar_resets_renditions(self):
+        """
+        Test the renditions of a replaced avatar are no longer linked.
+        """
+
+        self.upload()
+        wait_for_renditions()
+        self.new_user.refresh_from_db()
+        previous = self.new_user.avatar_renditions
+        self.assertTrue(previous)
+
+        response = self.upload()
+        self.assertIsNone(response.json()["avatar_renditions"])
+        wait_for_renditions()
+        self.new_user.refresh_from_db()
+        self.assertTrue(self.new_user.avatar_renditions)
+        self.assertNotEqual(self.new_user.avatar_renditions, previous)
+        # Deleted with the new renditions committed.
+        self.assertFalse(renditions_exist(previous))
+        self.assertTrue(renditions_exist(self.new_user.avatar_renditions))
+
+    def test_renditions_deleted_with_user(self):
+        """
+        Test deleting a user deletes the renditions of its avatar.
+        """
+
+        self.upload()
+        wait_for_renditions()
+        self.new_user.refresh_from_db()
+        prefix = self.new_user.avatar_renditions
+        self.assertTrue(renditions_exist(prefix))
+
+        self.new_user.delete()
+        wait_for_renditions()
+        self.assertFalse(renditions_exist(prefix))
+
+    def test_rolled_back_upload_not_rendered(self):
+        """
+        Test an avatar saved in a rolled back transaction is not rendered.
+        """
+
+        with mock.patch.object(avatars, "make_renditions") as render:
+            with transaction.atomic():
+                self.new_user.avatar = make_image()
+                self.new_user.save()
+                transaction.set_rollback(True)
+            wait_for_renditions()
+        render.assert_not_called()
+        self.new_user.refresh_from_db()
+        self.assertFalse(self.new_user.avatar)
+
+    def test_other_changes_keep_renditions(self):
+        """
+        Test saving a user without changing its avatar keeps its
+        renditions.
+        """
+
+        self.upload()
+        wait_for_renditions()
+        response = self.client.patch(self.url, {"bio": "Dry bulk haulage."})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.json()["avatar_renditions"])
@@ -0,0 +1,180 @@
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.db.queries import query_budget
+from transportation_suppliers.users.models import Address, User
+
+
+class AddressBulkTestCase(APITestCase):
+    """
+    Test suite for the bulk Address api views.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+        self.url = reverse("api_users:addresses-bulk", args=["v2"])
+
+    # SQLite returns no ids from bulk inserts, addresses are saved one by
+    # one there.
+    @override_settings(QUERY_N_PLUS_ONE_THRESHOLD=None)
+    def test_bulk_create_v2(self):
+        """
+        Test creating many addresses in one request.
+        """
+
+        post_data = [
+            {
+                "address1": f"Warehouse {number}",
+                "city": "Nairobi",
+                "postcode": "00100",
+                "country": "KE",
+            }
+            for number in range(5)
+        ]
+        response = self.client.post(self.url, post_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()), 5)
+        self.assertEqual(Address.objects.count(), 5)
+        self.assertEqual(
+            {address["id"] for address in response.json()},
+            set(Address.objects.values_list("id", flat=True)),
+        )
+
+    def test_bulk_create_reports_errors_per_item_v2(self):
+        """
+        Test an invalid item rejects the whole batch with per-item errors.
+        """
+
+        post_data = [
+            {
+                "address1": "Depot",
+                "city": "Nairobi",
+                "postcode": "00100",
+                "country": "KE",
+            },
+            {"address1": "Depot", "country": "XX"},
+        ]
+        response = self.client.post(self.url, post_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertEqual(set(errors[1]), {"city", "postcode", "country"})
+        self.assertEqual(Address.objects.count(), 0)
+
+    def test_bulk_requires_a_list_v2(self):
+        """
+        Test a single object is rejected.
+        """
+
+        response = self.client.post(
+            self.url, {"address1": "Depot"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_v2(self):
+        """
+        Test updating many addresses with PATCH and PUT.
+        """
+
+        addresses = mommy.make("users.Address", country="KE", _quantity=3)
+        self.new_user.addresses.add(addresses[0])
+        patch_data = [
+            {"id": address.id, "city": "Kisumu"} for address in addresses
+        ]
+        response = self.client.patch(self.url, patch_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(Address.objects.values_list("city", flat=True)), {"Kisumu"}
+        )
+
+        put_data = [
+            {
+                "id": addresses[0].id,
+                "address1": "Yard",
+                "city": "Eldoret",
+                "postcode": "30100",
+                "country": "KE",
+            }
+        ]
+        response = self.client.put(self.url, put_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        addresses[0].refresh_from_db()
+        self.assertEqual(addresses[0].city, "Eldoret")
+        self.assertEqual(addresses[0].address1, "Yard")
+
+    def test_bulk_update_unknown_id_v2(self):
+        """
+        Test unknown and missing ids are reported per item.
+        """
+
+        address = mommy.make("users.Address")
+        patch_data = [{"id": address.id}, {"id": 0}, {"city": "Thika"}]
+        response = self.client.patch(self.url, patch_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("id", errors[1])
+        self.assertIn("id", errors[2])
+
+    def test_bulk_delete_v2(self):
+        """
+        Test deleting many addresses by id.
+        """
+
+        addresses = mommy.make("users.Address", _quantity=3)
+        response = self.client.delete(
+            self.url, [addresses[0].id, addresses[1].id], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Address.objects.values_list("id", flat=True)),
+            [addresses[2].id],
+        )
+
+    def test_bulk_delete_batches_queries_v2(self):
+        """
+        Test deleting many addresses, some of them users', runs the same
+        queries as deleting one.
+        """
+
+        addresses = mommy.make("users.Address", _quantity=21)
+        other_user = mommy.make("users.User")
+        self.new_user.addresses.add(*addresses[:10])
+        other_user.addresses.add(*addresses[5:15])
+        updated_at = self.new_user.updated_at
+
+        with query_budget(10):
+            response = self.client.delete(
+                self.url,
+                [address.id for address in addresses[:20]],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Address.objects.values_list("id", flat=True)),
+            [addresses[20].id],
+        )
+        self.assertEqual(User.addresses.through.objects.count(), 0)
+        self.assertGreater(
+            User.objects.get(pk=self.new_user.pk).updated_at, updated_at
+        )
+
+    def test_anonymous_user_bulk_create_v2(self):
+        """
+        Test if the api can raise error if anonymous user tries to bulk
+        create Addresses.
+        """
+
+        new_client = APIClient()
+        response = new_client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,152 @@
+from django.contrib.auth.models import update_last_login
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APITransactionTestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.api.caching import (
+    get_response_cache_stats,
+)
+
+
+class ProfileResponseCacheTestCase(APITransactionTestCase):
+    """
+    Test suite for the profile response cache.
+
+    Invalidation runs on transaction commit, hence the transaction test case.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.address = mommy.make("users.Address")
+        self.client = APIClient()
+        self.list_url = reverse("api_users:profiles-list", args=["v2"])
+        self.detail_url = reverse(
+            "api_users:profiles-detail", args=["v2", self.new_user.username]
+        )
+
+    def test_second_request_is_served_from_cache_v2(self):
+        """
+        Test a repeated request hits the cache without querying.
+        """
+
+        first = self.client.get(self.list_url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(self.list_url)
+        self.assertFalse(
+            any("SELECT" in query["sql"] for query in context.captured_queries)
+        )
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(
+            get_response_cache_stats("profiles"),
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_versions_are_cached_separately(self):
+        """
+        Test v1 and v2 responses do not share cache entries.
+        """
+
+        self.client.get(self.list_url)
+        response = self.client.get(
+            reverse("api_users:profiles-list", args=["v1"])
+        )
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_user_save_invalidates_v2(self):
+        """
+        Test saving a user invalidates the list and its detail.
+        """
+
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self.new_user.bio = "Moves freight."
+        self.new_user.save()
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["bio"], "Moves freight.")
+        self.assertEqual(self.client.get(self.list_url)["X-Cache"], "MISS")
+
+    def test_last_login_save_keeps_cache_v2(self):
+        """
+        Test saving only fields the profiles do not render keeps them
+        cached.
+        """
+
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        update_last_login(None, self.new_user)
+
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(self.list_url)["X-Cache"], "HIT")
+
+    def test_username_change_invalidates_old_detail_v2(self):
+        """
+        Test renaming a user stops the old username from being served.
+        """
+
+        self.client.get(self.detail_url)
+        self.new_user.username = "renamed"
+        self.new_user.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_addresses_change_invalidates_v2(self):
+        """
+        Test adding an address to a user and editing it invalidate the
+        user's detail.
+        """
+
+        self.client.get(self.detail_url)
+        self.new_user.addresses.add(self.address)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()["addresses_nested"]), 1)
+
+        self.address.city = "Mombasa"
+        self.address.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["addresses_nested"][0]["city"], "Mombasa"
+        )
+
+    def test_unrelated_address_keeps_detail_cached_v2(self):
+        """
+        Test editing an address of another user keeps the detail cached.
+        """
+
+        self.client.get(self.detail_url)
+        self.address.city = "Kisumu"
+        self.address.save()
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "HIT")
+
+    def test_browsable_api_is_not_cached_v2(self):
+        """
+        Test HTML responses bypass the cache.
+        """
+
+        self.client.get(self.list_url, HTTP_ACCEPT="text/html")
+        response = self.client.get(self.list_url, HTTP_ACCEPT="text/html")
+        self.assertFalse(response.has_header("X-Cache"))
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_cache_disabled_v2(self):
+        """
+        Test a zero timeout disables the cache.
+        """
+
+        self.client.get(self.list_url)
+        self.assertFalse(self.client.get(self.list_url).has_header("X-Cache"))
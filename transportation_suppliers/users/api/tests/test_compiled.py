@@ -0,0 +1,94 @@
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
+from rest_framework.versioning import URLPathVersioning
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.api.compiled import CompiledSerializer
+from transportation_suppliers.users.api.serializers import (
+    ProfileSerializer,
+    SimpleProfileSerializer,
+)
+from transportation_suppliers.users.api.views import ProfileViewSet
+
+
+class CompiledSerializerTestCase(APITestCase):
+    """
+    Test suite for the parity of compiled and regular profile serializers.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.users = [
+            mommy.make(
+                "users.User",
+                avatar="avatars/haulier.png",
+                salutation="dr",
+                gender="female",
+                bio="Refrigerated freight.",
+            ),
+            mommy.make("users.User", name="Courier Ltd"),
+            mommy.make("users.User"),
+        ]
+        addresses = mommy.make("users.Address", country="KE", _quantity=3)
+        self.users[0].addresses.add(*addresses)
+        self.users[1].addresses.add(addresses[1])
+        self.client = APIClient()
+
+    def get_context(self, version):
+        request = Request(APIRequestFactory().get(f"/api/{version}/profiles/"))
+        request.version = version
+        request.versioning_scheme = URLPathVersioning()
+        return {"request": request}
+
+    def assert_parity(self, serializer_class, version):
+        context = self.get_context(version)
+        queryset = ProfileViewSet.queryset.all()
+        expected = serializer_class(queryset, many=True, context=context).data
+        compiled = CompiledSerializer(serializer_class(context=context))
+        data = compiled.render(compiled.get_rows(queryset))
+        self.assertEqual(
+            JSONRenderer().render(data), JSONRenderer().render(expected)
+        )
+
+    def test_profile_serializer_parity(self):
+        """
+        Test compiled ProfileSerializer output matches the serializer's.
+        """
+
+        self.assert_parity(ProfileSerializer, "v2")
+
+    def test_simple_profile_serializer_parity(self):
+        """
+        Test compiled SimpleProfileSerializer output matches the
+        serializer's.
+        """
+
+        self.assert_parity(SimpleProfileSerializer, "v1")
+
+    def test_list_responses_parity(self):
+        """
+        Test profile list responses are byte-identical with and without
+        compiled serializers, for both versions and paginators.
+        """
+
+        for version in ("v1", "v2"):
+            url = reverse("api_users:profiles-list", args=[version])
+            for params in ({}, {"exact_count": 1}, {"pagination": "keyset"}):
+                responses = []
+                for compiled in (True, False):
+                    with override_settings(
+                        API_COMPILED_SERIALIZERS=compiled,
+                        API_RESPONSE_CACHE_TIMEOUT=0,
+                    ):
+                        response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    responses.append(response.content)
+                self.assertEqual(responses[0], responses[1])
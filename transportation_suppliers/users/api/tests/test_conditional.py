@@ -0,0 +1,175 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APITransactionTestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+
+class AddressConditionalGetTestCase(APITransactionTestCase):
+    """
+    Test suite for conditional requests on Address api views.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.address = mommy.make("users.Address")
+        self.client = APIClient()
+        self.detail_url = reverse(
+            "api_users:addresses-detail", args=["v2", self.address.id]
+        )
+        self.list_url = reverse("api_users:addresses-list", args=["v2"])
+
+    def test_retrieve_not_modified_v2(self):
+        """
+        Test a matching If-None-Match is answered with 304 before the
+        serializer runs.
+        """
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_retrieve_modified_v2(self):
+        """
+        Test a stale ETag gets the new representation.
+        """
+
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.address.city = "Nakuru"
+        self.address.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_etag_follows_deletes_v2(self):
+        """
+        Test deleting a row changes the list ETag.
+        """
+
+        mommy.make("users.Address")
+        etag = self.client.get(self.list_url)["ETag"]
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.address.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_version_and_page(self):
+        """
+        Test different representations of the same rows get distinct ETags.
+        """
+
+        v1_list_url = reverse("api_users:addresses-list", args=["v1"])
+        etags = {
+            self.client.get(self.list_url)["ETag"],
+            self.client.get(self.list_url, {"page": 1})["ETag"],
+            self.client.get(v1_list_url)["ETag"],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_missing_address_v2(self):
+        """
+        Test a missing address still answers 404 without validators.
+        """
+
+        response = self.client.get(
+            reverse("api_users:addresses-detail", args=["v2", 0])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class UserConditionalGetTestCase(APITestCase):
+    """
+    Test suite for conditional requests on User api views.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+        self.url = reverse(
+            "api_users:user-detail", args=["v2", self.new_user.id]
+        )
+
+    def test_address_change_modifies_user_v2(self):
+        """
+        Test adding an address to the user changes its ETag.
+        """
+
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.new_user.addresses.add(mommy.make("users.Address"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["addresses_nested"]), 1)
+
+
+class ProfileConditionalGetTestCase(APITransactionTestCase):
+    """
+    Test suite for conditional requests on Profile api views.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.client = APIClient()
+        self.url = reverse(
+            "api_users:profiles-detail", args=["v2", self.new_user.username]
+        )
+
+    def test_profile_not_modified_v2(self):
+        """
+        Test profiles are revalidated against the response cache version.
+        """
+
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.new_user.bio = "Cold chain logistics."
+        self.new_user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_profile_not_modified_without_cache_v2(self):
+        """
+        Test profiles fall back to row timestamps without the cache.
+        """
+
+        response = self.client.get(self.url)
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+
+class ExportViewTestCase(APITestCase):
+    """
+    Test suite for the export api view.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.addresses = mommy.make("users.Address", country="KE", _quantity=2)
+        self.new_user.addresses.add(*self.addresses)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+
+    def get_export(self, kind, file_format):
+        response = self.client.get(
+            reverse("api_users:export", args=["v2", kind, file_format])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_profiles_ndjson_v2(self):
+        """
+        Test profiles are exported as one JSON object per line.
+        """
+
+        rows = [
+            json.loads(line)
+            for line in self.get_export("profiles", "ndjson").splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["username"], self.new_user.username)
+        self.assertEqual(
+            rows[0]["addresses"],
+            sorted(address.id for address in self.addresses),
+        )
+
+    def test_export_profile_matches_api_v2(self):
+        """
+        Test exported profile fields match the profile API.
+        """
+
+        row = json.loads(self.get_export("profiles", "ndjson"))
+        profile = self.client.get(
+            reverse(
+                "api_users:profiles-detail",
+                args=["v2", self.new_user.username],
+            )
+        ).json()
+        for field in ("username", "name", "bio", "date_joined", "gender"):
+            self.assertEqual(row[field], profile[field])
+
+    def test_export_addresses_csv_v2(self):
+        """
+        Test addresses are exported as CSV with a header row.
+        """
+
+        rows = list(
+            csv.DictReader(io.StringIO(self.get_export("addresses", "csv")))
+        )
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            {row["id"] for row in rows},
+            {str(address.id) for address in self.addresses},
+        )
+        self.assertEqual({row["country"] for row in rows}, {"KE"})
+
+    def test_anonymous_user_export_v2(self):
+        """
+        Test if the api can raise error if anonymous user tries to export.
+        """
+
+        new_client = APIClient()
+        response = new_client.get(
+            reverse("api_users:export", args=["v2", "profiles", "csv"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
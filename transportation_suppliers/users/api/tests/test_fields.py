@@ -0,0 +1,61 @@
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+
+class AddressLinksTestCase(APITestCase):
+    """
+    Test suite for the address links of the v1 serializers.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.addresses = mommy.make("users.Address", _quantity=3)
+        self.new_user.addresses.add(*self.addresses)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+
+    def get_expected_links(self, response):
+        return sorted(
+            reverse(
+                "api_users:addresses-detail",
+                args=["v1", address.id],
+                request=response.wsgi_request,
+            )
+            for address in self.addresses
+        )
+
+    def test_profile_links_match_reverse_v1(self):
+        """
+        Test profile address links are the URLs `reverse()` builds.
+        """
+
+        response = self.client.get(
+            reverse("api_users:profiles-list", args=["v1"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(response.json()["results"][0]["addresses_nested"]),
+            self.get_expected_links(response),
+        )
+
+    def test_user_links_match_reverse_v1(self):
+        """
+        Test user address links are the URLs `reverse()` builds, with the
+        format override kept.
+        """
+
+        response = self.client.get(
+            reverse("api_users:user-detail", args=["v1", self.new_user.id]),
+            {"format": "json"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        links = sorted(response.json()["addresses_nested"])
+        self.assertEqual(links, self.get_expected_links(response))
+        self.assertTrue(all(link.endswith("?format=json") for link in links))
@@ -0,0 +1,126 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+
+@override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsetTestCase(APITestCase):
+    """
+    Test suite for the `fields` and `expand` query parameters.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User", bio="Bulk haulage.")
+        self.new_user.addresses.add(*mommy.make("users.Address", _quantity=2))
+        mommy.make("users.User", _quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+
+    def get_selects(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+        return response, selects
+
+    def test_profile_list_fields_v2(self):
+        """
+        Test only the requested fields are selected and serialized, without
+        the addresses query.
+        """
+
+        for compiled in (True, False):
+            with override_settings(API_COMPILED_SERIALIZERS=compiled):
+                response, selects = self.get_selects(
+                    reverse("api_users:profiles-list", args=["v2"]),
+                    {"fields": "id,username,avatar"},
+                )
+            for profile in response.json()["results"]:
+                self.assertEqual(list(profile), ["id", "username", "avatar"])
+            self.assertFalse(any("users_address" in sql for sql in selects))
+            self.assertFalse(any('"bio"' in sql for sql in selects))
+
+    def test_profile_list_keyset_fields_v2(self):
+        """
+        Test keyset pagination still reads its cursor with few fields.
+        """
+
+        mommy.make("users.User", _quantity=10)
+        response = self.client.get(
+            reverse("api_users:profiles-list", args=["v2"]),
+            {"fields": "username", "pagination": "keyset"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.json()["results"][0]), ["username"])
+
+        response = self.client.get(response.json()["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_profile_retrieve_expand_v1(self):
+        """
+        Test expanded v1 addresses are nested objects instead of links.
+        """
+
+        url = reverse(
+            "api_users:profiles-detail", args=["v1", self.new_user.username]
+        )
+        links = self.client.get(url).json()["addresses_nested"]
+        self.assertTrue(all(isinstance(link, str) for link in links))
+
+        response = self.client.get(
+            url, {"fields": "id", "expand": "addresses_nested"}
+        )
+        self.assertEqual(list(response.json()), ["id", "addresses_nested"])
+        self.assertEqual(
+            sorted(
+                address["id"]
+                for address in response.json()["addresses_nested"]
+            ),
+            sorted(self.new_user.addresses.values_list("id", flat=True)),
+        )
+
+    def test_user_retrieve_fields_v2(self):
+        """
+        Test field selection on the user endpoint.
+        """
+
+        response, selects = self.get_selects(
+            reverse("api_users:user-detail", args=["v2", self.new_user.id]),
+            {"fields": "id,email,addresses_nested"},
+        )
+        self.assertEqual(
+            list(response.json()), ["id", "email", "addresses_nested"]
+        )
+        self.assertEqual(len(response.json()["addresses_nested"]), 2)
+
+    def test_unknown_fields_v2(self):
+        """
+        Test unknown and write-only fields are rejected.
+        """
+
+        response = self.client.get(
+            reverse("api_users:user-detail", args=["v2", self.new_user.id]),
+            {"fields": "id,addresses,password", "expand": "email"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {
+                "fields": ["Unknown fields: addresses, password."],
+                "expand": ["Cannot expand: email."],
+            },
+        )
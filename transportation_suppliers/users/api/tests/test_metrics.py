@@ -0,0 +1,152 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse as django_reverse
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users import metrics
+
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTestCase(APITestCase):
+    """
+    Test suite for the Prometheus metrics of the API.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        mommy.make("users.User", _quantity=3)
+        self.client = APIClient()
+        self.url = reverse("api_users:profiles-list", args=["v2"])
+        self.labels = {"view": "api_users:profiles-list", "method": "GET"}
+
+    def test_request_metrics(self):
+        """
+        Test API requests record their latency, queries and serializer
+        time.
+        """
+
+        requests = sample(
+            "api_request_duration_seconds_count", status="200", **self.labels
+        )
+        queries = sample("api_request_queries_sum", **self.labels)
+        serializer_requests = sample(
+            "api_request_serializer_duration_seconds_count", **self.labels
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            sample(
+                "api_request_duration_seconds_count",
+                status="200",
+                **self.labels,
+            ),
+            requests + 1,
+        )
+        self.assertGreater(
+            sample("api_request_queries_sum", **self.labels), queries
+        )
+        self.assertEqual(
+            sample(
+                "api_request_serializer_duration_seconds_count",
+                **self.labels,
+            ),
+            serializer_requests + 1,
+        )
+
+    def test_cache_lookups(self):
+        """
+        Test response cache lookups are counted by outcome.
+        """
+
+        misses = sample(
+            "api_cache_lookups_total",
+            cache="response:profiles",
+            outcome="miss",
+        )
+        hits = sample(
+            "api_cache_lookups_total", cache="response:profiles", outcome="hit"
+        )
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(
+            sample(
+                "api_cache_lookups_total",
+                cache="response:profiles",
+                outcome="miss",
+            ),
+            misses + 1,
+        )
+        self.assertEqual(
+            sample(
+                "api_cache_lookups_total",
+                cache="response:profiles",
+                outcome="hit",
+            ),
+            hits + 1,
+        )
+
+    def test_scrape(self):
+        """
+        Test the metrics are exposed in the text format.
+        """
+
+        self.client.get(self.url)
+        response = self.client.get(django_reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b'api_request_duration_seconds_bucket{le="0.005",method="GET",'
+            b'status="200",view="api_users:profiles-list"}',
+            response.content,
+        )
+
+    @override_settings(METRICS_BEARER_TOKEN="secret")
+    def test_scrape_token(self):
+        """
+        Test the metrics need the bearer token when one is set.
+        """
+
+        url = django_reverse("metrics")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_multiprocess(self):
+        """
+        Test the metrics of every worker process are added up.
+        """
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        script = (
+            "from prometheus_client import Counter\n"
+            "Counter('worker_requests', 'Requests.').inc()\n"
+        )
+        environment = {"prometheus_multiproc_dir": directory}
+        for _ in range(2):
+            subprocess.run(
+                [sys.executable, "-c", script], env=environment, check=True
+            )
+
+        with mock.patch.dict(os.environ, environment):
+            content_type, content = metrics.render_latest()
+        self.assertIn(b"worker_requests_total 2.0", content)
@@ -0,0 +1,221 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APITransactionTestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.api.pagination import count_cache_key
+from transportation_suppliers.users.models import Address
+
+
+class ProfileKeysetPaginationTestCase(APITestCase):
+    """
+    Test suite for keyset pagination of profiles.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        # Users sharing a date_joined must still be paged without gaps.
+        date_joined = timezone.now()
+        self.users = mommy.make(
+            "users.User", date_joined=date_joined, _quantity=15
+        )
+        self.client = APIClient()
+
+    def test_pages_cover_all_profiles_v2(self):
+        """
+        Test following next links visits every profile exactly once.
+        """
+
+        url = reverse("api_users:profiles-list", args=["v2"])
+        response = self.client.get(url, {"pagination": "keyset"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.json()["previous"])
+        self.assertNotIn("count", response.json())
+
+        usernames = []
+        while True:
+            data = response.json()
+            usernames += [profile["username"] for profile in data["results"]]
+            if data["next"] is None:
+                break
+            response = self.client.get(data["next"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(usernames), 15)
+        self.assertEqual(
+            sorted(usernames), sorted(user.username for user in self.users)
+        )
+
+    def test_previous_link_returns_previous_page_v2(self):
+        """
+        Test the previous link of the second page returns the first page.
+        """
+
+        url = reverse("api_users:profiles-list", args=["v2"])
+        first = self.client.get(url, {"pagination": "keyset"}).json()
+        second = self.client.get(first["next"]).json()
+        previous = self.client.get(second["previous"]).json()
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_invalid_cursor_v2(self):
+        """
+        Test a tampered cursor is rejected.
+        """
+
+        response = self.client.get(
+            reverse("api_users:profiles-list", args=["v2"]),
+            {"cursor": "not-a-cursor"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(API_KEYSET_PAGINATION_VERSIONS=["v1"])
+    def test_version_default_v1(self):
+        """
+        Test keyset pagination is used by default for configured versions.
+        """
+
+        url = reverse("api_users:profiles-list", args=["v1"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("next", response.json())
+        self.assertNotIn("count", response.json())
+
+        response = self.client.get(url, {"pagination": "page"})
+        self.assertEqual(response.json()["count"], 15)
+
+
+class AddressKeysetPaginationTestCase(APITestCase):
+    """
+    Test suite for keyset pagination of addresses.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.addresses = mommy.make("users.Address", _quantity=12)
+        self.client = APIClient()
+
+    def test_pages_are_ordered_by_id_descending_v1(self):
+        """
+        Test keyset pages of addresses follow the `-id` ordering.
+        """
+
+        url = reverse("api_users:addresses-list", args=["v1"])
+        first = self.client.get(url, {"pagination": "keyset"}).json()
+        second = self.client.get(first["next"]).json()
+        ids = [address["id"] for address in first["results"]] + [
+            address["id"] for address in second["results"]
+        ]
+        self.assertEqual(
+            ids,
+            sorted((address.id for address in self.addresses), reverse=True),
+        )
+        self.assertIsNone(second["next"])
+
+
+class CachedCountPaginationTestCase(APITransactionTestCase):
+    """
+    Test suite for the cached count of paginated lists.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        mommy.make("users.Address", _quantity=3)
+        self.client = APIClient()
+        self.url = reverse("api_users:addresses-list", args=["v2"])
+
+    def test_count_is_served_from_cache_v2(self):
+        """
+        Test the count is only computed once and then read from the cache.
+        """
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual(cache.get(count_cache_key(Address)), 3)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()["count"], 3)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in context.captured_queries)
+        )
+
+    def test_count_follows_save_and_delete_v2(self):
+        """
+        Test creating and deleting rows keeps the cached count current.
+        """
+
+        self.client.get(self.url)
+        address = mommy.make("users.Address")
+        self.assertEqual(self.client.get(self.url).json()["count"], 4)
+        address.delete()
+        Address.objects.first().delete()
+        self.assertEqual(self.client.get(self.url).json()["count"], 2)
+
+    @override_settings(QUERY_N_PLUS_ONE_THRESHOLD=None)
+    def test_count_follows_bulk_writes_v2(self):
+        """
+        Test bulk creates and deletes keep the cached count current.
+        """
+
+        self.client.force_authenticate(user=mommy.make("users.User"))
+        bulk_url = reverse("api_users:addresses-bulk", args=["v2"])
+        self.client.get(self.url)
+        response = self.client.post(
+            bulk_url,
+            [
+                {
+                    "address1": "Depot",
+                    "city": "Nairobi",
+                    "postcode": "00100",
+                    "country": "KE",
+                }
+            ]
+            * 2,
+            format="json",
+        )
+        self.assertEqual(self.client.get(self.url).json()["count"], 5)
+        self.client.delete(
+            bulk_url,
+            [address["id"] for address in response.json()],
+            format="json",
+        )
+        self.assertEqual(self.client.get(self.url).json()["count"], 3)
+
+    def test_count_ignores_rolled_back_writes_v2(self):
+        """
+        Test rows created and deleted in a rolled back transaction leave
+        the cached count alone.
+        """
+
+        self.client.get(self.url)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                mommy.make("users.Address", _quantity=5)
+                Address.objects.first().delete()
+                raise RuntimeError
+        self.assertEqual(self.client.get(self.url).json()["count"], 3)
+
+    def test_exact_count_v2(self):
+        """
+        Test `exact_count` bypasses a stale cached count.
+        """
+
+        cache.set(count_cache_key(Address), 1000)
+        self.assertEqual(self.client.get(self.url).json()["count"], 1000)
+        response = self.client.get(self.url, {"exact_count": "1"})
+        self.assertEqual(response.json()["count"], 3)
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.profiling import sign_profile_request
+
+
+class ProfilingTestCase(APITestCase):
+    """
+    Test suite for the sampled profiling of requests.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.profiling_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiling_dir)
+        self.settings_override = override_settings(
+            PROFILING_DIR=self.profiling_dir, PROFILING_INTERVAL=0.0005
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        mommy.make("users.User", _quantity=3)
+        self.client = APIClient()
+        self.url = reverse("api_users:profiles-list", args=["v2"])
+
+    def profiles(self):
+        return sorted(os.listdir(self.profiling_dir))
+
+    def test_not_profiled_by_default(self):
+        """
+        Test requests are not profiled without sampling or header.
+        """
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.profiles(), [])
+
+    def test_signed_header(self):
+        """
+        Test requests with a signed header are profiled.
+        """
+
+        with self.assertLogs(
+            "transportation_suppliers.users.middleware", "INFO"
+        ) as logs:
+            response = self.client.get(
+                self.url, HTTP_X_PROFILE=sign_profile_request()
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("(api_users:profiles-list)", logs.output[0])
+
+        collapsed, summary = self.profiles()
+        self.assertRegex(
+            collapsed, r"-api_users-profiles-list-\d+-\d+\.collapsed$"
+        )
+        with open(os.path.join(self.profiling_dir, summary)) as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(summary["view"], "api_users:profiles-list")
+        self.assertEqual(summary["status"], 200)
+        self.assertGreater(summary["sql_queries"], 0)
+        self.assertEqual(
+            set(summary["breakdown_ms"]),
+            {"sql", "serializer", "view", "middleware"},
+        )
+
+        with open(os.path.join(self.profiling_dir, collapsed)) as stacks:
+            lines = stacks.read().splitlines()
+        self.assertEqual(len(lines) > 0, summary["samples"] > 0)
+        for line in lines:
+            frames, count = line.rsplit(" ", 1)
+            self.assertTrue(frames.startswith("api_users:profiles-list;"))
+            self.assertGreater(int(count), 0)
+
+    def test_forged_header(self):
+        """
+        Test requests with an invalid signature are not profiled.
+        """
+
+        response = self.client.get(self.url, HTTP_X_PROFILE="profile:forged")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sample_rate(self):
+        """
+        Test sampled requests are profiled.
+        """
+
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(len(self.profiles()), 4)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_PROFILES=2)
+    def test_old_profiles_are_pruned(self):
+        """
+        Test only the latest profiles are kept.
+        """
+
+        for _ in range(3):
+            self.client.get(self.url)
+        self.client.get(reverse("api_users:addresses-list", args=["v2"]))
+        collapsed = [name for name in self.profiles() if "collapsed" in name]
+        self.assertEqual(len(self.profiles()), 4)
+        self.assertEqual(len(collapsed), 2)
+        self.assertTrue(
+            any("-api_users-addresses-list-" in name for name in collapsed)
+        )
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.db.queries import QueryBudgetExceeded
+from transportation_suppliers.users.api.views import (
+    ProfileViewSet,
+    UserViewSet,
+)
+from transportation_suppliers.users.models import User
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Test suite for the query budgets of the API views.
+
+    The test settings make QueryBudgetMiddleware raise for every request
+    over its budget, these tests check it catches regressions.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        for user in mommy.make("users.User", _quantity=3):
+            user.addresses.set(mommy.make("users.Address", _quantity=2))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+
+    def test_query_count_header(self):
+        """
+        Test responses report the number of queries they ran.
+        """
+
+        response = self.client.get(
+            reverse("api_users:addresses-list", args=["v1"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(int(response["X-Query-Count"]), 0)
+
+    @override_settings(
+        API_COMPILED_SERIALIZERS=False, API_RESPONSE_CACHE_TIMEOUT=0
+    )
+    def test_n_plus_one_query(self):
+        """
+        Test listing profiles without prefetching their addresses is caught.
+        """
+
+        queryset = User.objects.order_by("-date_joined")
+        with mock.patch.object(ProfileViewSet, "queryset", queryset):
+            with self.assertRaisesRegex(QueryBudgetExceeded, "N\\+1 query"):
+                self.client.get(
+                    reverse("api_users:profiles-list", args=["v2"])
+                )
+
+    def test_over_budget(self):
+        """
+        Test a view running more queries than its budget is caught.
+        """
+
+        budgets = dict(UserViewSet.query_budgets, list=1)
+        with mock.patch.object(UserViewSet, "query_budgets", budgets):
+            with self.assertRaisesRegex(
+                QueryBudgetExceeded, "over the budget of 1"
+            ):
+                self.client.get(reverse("api_users:user-list", args=["v1"]))
+
+    @override_settings(QUERY_BUDGETS_STRICT=False)
+    def test_over_budget_logged(self):
+        """
+        Test requests over their budget are logged outside strict mode.
+        """
+
+        budgets = dict(UserViewSet.query_budgets, retrieve=1)
+        with mock.patch.object(UserViewSet, "query_budgets", budgets):
+            with self.assertLogs(
+                "transportation_suppliers.users.middleware", "WARNING"
+            ) as logs:
+                response = self.client.get(
+                    reverse(
+                        "api_users:user-detail",
+                        args=["v1", self.new_user.pk],
+                    )
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("GET /api/", logs.output[0])
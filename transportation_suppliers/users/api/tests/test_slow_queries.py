@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.db import slow_queries
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.001)
+class SlowQueryTestCase(APITestCase):
+    """
+    Test suite for the slow query log.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        slow_queries.clear_slow_queries()
+        self.addCleanup(slow_queries.clear_slow_queries)
+
+        user = mommy.make("users.User")
+        user.addresses.set(mommy.make("users.Address", _quantity=2))
+        self.client = APIClient()
+        self.url = reverse("api_users:profiles-list", args=["v2"])
+
+    def test_recorded(self):
+        """
+        Test slow queries are logged and added up by fingerprint with their
+        view and serializer.
+        """
+
+        with self.assertLogs(
+            "transportation_suppliers.db.slow_queries", "WARNING"
+        ) as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("api_users:profiles-list", logs.output[0])
+
+        entries = slow_queries.get_slow_queries()
+        self.assertTrue(entries)
+        for entry in entries:
+            self.assertEqual(entry["count"], 1)
+            self.assertEqual(entry["views"], {"api_users:profiles-list": 1})
+            self.assertIsNone(entry["plan"])
+        self.assertIn(
+            {"ProfileSerializer": 1},
+            [entry["serializers"] for entry in entries],
+        )
+
+    def test_recorded_concurrently(self):
+        """
+        Test slow queries recorded by several threads at once are all
+        counted.
+        """
+
+        def record(index):
+            slow_queries.record_slow_query(
+                "default",
+                "SELECT * FROM users_user WHERE id = %s",
+                [index],
+                0.25,
+                "api_users:users-list",
+                "UserSerializer",
+            )
+
+        with self.assertLogs("transportation_suppliers.db.slow_queries"):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(record, range(40)))
+
+        [entry] = slow_queries.get_slow_queries()
+        self.assertEqual(entry["count"], 40)
+        self.assertEqual(entry["total_ms"], 10000)
+        self.assertEqual(entry["max_ms"], 250)
+        self.assertEqual(entry["views"], {"api_users:users-list": 40})
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_disabled(self):
+        """
+        Test no query is recorded with a threshold of 0.
+        """
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(slow_queries.get_slow_queries(), [])
+
+    @override_settings(SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1.0)
+    def test_explained(self):
+        """
+        Test sampled slow queries are explained on a background thread.
+        """
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The single worker runs the queued explains in order.
+        slow_queries._explain_executor.submit(lambda: None).result()
+
+        plans = [entry["plan"] for entry in slow_queries.get_slow_queries()]
+        self.assertTrue(any(plans))
+
+    def test_normalize(self):
+        """
+        Test queries differing in their literals and parameter lists share
+        a fingerprint.
+        """
+
+        self.assertEqual(
+            slow_queries.normalize(
+                'SELECT "a1" FROM t WHERE id IN (%s, %s)\n'
+                "AND name = 'it''s' LIMIT 21"
+            ),
+            'SELECT "a1" FROM t WHERE id IN (%s, ...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT * FROM t LIMIT 10 OFFSET 20"),
+            slow_queries.fingerprint("SELECT * FROM t LIMIT 20 OFFSET 40"),
+        )
@@ -0,0 +1,135 @@
+from django.core.handlers.base import BaseHandler
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse as django_reverse
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework import status
+
+from model_mommy import mommy
+
+from transportation_suppliers.users.api.mixins import AtomicWritesMixin
+from transportation_suppliers.users.api.views import AddressViewSet
+
+
+def transaction_queries(context):
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if "SAVEPOINT" in query["sql"]
+    ]
+
+
+class AtomicWritesTestCase(APITestCase):
+    """
+    Test suite for the transaction policy of the API.
+
+    Test cases run in a transaction, so the transaction `ATOMIC_REQUESTS`
+    opens for a request shows up as SAVEPOINT/RELEASE SAVEPOINT queries.
+    """
+
+    def setUp(self):
+        """
+        Define the test client and other test variables.
+        """
+
+        self.new_user = mommy.make("users.User")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.new_user)
+
+    def test_reads_are_not_atomic(self):
+        """
+        Test an address list costs two queries less than with
+        ATOMIC_REQUESTS.
+        """
+
+        mommy.make("users.Address", _quantity=3)
+        request = APIRequestFactory().get(
+            reverse("api_users:addresses-list", args=["v2"])
+        )
+        handler = BaseHandler()
+        atomic_view = handler.make_view_atomic(
+            super(AtomicWritesMixin, AddressViewSet).as_view({"get": "list"})
+        )
+        view = handler.make_view_atomic(
+            AddressViewSet.as_view({"get": "list"})
+        )
+        # Cache the count first, both requests then run the same queries.
+        view(request, version="v2")
+
+        with CaptureQueriesContext(connection) as before:
+            response = atomic_view(request, version="v2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as after:
+            response = view(request, version="v2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(transaction_queries(before)), 2)
+        self.assertEqual(transaction_queries(after), [])
+        self.assertEqual(
+            len(after.captured_queries), len(before.captured_queries) - 2
+        )
+
+    def test_safe_methods_are_not_atomic(self):
+        """
+        Test GET, HEAD and OPTIONS requests open no transaction.
+        """
+
+        urls = [
+            reverse("api_users:profiles-detail", args=["v2", "missing"]),
+            reverse("api_users:profiles-list", args=["v2"]),
+            reverse("api_users:addresses-list", args=["v2"]),
+            reverse("api_users:user-list", args=["v2"]),
+            django_reverse("swagger-ui"),
+            django_reverse(
+                "users:detail", kwargs={"username": self.new_user.username}
+            ),
+        ]
+        self.client.force_login(self.new_user)
+        for url in urls:
+            for method in ("get", "head", "options"):
+                # REST framework rolls back the open atomic block on
+                # errors, keep it from being the test case's own one.
+                with transaction.atomic(), CaptureQueriesContext(
+                    connection
+                ) as context:
+                    getattr(self.client, method)(url)
+                self.assertEqual(transaction_queries(context), [], url)
+
+    def test_writes_are_atomic(self):
+        """
+        Test writes still run in a transaction.
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse("api_users:addresses-list", args=["v2"]),
+                {
+                    "address1": "Moi Avenue",
+                    "city": "Nairobi",
+                    "postcode": "00100",
+                    "country": "KE",
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(transaction_queries(context)), 2)
+
+    def test_failed_writes_are_rolled_back(self):
+        """
+        Test a write failing after a query rolls its changes back.
+        """
+
+        address = mommy.make("users.Address", city="Nairobi")
+        url = reverse("api_users:addresses-bulk", args=["v2"])
+        response = self.client.patch(
+            url,
+            [
+                {"id": address.id, "city": "Mombasa"},
+                {"id": address.id + 1000, "city": "Kisumu"},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        address.refresh_from_db()
+        self.assertEqual(address.city, "Nairobi")
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework import routers
 
 from transportation_suppliers.users.api import views
@@ -11,4 +11,11 @@ router_users.register("profiles", views.ProfileViewSet, "profiles")
 router_users.register("addresses", views.AddressViewSet, "addresses")
 
 
-urlpatterns = [path("", include(router_users.urls))]
+urlpatterns = [
+    re_path(
+        r"^export/(?P<kind>profiles|addresses)\.(?P<file_format>ndjson|csv)$",
+        views.ExportView.as_view(),
+        name="export",
+    ),
+    path("", include(router_users.urls)),
+]
@@ -1,11 +1,44 @@
-from transportation_suppliers.users.models import User, Address
-from transportation_suppliers.users.api import serializers
+from datetime import timedelta
 
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 
-from rest_framework import viewsets
+from transportation_suppliers.users import exports
+from transportation_suppliers.users.models import ApiToken, User, Address
+from transportation_suppliers.users.signals import addresses_bulk_deleted
+from transportation_suppliers.users.api import (
+    caching,
+    pagination,
+    serializers,
+)
+from transportation_suppliers.users.api.mixins import (
+    AtomicWritesMixin,
+    CompiledListMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    ReplicaReadsMixin,
+    ResponseCacheMixin,
+    SparseFieldsetMixin,
+)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+from rest_framework import permissions, status, views, viewsets
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+
+
+class UserViewSet(
+    AtomicWritesMixin,
+    SparseFieldsetMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     """
     # Manage Personal Details.
 
@@ -16,6 +49,17 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.prefetch_related("addresses").order_by(
         "-date_joined"
     )
+    # Per action: the queries measured in the tests, plus the two of
+    # session authentication.
+    query_budgets = {
+        "list": 7,
+        "retrieve": 6,
+        "create": 6,
+        "update": 10,
+        "partial_update": 10,
+        # The delete collector reads every related table first.
+        "destroy": 16,
+    }
 
     def get_serializer_class(self):
         if self.request.version == "v1":
@@ -23,36 +67,74 @@ class UserViewSet(viewsets.ModelViewSet):
         return serializers.UserSerializer
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.is_authenticated:
             try:
-                return self.queryset.filter(id=self.request.user.id)
+                return queryset.filter(id=self.request.user.id)
             except Exception:
-                return self.queryset.none()
+                return queryset.none()
         else:
-            return self.queryset.none()
+            return queryset.none()
 
 
-class ProfileViewSet(viewsets.ReadOnlyModelViewSet):
+class ProfileViewSet(
+    AtomicWritesMixin,
+    ReplicaReadsMixin,
+    SparseFieldsetMixin,
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    KeysetPaginationMixin,
+    CompiledListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """
     # View user profiles.
 
     User can list profiles and get their details using the usernames.
     """
 
-    queryset = User.objects.prefetch_related("addresses").order_by(
-        "-date_joined"
-    )
+    # Addresses are listed in id order, like the compiled list renders them.
+    queryset = User.objects.prefetch_related(
+        Prefetch("addresses", queryset=Address.objects.order_by("id"))
+    ).order_by("-date_joined")
 
     lookup_field = "username"
     lookup_url_kwarg = "username"
+    pagination_class = pagination.CachedCountPagination
+    keyset_pagination_class = pagination.ProfileKeysetPagination
+    query_budgets = {"list": 6, "retrieve": 5}
+    response_cache_prefix = "profiles"
 
     def get_serializer_class(self):
         if self.request.version == "v1":
             return serializers.SimpleProfileSerializer
         return serializers.ProfileSerializer
 
+    def get_conditional_state(self):
+        # The response cache versions already track every change to the
+        # profiles, so validators cost no query while the cache is on.
+        if settings.API_RESPONSE_CACHE_TIMEOUT:
+            return str(self.get_response_cache_version()), None
+        return super().get_conditional_state()
+
+    def get_response_cache_version(self):
+        # HEAD requests have no action, tell a list by its missing lookup.
+        if self.lookup_url_kwarg not in self.kwargs:
+            return caching.get_version(caching.PROFILE_LIST_VERSION_KEY)
+        return caching.get_version(
+            caching.profile_detail_version_key(
+                self.kwargs[self.lookup_url_kwarg]
+            )
+        )
 
-class AddressViewSet(viewsets.ModelViewSet):
+
+class AddressViewSet(
+    AtomicWritesMixin,
+    ReplicaReadsMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    viewsets.ModelViewSet,
+):
     """
     # Manage addresses.
     """
@@ -60,3 +142,186 @@ class AddressViewSet(viewsets.ModelViewSet):
     queryset = Address.objects.all().order_by("-id")
     serializer_class = serializers.AddressSerializer
     queryset = Address.objects.order_by("-id")
+    pagination_class = pagination.CachedCountPagination
+    keyset_pagination_class = pagination.AddressKeysetPagination
+    query_budgets = {
+        "list": 5,
+        "retrieve": 4,
+        "create": 3,
+        "update": 7,
+        "partial_update": 7,
+        "destroy": 9,
+        "bulk": 10,
+    }
+
+    @action(detail=False, methods=["post", "put", "patch", "delete"])
+    @transaction.atomic
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create (POST), update (PUT/PATCH) or delete (DELETE) many addresses
+        in one transaction.
+
+        Creates take a list of addresses, updates a list of addresses with
+        their `id` and deletes a list of ids. Invalid payloads are rejected
+        as a whole with one error object per item, in payload order.
+        """
+        data = self.get_bulk_data()
+
+        if request.method == "POST":
+            serializer = self.get_serializer(data=data, many=True)
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if request.method == "DELETE":
+            self.perform_bulk_destroy(self.get_bulk_instances(data))
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        ids = [
+            item.get("id") if isinstance(item, dict) else None for item in data
+        ]
+        serializer = self.get_serializer(
+            self.get_bulk_instances(ids),
+            data=data,
+            many=True,
+            partial=request.method == "PATCH",
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data)
+
+    def perform_bulk_destroy(self, addresses):
+        """
+        Delete `addresses` and their links to users with a query each.
+
+        The ORM's `delete()` sends `pre_delete`/`post_delete` per address,
+        whose receivers query per address, so the addresses are deleted in
+        SQL and `addresses_bulk_deleted` is sent instead with their users.
+        """
+        if not addresses:
+            return
+        pks = [address.pk for address in addresses]
+        users = list(
+            User.objects.filter(addresses__in=pks)
+            .distinct()
+            .values_list("pk", "username")
+        )
+        # Nothing listens to the deletes of the links, the ORM deletes them
+        # in one query.
+        User.addresses.through.objects.filter(address__in=pks).delete()
+
+        connection = connections[router.db_for_write(Address)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {} WHERE {} IN ({})".format(
+                    connection.ops.quote_name(Address._meta.db_table),
+                    connection.ops.quote_name(Address._meta.pk.column),
+                    ", ".join(["%s"] * len(pks)),
+                ),
+                pks,
+            )
+        addresses_bulk_deleted.send(
+            sender=Address, addresses=addresses, users=users
+        )
+
+    def get_bulk_data(self):
+        data = self.request.data
+        if not isinstance(data, list):
+            raise ValidationError(
+                {"non_field_errors": [_("Expected a list of items.")]}
+            )
+        if len(data) > settings.API_BULK_MAX_ITEMS:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        _("Ensure there are no more than {} items.").format(
+                            settings.API_BULK_MAX_ITEMS
+                        )
+                    ]
+                }
+            )
+        return data
+
+    def get_bulk_instances(self, ids):
+        """
+        Return the addresses with the given ids in payload order, or raise a
+        validation error listing the ids that do not exist.
+        """
+        keys = []
+        for pk in ids:
+            try:
+                keys.append(int(pk))
+            except (TypeError, ValueError):
+                keys.append(None)
+        addresses = self.get_queryset().in_bulk(
+            [key for key in keys if key is not None]
+        )
+
+        errors = []
+        for pk, key in zip(ids, keys):
+            if pk is None:
+                errors.append({"id": [_("This field is required.")]})
+            elif key not in addresses:
+                errors.append(
+                    {
+                        "id": [
+                            _(
+                                'Invalid pk "{}" - object does not exist.'
+                            ).format(pk)
+                        ]
+                    }
+                )
+            else:
+                errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+        return [addresses[key] for key in keys]
+
+
+class ExportView(AtomicWritesMixin, views.APIView):
+    """
+    # Export the supplier directory.
+
+    Streams every profile or address as NDJSON or CSV in one response, e.g.
+    `export/profiles.ndjson` or `export/addresses.csv`.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, kind, file_format, *args, **kwargs):
+        content_type = exports.FORMATS[file_format][0]
+        response = StreamingHttpResponse(
+            exports.iter_export(kind, file_format),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{kind}.{file_format}"'
+        )
+        return response
+
+
+class ObtainApiTokenView(AtomicWritesMixin, ObtainAuthToken):
+    """
+    # Obtain an API token.
+
+    Post a username and password to get a token valid for
+    `API_TOKEN_LIFETIME` seconds. Send it as `Authorization: Token <token>`.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        api_token, token = ApiToken.objects.issue(
+            serializer.validated_data["user"],
+            timedelta(seconds=settings.API_TOKEN_LIFETIME),
+        )
+        return Response(
+            {
+                "token": token,
+                "expires_at": DateTimeField().to_representation(
+                    api_token.expires_at
+                ),
+            }
+        )
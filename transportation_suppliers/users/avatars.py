@@ -0,0 +1,172 @@
+"""
+Avatar renditions.
+
+Uploaded avatars are stored as sent, often megabytes. When a user's avatar
+changes, a rendition of every `AVATAR_RENDITION_SIZES` size is made in
+WebP and JPEG on a background thread, once the transaction commits, and
+their common path prefix is saved in `User.avatar_renditions`. The
+serializers link to them, see `rendition_urls`, so clients showing an
+avatar as a list thumbnail download a few kilobytes. The renditions of a
+replaced avatar, or of a deleted user, are deleted once that commits.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from transportation_suppliers.users.models import User
+
+
+logger = logging.getLogger(__name__)
+
+# Extensions of the renditions and their Pillow formats.
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="avatar")
+
+
+def rendition_prefix(avatar_name):
+    """
+    Return the path prefix of the renditions of the avatar `avatar_name`.
+    """
+    directory, filename = posixpath.split(avatar_name)
+    return posixpath.join(
+        directory, "renditions", posixpath.splitext(filename)[0]
+    )
+
+
+def rendition_name(prefix, size_name, extension):
+    return f"{prefix}-{size_name}.{extension}"
+
+
+def rendition_urls(prefix):
+    """
+    Return the URLs of the renditions under `prefix`, by size name and
+    extension.
+    """
+    return {
+        size_name: {
+            extension: default_storage.url(
+                rendition_name(prefix, size_name, extension)
+            )
+            for extension in FORMATS
+        }
+        for size_name in settings.AVATAR_RENDITION_SIZES
+    }
+
+
+def make_renditions(avatar_name):
+    """
+    Save the renditions of the avatar `avatar_name` and return their
+    prefix.
+    """
+    with default_storage.open(avatar_name) as avatar:
+        image = Image.open(avatar)
+        image.load()
+    # Phones store the orientation of photos in their EXIF data.
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    prefix = rendition_prefix(avatar_name)
+    for size_name, size in settings.AVATAR_RENDITION_SIZES.items():
+        rendition = image.copy()
+        rendition.thumbnail((size, size), Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            output = rendition
+            if image_format == "JPEG" and output.mode == "RGBA":
+                output = Image.new("RGB", output.size, "white")
+                output.paste(rendition, mask=rendition.getchannel("A"))
+            content = BytesIO()
+            output.save(
+                content,
+                image_format,
+                quality=settings.AVATAR_RENDITION_QUALITY,
+                optimize=True,
+            )
+            name = rendition_name(prefix, size_name, extension)
+            # Renditions are made again by `manage.py render_avatars`.
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(content.getvalue()))
+    return prefix
+
+
+def delete_renditions(prefix):
+    """
+    Delete the renditions under `prefix`.
+    """
+    for size_name in settings.AVATAR_RENDITION_SIZES:
+        for extension in FORMATS:
+            default_storage.delete(
+                rendition_name(prefix, size_name, extension)
+            )
+
+
+def render_avatar(user_pk, avatar_name, stale_prefix=""):
+    """
+    Make the renditions of a user's avatar and save their prefix, unless
+    the avatar changed in the meantime, then delete the renditions under
+    `stale_prefix`, of the avatar it replaced, once that commits.
+    """
+    prefix = make_renditions(avatar_name)
+    stale_prefixes = {stale_prefix} - {"", prefix}
+    with transaction.atomic():
+        user = User.objects.filter(pk=user_pk, avatar=avatar_name).first()
+        if user is None:
+            # Nothing links to the renditions just made.
+            stale_prefixes.add(prefix)
+        else:
+            # Saved to invalidate the cached profiles and date them.
+            user.avatar_renditions = prefix
+            user.save(update_fields=["avatar_renditions", "updated_at"])
+
+        def delete_stale():
+            for stale in stale_prefixes:
+                delete_renditions(stale)
+
+        transaction.on_commit(delete_stale)
+
+
+def schedule_render_avatar(user_pk, avatar_name, stale_prefix=""):
+    """
+    Make the renditions of a user's avatar on the background thread once
+    the current transaction commits, and delete those under
+    `stale_prefix`.
+    """
+    transaction.on_commit(
+        lambda: _executor.submit(
+            _render_avatar, user_pk, avatar_name, stale_prefix
+        )
+    )
+
+
+def schedule_delete_renditions(prefix):
+    """
+    Delete the renditions under `prefix` on the background thread once the
+    current transaction commits.
+    """
+    transaction.on_commit(lambda: _executor.submit(_delete_renditions, prefix))
+
+
+def _render_avatar(user_pk, avatar_name, stale_prefix):
+    try:
+        render_avatar(user_pk, avatar_name, stale_prefix)
+    except Exception:
+        logger.exception("Cannot make the renditions of %s", avatar_name)
+    finally:
+        # The thread's connections are not closed at the end of a request.
+        connections.close_all()
+
+
+def _delete_renditions(prefix):
+    try:
+        delete_renditions(prefix)
+    except Exception:
+        logger.exception("Cannot delete the renditions %s", prefix)
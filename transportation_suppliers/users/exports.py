@@ -0,0 +1,162 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from typing import Any, DefaultDict, List, Sequence
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.fields import DateTimeField
+
+from transportation_suppliers.users.models import Address, User
+
+
+PROFILE_EXPORT_FIELDS = [
+    "id",
+    "username",
+    "first_name",
+    "last_name",
+    "name",
+    "avatar",
+    "bio",
+    "salutation",
+    "gender",
+    "date_joined",
+    "addresses",
+]
+ADDRESS_EXPORT_FIELDS = [
+    "id",
+    "address1",
+    "address2",
+    "area",
+    "city",
+    "county",
+    "postcode",
+    "country",
+]
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Formats dates exactly like the API does.
+_date_joined_field = DateTimeField()
+
+
+def iter_profiles(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield every profile as a dict, with the ids of its addresses.
+
+    Users are read through a server-side cursor; the addresses of each
+    chunk of users are fetched with one extra query, so memory use only
+    depends on `chunk_size`.
+    """
+    fields = [field for field in PROFILE_EXPORT_FIELDS if field != "addresses"]
+    rows = (
+        User.objects.order_by("id")
+        .values(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in chunks(rows, chunk_size):
+        addresses: DefaultDict[int, List[int]] = defaultdict(list)
+        links = (
+            User.addresses.through.objects.filter(
+                user_id__in=[row["id"] for row in chunk]
+            )
+            .order_by("address_id")
+            .values_list("user_id", "address_id")
+        )
+        for user_id, address_id in links:
+            addresses[user_id].append(address_id)
+
+        for row in chunk:
+            if row["avatar"]:
+                row["avatar"] = default_storage.url(row["avatar"])
+            else:
+                row["avatar"] = None
+            row["date_joined"] = _date_joined_field.to_representation(
+                row["date_joined"]
+            )
+            row["addresses"] = addresses[row["id"]]
+            yield row
+
+
+def iter_addresses(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield every address as a dict, read through a server-side cursor.
+    """
+    return (
+        Address.objects.order_by("id")
+        .values(*ADDRESS_EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+EXPORTS = {
+    "profiles": (iter_profiles, PROFILE_EXPORT_FIELDS),
+    "addresses": (iter_addresses, ADDRESS_EXPORT_FIELDS),
+}
+
+
+def iter_ndjson(rows, fields=None):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_csv(rows, fields):
+    echo = _Echo()
+    writer = csv.writer(echo)
+    yield _csv_line(writer, echo, fields)
+    for row in rows:
+        yield _csv_line(
+            writer,
+            echo,
+            [
+                (
+                    ";".join(str(item) for item in row[field])
+                    if isinstance(row[field], list)
+                    else row[field]
+                )
+                for field in fields
+            ],
+        )
+
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", iter_ndjson),
+    "csv": ("text/csv", iter_csv),
+}
+
+
+def iter_export(kind, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the lines of the `kind` export ("profiles" or "addresses") in
+    `file_format` ("ndjson" or "csv").
+    """
+    iter_rows, fields = EXPORTS[kind]
+    iter_lines = FORMATS[file_format][1]
+    return iter_lines(iter_rows(chunk_size=chunk_size), fields)
+
+
+class _Echo:
+    """
+    File-like object keeping the last line `csv.writer` writes to it.
+    """
+
+    line = ""
+
+    def write(self, value: str) -> str:
+        self.line = value
+        return value
+
+
+def _csv_line(writer: Any, echo: _Echo, values: Sequence[Any]) -> str:
+    writer.writerow(values)
+    return echo.line
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
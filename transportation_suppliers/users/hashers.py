@@ -0,0 +1,152 @@
+"""
+Argon2 password hashing in a bounded pool of worker processes.
+
+Hashing a password on purpose costs tens of milliseconds of CPU and
+megabytes of memory. When many users log in at once, running the hashes
+in a fixed pool of processes bounds the CPU and memory they take on a
+host, instead of every request thread hashing at the same time. Requests
+wait for the pool rather than compete with it.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+# Cost profiles as `(time_cost, memory_cost in KiB, parallelism)`. Their
+# latency depends on the hardware, measure it (and find costs meeting a
+# target latency) with `manage.py calibrate_argon2`.
+ARGON2_PROFILES = {
+    # Django 2.2's defaults, which existing hashes were made with.
+    "django": (2, 512, 2),
+    # OWASP's minimum recommendation for Argon2.
+    "interactive": (2, 19456, 1),
+    # The second recommended option of RFC 9106.
+    "sensitive": (3, 65536, 4),
+}
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            # Bound the queue as well: callers wait here once every worker
+            # has a hash running and another one waiting.
+            _slots = threading.BoundedSemaphore(workers * 2)
+        return _pool, _slots
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def run_in_pool(function, *args):
+    """
+    Return `function(*args)` computed in the hashing pool, or inline when
+    `PASSWORD_HASHING_WORKERS` is 0 or the pool broke.
+    """
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return function(*args)
+    pool, slots = _get_pool()
+    with slots:
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start afresh.
+            _reset_pool()
+            return function(*args)
+
+
+def hash_secret(password, salt, time_cost, memory_cost, parallelism):
+    import argon2
+
+    return argon2.low_level.hash_secret(
+        password,
+        salt,
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        hash_len=argon2.DEFAULT_HASH_LENGTH,
+        type=argon2.low_level.Type.I,
+    )
+
+
+def verify_secret(encoded, password):
+    import argon2
+
+    try:
+        return argon2.low_level.verify_secret(
+            encoded, password, type=argon2.low_level.Type.I
+        )
+    except argon2.exceptions.VerificationError:
+        return False
+
+
+def get_argon2_cost():
+    """
+    Return the `(time_cost, memory_cost, parallelism)` of the configured
+    `ARGON2_PROFILE`, with the explicit `ARGON2_*_COST` settings applied.
+    """
+    time_cost, memory_cost, parallelism = ARGON2_PROFILES[
+        settings.ARGON2_PROFILE
+    ]
+    return (
+        settings.ARGON2_TIME_COST or time_cost,
+        settings.ARGON2_MEMORY_COST or memory_cost,
+        settings.ARGON2_PARALLELISM or parallelism,
+    )
+
+
+class PooledArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    `Argon2PasswordHasher` hashing in the bounded process pool, with the
+    costs of the configured profile.
+
+    Hashes are compatible with Django's hasher; those made with other costs
+    are upgraded on the user's next login.
+    """
+
+    @property
+    def time_cost(self):
+        return get_argon2_cost()[0]
+
+    @property
+    def memory_cost(self):
+        return get_argon2_cost()[1]
+
+    @property
+    def parallelism(self):
+        return get_argon2_cost()[2]
+
+    def encode(self, password, salt):
+        self._load_library()
+        time_cost, memory_cost, parallelism = get_argon2_cost()
+        data = run_in_pool(
+            hash_secret,
+            password.encode(),
+            salt.encode(),
+            time_cost,
+            memory_cost,
+            parallelism,
+        )
+        return self.algorithm + data.decode("ascii")
+
+    def verify(self, password, encoded):
+        self._load_library()
+        algorithm, rest = encoded.split("$", 1)
+        assert algorithm == self.algorithm
+        return run_in_pool(
+            verify_secret, ("$" + rest).encode("ascii"), password.encode()
+        )
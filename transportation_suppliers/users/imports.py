@@ -0,0 +1,297 @@
+import csv
+import io
+import json
+from collections import Counter
+from typing import Any, Dict, Set, Tuple, Type
+
+from django.core.management.color import no_style
+from django.db import connections, models, router, transaction
+from rest_framework import serializers
+
+from transportation_suppliers.users.api.serializers import (
+    AddressSerializer,
+    UserSerializer,
+)
+from transportation_suppliers.users.models import Address, User
+
+
+class AddressImportSerializer(AddressSerializer):
+    """
+    `AddressSerializer` accepting the ids of the source system.
+    """
+
+    id = serializers.IntegerField(required=False, min_value=1)
+
+
+class UserImportSerializer(UserSerializer):
+    """
+    `UserSerializer` for imports.
+
+    Username uniqueness and the existence of the addresses are checked for
+    a whole batch at once by `validate_batch`, instead of one query per
+    row and address.
+    """
+
+    id = serializers.IntegerField(required=False, min_value=1)
+    date_joined = serializers.DateTimeField(required=False)
+    addresses = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False
+    )
+
+    class Meta(UserSerializer.Meta):
+        fields = [
+            field
+            for field in UserSerializer.Meta.fields
+            if field not in ("avatar", "addresses_nested")
+        ]
+        extra_kwargs = {
+            "username": {
+                "validators": User._meta.get_field("username").validators
+            }
+        }
+
+
+# Model and serializer of each kind of row.
+IMPORTS: Dict[
+    str, Tuple[Type[models.Model], Type[serializers.ModelSerializer]]
+] = {
+    "addresses": (Address, AddressImportSerializer),
+    "users": (User, UserImportSerializer),
+}
+
+
+def read_rows(path, file_format):
+    """
+    Yield the rows of an NDJSON or CSV file (as written by
+    `export_directory`) as dicts, without empty values.
+    """
+    with open(path, newline="") as source:
+        if file_format == "csv":
+            rows = (_csv_row(row) for row in csv.DictReader(source))
+        else:
+            rows = (json.loads(line) for line in source if line.strip())
+        for row in rows:
+            yield {
+                key: value
+                for key, value in row.items()
+                if value not in (None, "")
+            }
+
+
+def _csv_row(csv_row):
+    row: Dict[str, Any] = dict(csv_row)
+    if row.get("addresses"):
+        row["addresses"] = row["addresses"].split(";")
+    return row
+
+
+def validate_batch(kind, rows):
+    """
+    Validate a batch of `(row_number, row)` and return `(valid, errors)`:
+    `(row_number, validated_data)` of the valid rows and
+    `(row_number, errors)` of the others.
+    """
+    model, serializer_class = IMPORTS[kind]
+    valid = []
+    errors = []
+    for row_number, row in rows:
+        serializer = serializer_class(data=row)
+        if serializer.is_valid():
+            valid.append((row_number, serializer.validated_data))
+        else:
+            errors.append((row_number, serializer.errors))
+
+    ids = [data["id"] for row_number, data in valid if "id" in data]
+    existing_ids = set(
+        model.objects.filter(pk__in=ids).values_list("pk", flat=True)
+    )
+    checks = [("id", existing_ids, Counter(ids))]
+    known_address_ids: Set[int] = set()
+    if kind == "users":
+        usernames = [data["username"] for row_number, data in valid]
+        existing_usernames = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        checks.append(("username", existing_usernames, Counter(usernames)))
+        address_ids = {
+            address_id
+            for row_number, data in valid
+            for address_id in data.get("addresses", ())
+        }
+        known_address_ids = set(
+            Address.objects.filter(pk__in=address_ids).values_list(
+                "pk", flat=True
+            )
+        )
+
+    checked = []
+    for row_number, data in valid:
+        row_errors = {}
+        for field, existing, counts in checks:
+            value = data.get(field)
+            if value in existing:
+                row_errors[field] = [f"{value} already exists."]
+            elif value is not None and counts[value] > 1:
+                row_errors[field] = [f"{value} is repeated in the batch."]
+        missing = [
+            address_id
+            for address_id in data.get("addresses", ())
+            if address_id not in known_address_ids
+        ]
+        if missing:
+            row_errors["addresses"] = [
+                f'Invalid pk "{address_id}" - object does not exist.'
+                for address_id in missing
+            ]
+        if row_errors:
+            errors.append((row_number, row_errors))
+        else:
+            checked.append((row_number, data))
+    return checked, errors
+
+
+def unique_keys(kind, row):
+    """
+    Yield the `(field, value)` of a raw row that must be unique in the
+    table, as `validate_batch` will read them.
+    """
+    if "id" in row:
+        try:
+            yield "id", int(row["id"])
+        except (TypeError, ValueError):
+            pass
+    if kind == "users" and isinstance(row.get("username"), str):
+        yield "username", row["username"]
+
+
+def load_batch(kind, validated_data, use_copy=True, batch_size=1000):
+    """
+    Insert validated rows (and the users' addresses) in one transaction,
+    with `COPY` on PostgreSQL and `bulk_create` elsewhere.
+    """
+    model = IMPORTS[kind][0]
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        use_copy = False
+
+    objects = []
+    links = []
+    for data in validated_data:
+        data = dict(data)
+        address_ids = data.pop("addresses", ())
+        obj = model(**data)
+        if kind == "users":
+            obj.set_unusable_password()
+            links.append((obj, address_ids))
+        objects.append(obj)
+
+    with transaction.atomic(using=using):
+        if use_copy:
+            copy_objects(connection, model, objects)
+        else:
+            model.objects.using(using).bulk_create(
+                objects,
+                batch_size=_batch_size(connection, model, objects, batch_size),
+            )
+            if links and any(obj.pk is None for obj in objects):
+                # Only some backends return ids from bulk inserts.
+                ids = dict(
+                    model.objects.using(using)
+                    .filter(username__in=[obj.username for obj in objects])
+                    .values_list("username", "pk")
+                )
+                for obj in objects:
+                    obj.pk = ids[obj.username]
+
+        through = User.addresses.through
+        rows = [
+            through(user_id=user.pk, address_id=address_id)
+            for user, address_ids in links
+            for address_id in address_ids
+        ]
+        if use_copy:
+            copy_objects(connection, through, rows)
+        else:
+            through.objects.using(using).bulk_create(
+                rows,
+                batch_size=_batch_size(connection, through, rows, batch_size),
+            )
+    return len(objects)
+
+
+def reset_sequences(model):
+    """
+    Move the id sequences past ids imported from the source system.
+    """
+    connection = connections[router.db_for_write(model)]
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def copy_objects(connection, model, objects):
+    """
+    Insert model instances with PostgreSQL's `COPY ... FROM STDIN`.
+
+    Instances without a primary key get one from the table's sequence
+    first, so they can be referenced afterwards.
+    """
+    if not objects:
+        return
+    opts = model._meta
+    with connection.cursor() as cursor:
+        new_objects = [obj for obj in objects if obj.pk is None]
+        if new_objects:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [opts.db_table, opts.pk.column, len(new_objects)],
+            )
+            for obj, (pk,) in zip(new_objects, cursor.fetchall()):
+                obj.pk = pk
+
+        fields = opts.concrete_fields
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objects:
+            writer.writerow(
+                [
+                    _copy_value(
+                        field.get_db_prep_save(
+                            field.pre_save(obj, add=True), connection
+                        )
+                    )
+                    for field in fields
+                ]
+            )
+        buffer.seek(0)
+        # The raw cursor's errors are not turned into Django's otherwise.
+        with connection.wrap_database_errors:
+            cursor.copy_expert(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+                    connection.ops.quote_name(opts.db_table),
+                    ", ".join(
+                        connection.ops.quote_name(field.column)
+                        for field in fields
+                    ),
+                ),
+                buffer,
+            )
+
+
+def _batch_size(connection, model, objects, batch_size):
+    # Django 2.2 does not cap the batch size at the limits of the backend,
+    # like the number of parameters of a query on SQLite.
+    limit = connection.ops.bulk_batch_size(
+        model._meta.concrete_fields, objects
+    )
+    return min(batch_size, limit) if limit else batch_size
+
+
+def _copy_value(value):
+    return "\\N" if value is None else value
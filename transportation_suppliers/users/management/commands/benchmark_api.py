@@ -0,0 +1,506 @@
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, router, transaction
+from django.db.models import Max, Min
+from django.test import override_settings
+from django.utils import timezone
+from factory import build
+from factory.random import reseed_random
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from transportation_suppliers.db.queries import QueryRecorder
+from transportation_suppliers.users import imports
+from transportation_suppliers.users.api.caching import invalidate_profiles
+from transportation_suppliers.users.api.pagination import count_cache_key
+from transportation_suppliers.users.management.commands.load_benchmark import (
+    percentile,
+)
+from transportation_suppliers.users.models import Address, ApiToken, User
+from transportation_suppliers.users.tests.factories import (
+    AddressFactory,
+    UserFactory,
+)
+
+
+USERNAME_PREFIX = "bench-"
+BULK_ITEMS = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a reproducible dataset of users and addresses (with the test "
+        "factories, so the local requirements are needed) and time every "
+        "action of the users, profiles and addresses API in process, one "
+        "request at a time. Writes are rolled back. Run it against a "
+        "dedicated database; the dataset is kept for the next run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=10000,
+            help="Users in the dataset, e.g. 10000, 100000 or 1000000.",
+        )
+        parser.add_argument(
+            "--addresses-per-user",
+            type=int,
+            default=2,
+            help="Addresses of each user in the dataset.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the dataset and of the requested rows.",
+        )
+        parser.add_argument(
+            "--reseed",
+            action="store_true",
+            help="Seed the dataset again even if it has the right size.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Users inserted per transaction while seeding.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Timed requests per action and version.",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Untimed requests per action and version sent first.",
+        )
+        parser.add_argument(
+            "--api-version",
+            dest="versions",
+            action="append",
+            choices=["v1", "v2"],
+            help="API version to time, repeat for several. Defaults to "
+            "both.",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host of the requests, one of ALLOWED_HOSTS.",
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON results of an earlier run, e.g. of another commit, "
+            "to print the latency changes against.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["requests"] < 1:
+            raise CommandError("--users and --requests must be positive.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        dataset_size = (options["users"], options["addresses_per_user"])
+        if options["reseed"] or get_dataset_size() != dataset_size:
+            started = time.monotonic()
+            seed_dataset(
+                options["users"],
+                options["addresses_per_user"],
+                options["seed"],
+                options["batch_size"],
+            )
+            self.stdout.write(
+                "Seeded {} users and {} addresses in {:.1f}s.".format(
+                    options["users"],
+                    options["users"] * options["addresses_per_user"],
+                    time.monotonic() - started,
+                )
+            )
+
+        client = APIClient(HTTP_HOST=options["host"])
+        client.force_authenticate(user=User.objects.get(username=username(1)))
+        rng = random.Random(options["seed"])
+        results = []
+        for version in options["versions"] or ["v1", "v2"]:
+            for case in get_cases(version, options["users"], rng):
+                result = time_case(
+                    client, case, options["requests"], options["warmup"]
+                )
+                results.append(result)
+                self.stdout.write(format_result(result))
+                if result["errors"]:
+                    self.stderr.write(
+                        "{}: statuses {}".format(
+                            result["name"], result["statuses"]
+                        )
+                    )
+
+        report = {
+            "commit": get_commit(),
+            "created": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "dataset": {
+                "users": options["users"],
+                "addresses_per_user": options["addresses_per_user"],
+                "seed": options["seed"],
+            },
+            "requests": options["requests"],
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}.")
+            )
+        if baseline is not None:
+            for line in compare(baseline, report):
+                self.stdout.write(line)
+
+
+def username(index):
+    return f"{USERNAME_PREFIX}{index:07d}"
+
+
+def get_dataset_size():
+    """
+    Return the users of the seeded dataset and the addresses of its first
+    user.
+    """
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    first = users.filter(username=username(1)).first()
+    return users.count(), first.addresses.count() if first else 0
+
+
+def seed_dataset(users, addresses_per_user, seed, batch_size):
+    """
+    Replace the dataset with `users` users from `UserFactory`, each with
+    `addresses_per_user` addresses from `AddressFactory`.
+
+    The factories are seeded, so the same options give the same rows.
+    Rows are inserted like `import_directory` does, without signals.
+    """
+    delete_dataset()
+    reseed_random(seed)
+    address_id = (Address.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+    # The users get unusable passwords, skip the slow hashers.
+    with override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+    ):
+        for start in range(1, users + 1, batch_size):
+            addresses = []
+            rows = []
+            for index in range(start, min(start + batch_size, users + 1)):
+                user = UserFactory.build(username=username(index))
+                address_ids = []
+                for _ in range(addresses_per_user):
+                    address = build(dict, FACTORY_CLASS=AddressFactory)
+                    address["id"] = address_id
+                    addresses.append(address)
+                    address_ids.append(address_id)
+                    address_id += 1
+                rows.append(
+                    {
+                        "username": user.username,
+                        "email": user.email,
+                        "name": user.name,
+                        "addresses": address_ids,
+                    }
+                )
+            imports.load_batch("addresses", addresses)
+            imports.load_batch("users", rows)
+
+    imports.reset_sequences(Address)
+    # Bulk inserts send no signals, drop what they would have updated.
+    _forget_cached_counts()
+    invalidate_profiles()
+
+
+def delete_dataset():
+    """
+    Delete the dataset's users and addresses in a few queries.
+
+    The ORM's `delete()` sends `pre_delete`/`post_delete` per row, whose
+    receivers query per address, so the rows are deleted in SQL, each
+    table with one statement selecting the dataset's rows in a subquery,
+    and the caches the receivers update are invalidated once the
+    transaction commits.
+    """
+    dataset = {"user__username__startswith": USERNAME_PREFIX}
+    usernames = list(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).values_list(
+            "username", flat=True
+        )
+    )
+    using = router.db_for_write(User)
+    conn = connections[using]
+    quote_name = conn.ops.quote_name
+    links = User.addresses.through
+    dataset_users = "SELECT {} FROM {} WHERE {} LIKE %s".format(
+        quote_name(User._meta.pk.column),
+        quote_name(User._meta.db_table),
+        quote_name(User._meta.get_field("username").column),
+    )
+    with transaction.atomic(using=using):
+        # Tokens are dropped from the token caches by their receivers.
+        Token.objects.filter(**dataset).delete()
+        ApiToken.objects.filter(**dataset).delete()
+        with conn.cursor() as cursor:
+            # Foreign keys are checked when the transaction commits.
+            cursor.execute(
+                "DELETE FROM {} WHERE {} IN (SELECT {} FROM {} WHERE {} IN "
+                "({}))".format(
+                    quote_name(Address._meta.db_table),
+                    quote_name(Address._meta.pk.column),
+                    quote_name(links._meta.get_field("address").column),
+                    quote_name(links._meta.db_table),
+                    quote_name(links._meta.get_field("user").column),
+                    dataset_users,
+                ),
+                [f"{USERNAME_PREFIX}%"],
+            )
+        # Nothing listens to the deletes of the links, the ORM deletes them
+        # in one query.
+        links.objects.filter(**dataset).delete()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {} WHERE {} LIKE %s".format(
+                    quote_name(User._meta.db_table),
+                    quote_name(User._meta.get_field("username").column),
+                ),
+                [f"{USERNAME_PREFIX}%"],
+            )
+        transaction.on_commit(_forget_cached_counts, using=using)
+        invalidate_profiles(usernames)
+
+
+def _forget_cached_counts():
+    cache.delete(count_cache_key(Address))
+    cache.delete(count_cache_key(User))
+
+
+def get_cases(version, users, rng):
+    """
+    Return the requests to time for each action of the API in `version`,
+    as dicts with the viewset, action, method and `(path, data)` of each
+    request.
+
+    Details, updates and deletes pick random rows of the dataset; lists
+    get their first page. The client is the dataset's first user, the
+    only one the users API shows it.
+    """
+    user = User.objects.get(username=username(1))
+    address_range = Address.objects.filter(
+        address_users__username__startswith=USERNAME_PREFIX
+    ).aggregate(first=Min("id"), last=Max("id"))
+
+    def url(name, *args):
+        return reverse(f"api_users:{name}", args=[version, *args])
+
+    def random_address():
+        return rng.randint(address_range["first"], address_range["last"])
+
+    def address_data(index):
+        return {
+            "address1": f"Warehouse {index}",
+            "city": "Nairobi",
+            "postcode": "00100",
+            "country": "KE",
+        }
+
+    requests = {
+        ("UserViewSet", "list", "get"): lambda index: (url("user-list"), None),
+        ("UserViewSet", "retrieve", "get"): lambda index: (
+            url("user-detail", user.pk),
+            None,
+        ),
+        ("UserViewSet", "create", "post"): lambda index: (
+            url("user-list"),
+            {"username": f"new-{USERNAME_PREFIX}{index}"},
+        ),
+        ("UserViewSet", "update", "put"): lambda index: (
+            url("user-detail", user.pk),
+            {"username": user.username, "name": f"Supplier {index}"},
+        ),
+        ("UserViewSet", "partial_update", "patch"): lambda index: (
+            url("user-detail", user.pk),
+            {"name": f"Supplier {index}"},
+        ),
+        ("UserViewSet", "destroy", "delete"): lambda index: (
+            url("user-detail", user.pk),
+            None,
+        ),
+        ("ProfileViewSet", "list", "get"): lambda index: (
+            url("profiles-list"),
+            None,
+        ),
+        ("ProfileViewSet", "retrieve", "get"): lambda index: (
+            url("profiles-detail", username(rng.randint(1, users))),
+            None,
+        ),
+        ("AddressViewSet", "list", "get"): lambda index: (
+            url("addresses-list"),
+            None,
+        ),
+        ("AddressViewSet", "retrieve", "get"): lambda index: (
+            url("addresses-detail", random_address()),
+            None,
+        ),
+        ("AddressViewSet", "create", "post"): lambda index: (
+            url("addresses-list"),
+            address_data(index),
+        ),
+        ("AddressViewSet", "update", "put"): lambda index: (
+            url("addresses-detail", random_address()),
+            address_data(index),
+        ),
+        ("AddressViewSet", "partial_update", "patch"): lambda index: (
+            url("addresses-detail", random_address()),
+            {"city": "Mombasa"},
+        ),
+        ("AddressViewSet", "destroy", "delete"): lambda index: (
+            url("addresses-detail", random_address()),
+            None,
+        ),
+        ("AddressViewSet", "bulk", "post"): lambda index: (
+            url("addresses-bulk"),
+            [address_data(index) for _ in range(BULK_ITEMS)],
+        ),
+    }
+    return [
+        {
+            "viewset": viewset,
+            "action": action,
+            "method": method,
+            "version": version,
+            "requests": request,
+        }
+        for (viewset, action, method), request in requests.items()
+    ]
+
+
+def time_case(client, case, count, warmup):
+    """
+    Send the warm-up and timed requests of a case and return its latency
+    percentiles, throughput and the queries of one request.
+    """
+    requests = [case["requests"](index) for index in range(warmup + count)]
+    statuses = Counter()
+    latencies = []
+    queries = 0
+    for index, (path, data) in enumerate(requests):
+        if index == max(warmup - 1, 0):
+            with QueryRecorder() as recorder:
+                status, latency = send(client, case["method"], path, data)
+            queries = len(recorder)
+        else:
+            status, latency = send(client, case["method"], path, data)
+        if index >= warmup:
+            statuses[status] += 1
+            latencies.append(latency)
+
+    latencies.sort()
+    return {
+        "name": "{viewset}.{action} {method} {version}".format(
+            viewset=case["viewset"],
+            action=case["action"],
+            method=case["method"].upper(),
+            version=case["version"],
+        ),
+        "viewset": case["viewset"],
+        "action": case["action"],
+        "method": case["method"].upper(),
+        "version": case["version"],
+        "requests": count,
+        "errors": sum(
+            requests for status, requests in statuses.items() if status >= 400
+        ),
+        "statuses": dict(sorted(statuses.items())),
+        "queries": queries,
+        "mean_ms": sum(latencies) / count * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "throughput": count / sum(latencies) if sum(latencies) else 0.0,
+    }
+
+
+def send(client, method, path, data):
+    """
+    Send a request and return its status and latency. Writes run in a
+    transaction rolled back afterwards, so every run sees the same
+    dataset.
+    """
+    if method == "get":
+        started = time.perf_counter()
+        response = client.get(path)
+        return response.status_code, time.perf_counter() - started
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        response = getattr(client, method)(path, data, format="json")
+        latency = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return response.status_code, latency
+
+
+def format_result(result):
+    return (
+        "{name}: p50 {p50_ms:.1f} ms, p95 {p95_ms:.1f} ms, p99 {p99_ms:.1f} "
+        "ms, {throughput:.0f} req/s, {queries} queries".format(**result)
+    )
+
+
+def compare(baseline, report):
+    """
+    Yield the p50 and p95 latency changes of each result against the
+    same result of `baseline`.
+    """
+    yield "Against {}:".format(baseline.get("commit") or "the baseline")
+    before = {result["name"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        yield "{}: p50 {:+.0%}, p95 {:+.0%}".format(
+            result["name"],
+            _change(old["p50_ms"], result["p50_ms"]),
+            _change(old["p95_ms"], result["p95_ms"]),
+        )
+
+
+def get_commit():
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=str(settings.ROOT_DIR),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _change(old, new):
+    return (new - old) / old if old else 0.0
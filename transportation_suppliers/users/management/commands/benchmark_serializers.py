@@ -0,0 +1,118 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.versioning import URLPathVersioning
+
+from transportation_suppliers.users.api.serializers import (
+    SimpleProfileSerializer,
+)
+from transportation_suppliers.users.models import Address, User
+
+
+class ReverseProfileSerializer(SimpleProfileSerializer):
+    """
+    `SimpleProfileSerializer` reversing the URL of every address.
+    """
+
+    addresses_nested = serializers.HyperlinkedRelatedField(
+        source="addresses",
+        view_name="api_users:addresses-detail",
+        read_only=True,
+        many=True,
+        lookup_field="pk",
+        lookup_url_kwarg="pk",
+    )
+
+
+BENCHMARKS = {
+    "reverse": ReverseProfileSerializer,
+    "template": SimpleProfileSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the serialization of a page of v1 profiles with the address "
+        "links reversed per row and formatted from a URL template."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            type=int,
+            default=1000,
+            help="Profiles on the page.",
+        )
+        parser.add_argument(
+            "--addresses",
+            type=int,
+            default=3,
+            help="Addresses of each profile.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs of each serializer; the best one is reported.",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host of the links, one of ALLOWED_HOSTS.",
+        )
+
+    def handle(self, *args, **options):
+        users = build_profiles(options["profiles"], options["addresses"])
+        timings = {}
+        for name, serializer_class in BENCHMARKS.items():
+            timings[name] = min(
+                timeit.repeat(
+                    lambda: serialize(
+                        serializer_class, users, options["host"]
+                    ),
+                    number=1,
+                    repeat=options["repeat"],
+                )
+            )
+            self.stdout.write(
+                "{}: {:.1f} ms".format(name, timings[name] * 1000)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Speedup: {:.1f}x".format(
+                    timings["reverse"] / timings["template"]
+                )
+            )
+        )
+
+
+def build_profiles(count, addresses_per_user):
+    """
+    Return unsaved users with prefetched addresses, so only serialization
+    is timed.
+    """
+    users = []
+    for index in range(1, count + 1):
+        user = User(id=index, username=f"supplier{index}")
+        user._prefetched_objects_cache = {
+            "addresses": [
+                Address(id=index * addresses_per_user + offset)
+                for offset in range(addresses_per_user)
+            ]
+        }
+        users.append(user)
+    return users
+
+
+def serialize(serializer_class, users, host):
+    request = Request(
+        APIRequestFactory().get("/api/v1/profiles/", HTTP_HOST=host)
+    )
+    request.version = "v1"
+    request.versioning_scheme = URLPathVersioning()
+    return serializer_class(
+        users, many=True, context={"request": request}
+    ).data
@@ -0,0 +1,113 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.users.hashers import ARGON2_PROFILES, hash_secret
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the Argon2 cost profiles on this machine and find the "
+        "costs that hash a password within a target latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=50,
+            help="Longest acceptable time to hash one password.",
+        )
+        parser.add_argument(
+            "--max-memory",
+            type=int,
+            default=262144,
+            help="Largest memory cost to try, in KiB.",
+        )
+        parser.add_argument(
+            "--parallelism",
+            type=int,
+            default=min(os.cpu_count() or 1, 4),
+            help="Lanes per hash. Defaults to the CPUs, up to 4.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=5,
+            help="Hashes timed per setting; the median is used.",
+        )
+
+    def handle(self, *args, **options):
+        samples = options["samples"]
+        target = options["target_ms"] / 1000
+
+        self.stdout.write("Profiles:")
+        for name, cost in ARGON2_PROFILES.items():
+            self.stdout.write(
+                "  {}: t={} m={} p={} {:.1f} ms".format(
+                    name, *cost, measure(*cost, samples) * 1000
+                )
+            )
+
+        # The memory cost is what makes Argon2 expensive to attack, so take
+        # as much of it as the target allows with one pass, then add passes.
+        self.stdout.write("Calibration:")
+        parallelism = options["parallelism"]
+        memory_cost = 8 * parallelism
+        best = None
+        while memory_cost <= options["max_memory"]:
+            elapsed = measure(1, memory_cost, parallelism, samples)
+            self.stdout.write(
+                "  t=1 m={} p={} {:.1f} ms".format(
+                    memory_cost, parallelism, elapsed * 1000
+                )
+            )
+            if elapsed > target:
+                break
+            best = (1, memory_cost, parallelism, elapsed)
+            memory_cost *= 2
+
+        if best is None:
+            self.stderr.write("No cost meets the target latency.")
+            return
+
+        time_cost, memory_cost, parallelism, elapsed = best
+        while True:
+            candidate = measure(
+                time_cost + 1, memory_cost, parallelism, samples
+            )
+            if candidate > target:
+                break
+            time_cost += 1
+            elapsed = candidate
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Calibrated to {:.1f} ms per hash:\n"
+                "DJANGO_ARGON2_TIME_COST={}\n"
+                "DJANGO_ARGON2_MEMORY_COST={}\n"
+                "DJANGO_ARGON2_PARALLELISM={}".format(
+                    elapsed * 1000, time_cost, memory_cost, parallelism
+                )
+            )
+        )
+
+
+def measure(time_cost, memory_cost, parallelism, samples):
+    """
+    Return the median seconds taken to hash a password with these costs.
+    """
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hash_secret(
+            b"correct horse battery staple",
+            os.urandom(16),
+            time_cost,
+            memory_cost,
+            parallelism,
+        )
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
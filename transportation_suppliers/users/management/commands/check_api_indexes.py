@@ -0,0 +1,143 @@
+from typing import Any, Dict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from transportation_suppliers.users.api.urls import router_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the orderings, lookups and prefetches issued by the users "
+        "API viewsets that no database index can serve."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to inspect. Defaults to the 'default' database.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with a non-zero status if an index is missing.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        constraints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        missing = 0
+
+        for prefix, viewset, basename in router_users.registry:
+            for table, columns, orders, reason in get_index_requirements(
+                viewset
+            ):
+                if table not in constraints:
+                    with connection.cursor() as cursor:
+                        constraints[table] = (
+                            connection.introspection.get_constraints(
+                                cursor, table
+                            )
+                        )
+                description = "{}: {}({}) for {}".format(
+                    basename,
+                    table,
+                    ", ".join(
+                        f"{column} {order}"
+                        for column, order in zip(columns, orders)
+                    ),
+                    reason,
+                )
+                if is_covered(constraints[table], columns, orders):
+                    self.stdout.write(
+                        self.style.SUCCESS(f"OK       {description}")
+                    )
+                else:
+                    missing += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"MISSING  {description}")
+                    )
+
+        if missing and options["check"]:
+            raise CommandError(f"{missing} missing index(es).")
+
+
+def get_index_requirements(viewset):
+    """
+    Yield `(table, columns, orders, reason)` for every key the viewset's
+    querysets filter, sort or join on.
+    """
+    queryset = viewset.queryset
+    model = queryset.model
+    table = model._meta.db_table
+
+    orderings = [("ordering", queryset.query.order_by)]
+    keyset_pagination_class = getattr(viewset, "keyset_pagination_class", None)
+    if keyset_pagination_class is not None:
+        orderings.append(
+            ("keyset pagination", keyset_pagination_class.ordering)
+        )
+    for reason, ordering in orderings:
+        if ordering:
+            yield (
+                table,
+                [_column(model, field) for field in ordering],
+                [
+                    "DESC" if field.startswith("-") else "ASC"
+                    for field in ordering
+                ],
+                reason,
+            )
+
+    lookup_field = getattr(viewset, "lookup_field", "pk")
+    if lookup_field != "pk":
+        yield table, [_column(model, lookup_field)], ["ASC"], "lookup"
+
+    for field_name in getattr(viewset, "filterset_fields", ()):
+        yield table, [_column(model, field_name)], ["ASC"], "filter"
+
+    for lookup in queryset._prefetch_related_lookups:
+        lookup = getattr(lookup, "prefetch_through", lookup)
+        field = model._meta.get_field(lookup)
+        if field.many_to_many:
+            yield (
+                field.remote_field.through._meta.db_table,
+                [field.m2m_column_name()],
+                ["ASC"],
+                f"prefetch of {lookup}",
+            )
+
+
+def is_covered(constraints, columns, orders):
+    """
+    Return whether an index leads with `columns` in the given (or the
+    fully reversed) order, so a B-tree scan can serve it either way.
+    """
+    reversed_orders = [
+        "ASC" if order == "DESC" else "DESC" for order in orders
+    ]
+    for constraint in constraints.values():
+        if not (
+            constraint["index"]
+            or constraint["unique"]
+            or constraint["primary_key"]
+        ):
+            continue
+        if constraint["columns"][: len(columns)] != columns:
+            continue
+        index_orders = [
+            order or "ASC"
+            for order in (constraint.get("orders") or [])[: len(columns)]
+        ]
+        index_orders += ["ASC"] * (len(columns) - len(index_orders))
+        if index_orders in (orders, reversed_orders):
+            return True
+    return False
+
+
+def _column(model, field_name):
+    field_name = field_name.lstrip("-")
+    if field_name == "pk":
+        return model._meta.pk.column
+    return model._meta.get_field(field_name).column
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from transportation_suppliers.users.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = "Delete the API tokens that have expired."
+
+    def handle(self, *args, **options):
+        deleted, _ = ApiToken.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired API token(s).")
+        )
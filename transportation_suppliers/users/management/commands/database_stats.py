@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from transportation_suppliers.db.health import get_connection_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the connects, connect time and failed health checks of each "
+        "database, and the pool and wait times of PgBouncer when "
+        "DJANGO_DATABASE_PGBOUNCER is on."
+    )
+
+    def handle(self, *args, **options):
+        for alias in settings.DATABASES:
+            stats = get_connection_stats(alias)
+            self.stdout.write(
+                "{}: {} connects, {:.1f} ms average connect time, {} failed "
+                "health checks".format(
+                    alias,
+                    stats["connects"],
+                    stats["connect_ms"],
+                    stats["health_check_failures"],
+                )
+            )
+
+        if settings.DATABASE_PGBOUNCER:
+            for line in pgbouncer_stats(settings.DATABASES["default"]):
+                self.stdout.write(line)
+
+
+def pgbouncer_stats(settings_dict):
+    """
+    Yield the pools and wait times PgBouncer reports for the database.
+    """
+    import psycopg2
+
+    try:
+        connection = psycopg2.connect(
+            dbname="pgbouncer",
+            user=settings_dict["USER"],
+            password=settings_dict["PASSWORD"],
+            host=settings_dict["HOST"],
+            port=settings_dict["PORT"],
+        )
+    except psycopg2.Error as error:
+        raise CommandError(f"Cannot reach the PgBouncer console: {error}")
+
+    # The admin console does not support transactions.
+    connection.autocommit = True
+    try:
+        pools = _show(connection, "POOLS")
+        stats = _show(connection, "STATS")
+    finally:
+        connection.close()
+
+    for pool in pools:
+        if pool["database"] != settings_dict["NAME"]:
+            continue
+        yield (
+            "pgbouncer {user}: {cl_active} active and {cl_waiting} waiting "
+            "clients, {sv_active} active and {sv_idle} idle server "
+            "connections, longest wait {maxwait}s".format(**pool)
+        )
+    for row in stats:
+        if row["database"] != settings_dict["NAME"]:
+            continue
+        # avg_wait_time appeared in PgBouncer 1.8.
+        if "avg_wait_time" in row:
+            yield (
+                "pgbouncer: {:.1f} ms average wait for a server "
+                "connection".format(row["avg_wait_time"] / 1000)
+            )
+
+
+def _show(connection, what):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SHOW {what}")
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
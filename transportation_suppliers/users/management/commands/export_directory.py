@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.users import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every profile or address to a file (or stdout) as NDJSON "
+        "or CSV, in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(exports.EXPORTS))
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=sorted(exports.FORMATS),
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--output", help="File to write to. Defaults to stdout."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=exports.DEFAULT_CHUNK_SIZE,
+            help="Rows fetched per round trip from the database.",
+        )
+
+    def handle(self, *args, **options):
+        lines = exports.iter_export(
+            options["kind"],
+            options["file_format"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
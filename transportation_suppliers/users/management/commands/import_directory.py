@@ -0,0 +1,263 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.pool import AsyncResult
+from typing import Deque, Set, Tuple
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections
+
+from transportation_suppliers.users import exports, imports
+from transportation_suppliers.users.api.caching import invalidate_profiles
+from transportation_suppliers.users.api.pagination import count_cache_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users or addresses from an NDJSON or CSV file (as written "
+        "by export_directory). Import addresses before the users that "
+        "reference them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(imports.IMPORTS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=["csv", "ndjson"],
+            help="File format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows validated and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes importing batches in parallel.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file. Defaults to <path>.checkpoint.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and import every batch.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_false",
+            dest="use_copy",
+            help="Use bulk_create instead of COPY on PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        kind = options["kind"]
+        path = options["path"]
+        batch_size = options["batch_size"]
+        file_format = options["file_format"] or os.path.splitext(path)[1][1:]
+        if file_format not in ("csv", "ndjson"):
+            raise CommandError("Cannot tell the file format, use --format.")
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+
+        checkpoint = {
+            "kind": kind,
+            "batch_size": batch_size,
+            "done": [],
+            "started": [],
+        }
+        if os.path.exists(checkpoint_path) and not options["restart"]:
+            with open(checkpoint_path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            if (checkpoint["kind"], checkpoint["batch_size"]) != (
+                kind,
+                batch_size,
+            ):
+                raise CommandError(
+                    "The checkpoint was written for another kind or batch "
+                    "size, use --restart to ignore it."
+                )
+            checkpoint.setdefault("started", checkpoint["done"][:])
+            self.stdout.write(
+                f"Resuming, skipping {len(checkpoint['done'])} batch(es)."
+            )
+        done = set(checkpoint["done"])
+        # The interrupted run may have committed these before it could
+        # record them as done.
+        interrupted = set(checkpoint["started"]) - done
+
+        def start(index):
+            checkpoint["started"].append(index)
+            _write_checkpoint(checkpoint_path, checkpoint)
+
+        tasks = _get_tasks(
+            kind,
+            imports.read_rows(path, file_format),
+            batch_size,
+            done,
+            interrupted,
+            options["use_copy"],
+            start,
+        )
+
+        started = time.monotonic()
+        imported = 0
+        failed = 0
+        if options["workers"] > 1:
+            # Children must open their own database connections.
+            connections.close_all()
+            pool = multiprocessing.Pool(
+                options["workers"], initializer=_init_worker
+            )
+            results = _map_bounded(
+                pool, _import_batch, tasks, options["workers"] * 2
+            )
+        else:
+            pool = None
+            results = map(_import_batch, tasks)
+
+        try:
+            for index, count, errors in results:
+                imported += count
+                failed += len(errors)
+                for row_number, row_errors in errors:
+                    self.stderr.write(f"Row {row_number}: {row_errors}")
+                checkpoint["done"].append(index)
+                _write_checkpoint(checkpoint_path, checkpoint)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    "Batch {}: {} rows imported, {:.0f} rows/s".format(
+                        index, imported, imported / elapsed if elapsed else 0
+                    )
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        model = imports.IMPORTS[kind][0]
+        imports.reset_sequences(model)
+        # Bulk inserts send no signals, drop what they would have updated.
+        cache.delete(count_cache_key(model))
+        invalidate_profiles()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Imported {} {} in {:.1f}s ({:.0f} rows/s), {} invalid "
+                "row(s).".format(
+                    imported,
+                    kind,
+                    elapsed,
+                    imported / elapsed if elapsed else 0,
+                    failed,
+                )
+            )
+        )
+
+
+def _init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def _get_tasks(kind, rows, batch_size, done, interrupted, use_copy, on_start):
+    """
+    Yield the import tasks of the batches of `rows` not `done`, calling
+    `on_start(index)` before each one is handed out.
+
+    Batches run in parallel cannot see each other's rows, so rows with an
+    id or username of an earlier batch are reported here. Rows of an
+    `interrupted` batch without either cannot tell whether they were
+    imported and are reported too.
+    """
+    seen: Set[Tuple[str, object]] = set()
+    for index, chunk in enumerate(exports.chunks(rows, batch_size)):
+        if index in done:
+            continue
+        numbered = []
+        errors = []
+        batch_keys = set()
+        for row_number, row in enumerate(chunk, index * batch_size + 1):
+            keys = set(imports.unique_keys(kind, row))
+            repeated = keys & seen
+            if repeated:
+                errors.append(
+                    (
+                        row_number,
+                        {
+                            field: [
+                                f"{value} is repeated in an earlier batch."
+                            ]
+                            for field, value in sorted(repeated)
+                        },
+                    )
+                )
+            elif not keys and index in interrupted:
+                errors.append(
+                    (
+                        row_number,
+                        {
+                            "id": [
+                                "The interrupted import may have imported "
+                                "this row, which has no id to tell."
+                            ]
+                        },
+                    )
+                )
+            else:
+                numbered.append((row_number, row))
+                batch_keys |= keys
+        seen |= batch_keys
+        on_start(index)
+        yield kind, index, numbered, errors, use_copy
+
+
+def _map_bounded(pool, function, tasks, in_flight):
+    """
+    Yield `function(task)` for each task, run in `pool`, in order.
+
+    Unlike `pool.imap`, which reads every task up front, at most
+    `in_flight` tasks are read ahead of the results.
+    """
+    pending: Deque[AsyncResult] = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _import_batch(task):
+    kind, index, rows, errors, use_copy = task
+    valid, validation_errors = imports.validate_batch(kind, rows)
+    errors = errors + validation_errors
+    try:
+        count = imports.load_batch(
+            kind, [data for row_number, data in valid], use_copy=use_copy
+        )
+    except IntegrityError as error:
+        # Rows written by another process since the batch was validated.
+        count = 0
+        errors += [
+            (row_number, {"non_field_errors": [f"Not imported: {error}"]})
+            for row_number, data in valid
+        ]
+    return index, count, sorted(errors, key=lambda error: error[0])
+
+
+def _write_checkpoint(path, checkpoint):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
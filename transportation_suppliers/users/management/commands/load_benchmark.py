@@ -0,0 +1,236 @@
+import asyncio
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with concurrent keep-alive connections, plus "
+        "optional slow clients, and report throughput and latency. Run it "
+        "against `gunicorn config.wsgi` and against `gunicorn config.asgi "
+        "--worker-class uvicorn.workers.UvicornWorker` with the same number "
+        "of workers to compare the two."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url", help="e.g. http://localhost:5000/api/v2/profiles/"
+        )
+        parser.add_argument(
+            "--connections",
+            type=int,
+            default=50,
+            help="Concurrent connections sending requests back to back.",
+        )
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=0,
+            help="Connections trickling their requests in, like clients on "
+            "a poor mobile network.",
+        )
+        parser.add_argument(
+            "--slow-seconds",
+            type=float,
+            default=5,
+            help="Time each slow client takes to send a request.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10,
+            help="Seconds to run for.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30,
+            help="Seconds to wait for a response before counting an error.",
+        )
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help="Extra request header, e.g. 'Authorization: Token ...'.",
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http":
+            raise CommandError("Only http:// URLs are supported.")
+        request = build_request(url, options["header"])
+
+        loop = asyncio.get_event_loop()
+        results = loop.run_until_complete(
+            run(
+                url.hostname,
+                url.port or 80,
+                request,
+                options["connections"],
+                options["slow_clients"],
+                options["slow_seconds"],
+                options["duration"],
+                options["timeout"],
+            )
+        )
+        latencies, errors, statuses = results
+        completed = len(latencies)
+        self.stdout.write(
+            "{} requests in {:.0f}s, {:.1f} req/s, {} errors, "
+            "statuses {}".format(
+                completed,
+                options["duration"],
+                completed / options["duration"],
+                errors,
+                dict(sorted(statuses.items())),
+            )
+        )
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                "latency p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms, "
+                "max {:.1f} ms".format(
+                    percentile(latencies, 50) * 1000,
+                    percentile(latencies, 95) * 1000,
+                    percentile(latencies, 99) * 1000,
+                    latencies[-1] * 1000,
+                )
+            )
+
+
+def build_request(url, headers):
+    target = url.path or "/"
+    if url.query:
+        target += "?" + url.query
+    lines = [
+        f"GET {target} HTTP/1.1",
+        f"Host: {url.netloc}",
+        "Accept: application/json",
+    ] + headers
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def run(
+    host,
+    port,
+    request,
+    connections,
+    slow_clients,
+    slow_seconds,
+    duration,
+    timeout,
+):
+    deadline = time.monotonic() + duration
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = [0]
+    clients = [
+        fast_client(
+            host, port, request, deadline, timeout, latencies, statuses, errors
+        )
+        for _ in range(connections)
+    ] + [
+        slow_client(host, port, request, slow_seconds, deadline)
+        for _ in range(slow_clients)
+    ]
+    await asyncio.gather(*clients)
+    return latencies, errors[0], statuses
+
+
+async def fast_client(
+    host, port, request, deadline, timeout, latencies, statuses, errors
+):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), timeout
+                )
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(
+                read_response(reader), timeout
+            )
+        except (
+            OSError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ):
+            errors[0] += 1
+            writer = _close(writer)
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.monotonic() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+        if not keep_alive:
+            writer = _close(writer)
+    _close(writer)
+
+
+async def slow_client(host, port, request, slow_seconds, deadline):
+    delay = slow_seconds / len(request)
+    while time.monotonic() < deadline:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            for byte in request:
+                writer.write(bytes([byte]))
+                await asyncio.sleep(delay)
+                if time.monotonic() >= deadline:
+                    break
+            else:
+                await asyncio.wait_for(
+                    read_response(reader), deadline - time.monotonic()
+                )
+        except (
+            OSError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ):
+            await asyncio.sleep(0.01)
+        finally:
+            _close(writer)
+
+
+async def read_response(reader):
+    """
+    Read one response and return `(status, keep_alive)`.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get("connection", "").lower() != "close"
+
+
+def percentile(values, percent):
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+def _close(writer):
+    if writer is not None:
+        writer.close()
+    return None
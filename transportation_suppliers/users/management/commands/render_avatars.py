@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.users.avatars import render_avatar
+from transportation_suppliers.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the avatar renditions of the users missing them, such as "
+        "those who uploaded their avatar before renditions existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Make them again for every user with an avatar, e.g. "
+            "after changing AVATAR_RENDITION_SIZES.",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar="")
+        if not options["all"]:
+            users = users.filter(avatar_renditions="")
+
+        rendered = 0
+        for pk, avatar in users.values_list("pk", "avatar").iterator():
+            try:
+                render_avatar(pk, avatar)
+            except OSError as error:
+                self.stderr.write(f"Cannot render {avatar}: {error}")
+                continue
+            rendered += 1
+        self.stdout.write(f"Made the renditions of {rendered} avatars.")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.users.api.caching import (
+    get_response_cache_stats,
+)
+from transportation_suppliers.users.api.urls import router_users
+
+
+class Command(BaseCommand):
+    help = "Print the hit and miss counters of the API response caches."
+
+    def handle(self, *args, **options):
+        for prefix, viewset, basename in router_users.registry:
+            cache_prefix = getattr(viewset, "response_cache_prefix", None)
+            if cache_prefix is None:
+                continue
+            stats = get_response_cache_stats(cache_prefix)
+            self.stdout.write(
+                "{}: {} hits, {} misses ({:.1%} hit ratio)".format(
+                    basename,
+                    stats["hits"],
+                    stats["misses"],
+                    stats["hit_ratio"],
+                )
+            )
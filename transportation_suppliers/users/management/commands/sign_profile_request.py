@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.users.profiling import sign_profile_request
+
+
+class Command(BaseCommand):
+    help = (
+        "Print an X-Profile header making ProfilingMiddleware profile the "
+        "requests sending it, valid for PROFILING_HEADER_MAX_AGE seconds."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"X-Profile: {sign_profile_request()}")
+        self.stderr.write(
+            "Valid for {} seconds, profiles are written to {}.".format(
+                settings.PROFILING_HEADER_MAX_AGE, settings.PROFILING_DIR
+            )
+        )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from transportation_suppliers.db.slow_queries import (
+    clear_slow_queries,
+    get_slow_queries,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the slow queries recorded by SlowQueryMiddleware by "
+        "fingerprint, the most total time first, with the views and "
+        "serializers running them and their latest plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of fingerprints to print.",
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Print the query plans."
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Forget the recorded queries instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            clear_slow_queries()
+            self.stdout.write("Cleared the slow queries.")
+            return
+
+        entries = get_slow_queries()
+        if not entries:
+            self.stdout.write("No slow queries recorded.")
+        for entry in entries[: options["limit"]]:
+            self.stdout.write(
+                "{fingerprint} ({alias}): {count} runs, {total_ms:.1f} ms "
+                "total, {average:.1f} ms average, {max_ms:.1f} ms "
+                "max".format(
+                    average=entry["total_ms"] / entry["count"], **entry
+                )
+            )
+            self.stdout.write(f"  {entry['sql']}")
+            for label in ("views", "serializers"):
+                self.stdout.write(
+                    "  {}: {}".format(
+                        label,
+                        ", ".join(
+                            f"{name} ({count})"
+                            for name, count in entry[label].items()
+                        ),
+                    )
+                )
+            if options["plans"] and entry["plan"]:
+                for line in entry["plan"].splitlines():
+                    self.stdout.write(f"    {line}")
@@ -0,0 +1,136 @@
+"""
+Prometheus metrics of the API.
+
+Gunicorn workers are separate processes, so with `prometheus_multiproc_dir`
+set in the environment (see the production start script) every worker
+writes its samples to memory-mapped files in that directory and the
+`metrics/` endpoint adds up the files of all of them. Without it the
+endpoint shows the metrics of the process serving the scrape.
+"""
+import os
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+MULTIPROCESS_DIR_VARIABLE = "prometheus_multiproc_dir"
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Time to handle an API request.",
+    ["view", "method", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "api_request_queries",
+    "SQL queries run by an API request.",
+    ["view", "method"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float("inf")),
+)
+REQUEST_SQL_DURATION = Histogram(
+    "api_request_sql_duration_seconds",
+    "Time an API request spent running SQL queries.",
+    ["view", "method"],
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    "api_request_serializer_duration_seconds",
+    "Time an API request spent rendering serializers, with the queries "
+    "they run.",
+    ["view", "method"],
+)
+CACHE_LOOKUPS = Counter(
+    "api_cache_lookups_total",
+    "Cache lookups of the API, by cache and outcome (hit or miss).",
+    ["cache", "outcome"],
+)
+
+_state = threading.local()
+
+
+def start_request():
+    """
+    Start measuring the serializer time of the current thread's request.
+    """
+    _state.serializer_duration = 0.0
+    _state.serializer = None
+
+
+def finish_request():
+    """
+    Stop measuring and return the serializer time of the request.
+    """
+    duration = getattr(_state, "serializer_duration", 0.0)
+    _state.serializer_duration = None
+    _state.serializer = None
+    return duration
+
+
+def current_serializer():
+    """
+    Return the name of the innermost serializer rendering in the current
+    thread's request, or `None`.
+    """
+    return getattr(_state, "serializer", None)
+
+
+def time_serializer(function, *args):
+    """
+    Call `function`, a bound rendering method of a serializer, and add its
+    duration to the serializer time of the request, unless it is nested in
+    another timed call.
+    """
+    if getattr(_state, "serializer_duration", None) is None:
+        return function(*args)
+
+    outer = _state.serializer
+    _state.serializer = _serializer_name(function)
+    try:
+        if outer is not None:
+            return function(*args)
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            _state.serializer_duration += time.perf_counter() - started
+    finally:
+        _state.serializer = outer
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_request(
+    view, method, status, duration, queries, sql_duration, serializer_duration
+):
+    REQUEST_DURATION.labels(view, method, status).observe(duration)
+    REQUEST_QUERIES.labels(view, method).observe(queries)
+    REQUEST_SQL_DURATION.labels(view, method).observe(sql_duration)
+    REQUEST_SERIALIZER_DURATION.labels(view, method).observe(
+        serializer_duration
+    )
+
+
+def render_latest():
+    """
+    Return the content type and the text exposition of the metrics.
+    """
+    if os.environ.get(MULTIPROCESS_DIR_VARIABLE):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return CONTENT_TYPE_LATEST, generate_latest(registry)
+
+
+def _serializer_name(function):
+    owner = function.__self__
+    return getattr(owner, "serializer_name", type(owner).__name__)
@@ -0,0 +1,236 @@
+import logging
+import random
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from transportation_suppliers.db.queries import (
+    QueryBudgetExceeded,
+    QueryRecorder,
+)
+from transportation_suppliers.db.slow_queries import SlowQueryRecorder
+from transportation_suppliers.users import metrics, profiling, routers
+from transportation_suppliers.users.transactions import SAFE_METHODS
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read a client's own writes back from the primary.
+
+    Requests that write get a short-lived cookie; while a client sends it,
+    none of its reads go to a replica, which may not have replayed the
+    write yet.
+    """
+
+    cookie_name = "pin_primary"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        routers.reset()
+        if (
+            request.method not in SAFE_METHODS
+            or self.cookie_name in request.COOKIES
+        ):
+            routers.pin_primary()
+        try:
+            response = self.get_response(request)
+            if request.method not in SAFE_METHODS or routers.has_written():
+                response.set_cookie(
+                    self.cookie_name,
+                    "1",
+                    max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                )
+        finally:
+            routers.reset()
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of each request and check them against the
+    `query_budgets` of the view's class, keyed by viewset action (or
+    method), and for N+1 queries.
+
+    For development and tests: the count is sent in `X-Query-Count` and
+    problems are logged, or raised with `QUERY_BUDGETS_STRICT`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        response["X-Query-Count"] = str(len(recorder))
+        problems = recorder.check(
+            get_query_budget(request), settings.QUERY_N_PLUS_ONE_THRESHOLD
+        )
+        if problems:
+            message = "{} {}: {}".format(
+                request.method, request.get_full_path(), "\n".join(problems)
+            )
+            if settings.QUERY_BUDGETS_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+def get_query_budget(request):
+    """
+    Return the query budget of the view handling `request`, or `None`.
+    """
+    match = getattr(request, "resolver_match", None)
+    view_class = getattr(match and match.func, "cls", None)
+    budgets = getattr(view_class, "query_budgets", None)
+    if not budgets:
+        return None
+    method = request.method.lower()
+    if method == "head":
+        method = "get"
+    actions = getattr(match.func, "actions", None) or {}
+    return budgets.get(actions.get(method, method))
+
+
+class ProfilingMiddleware:
+    """
+    Profile a `PROFILING_SAMPLE_RATE` fraction of the requests, and the
+    requests with a signed `X-Profile` header (see `manage.py
+    sign_profile_request`), with a sampling profiler.
+
+    The collapsed stacks of each profiled request and the time it spent in
+    the view, serializers, SQL and middleware are written to
+    `PROFILING_DIR` and logged. Streamed response bodies are not profiled.
+    """
+
+    header = "HTTP_X_PROFILE"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with QueryRecorder() as recorder, profiling.Sampler(
+            threading.get_ident(),
+            sys._getframe().f_code,
+            settings.PROFILING_INTERVAL,
+        ) as sampler:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        name = match.view_name if match else "unresolved"
+        summary = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": name,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "samples": sum(sampler.stacks.values()),
+            "breakdown_ms": profiling.summarize(sampler.stacks, duration),
+            "sql_queries": len(recorder),
+            "sql_ms": round(recorder.duration * 1000, 1),
+        }
+        try:
+            path = profiling.write_profile(name, sampler.stacks, summary)
+        except OSError as error:
+            logger.warning("Cannot write the profile: %s", error)
+            path = None
+        logger.info(
+            "Profiled %s %s (%s) in %.1f ms: %s, %d queries in %.1f ms, "
+            "stacks in %s",
+            request.method,
+            request.get_full_path(),
+            name,
+            summary["duration_ms"],
+            ", ".join(
+                f"{category} {ms} ms"
+                for category, ms in summary["breakdown_ms"].items()
+            ),
+            summary["sql_queries"],
+            summary["sql_ms"],
+            path,
+        )
+        return response
+
+    def should_profile(self, request):
+        if self.header in request.META:
+            return profiling.is_profile_signature(request.META[self.header])
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, SQL queries and serializer time of the requests to
+    the API routes, see `transportation_suppliers.users.metrics`.
+    """
+
+    namespace = "api_users"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with QueryRecorder() as recorder:
+                response = self.get_response(request)
+        finally:
+            serializer_duration = metrics.finish_request()
+
+        match = getattr(request, "resolver_match", None)
+        if match is not None and self.namespace in match.namespaces:
+            metrics.observe_request(
+                match.view_name,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                len(recorder),
+                recorder.duration,
+                serializer_duration,
+            )
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Record the queries of the requests taking at least
+    `SLOW_QUERY_THRESHOLD_MS` (0 for none), with the view and serializer
+    running them, see `transportation_suppliers.db.slow_queries`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            return self.get_response(request)
+
+        with SlowQueryRecorder(
+            settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+            lambda: self.describe(request),
+        ):
+            return self.get_response(request)
+
+    def describe(self, request):
+        match = getattr(request, "resolver_match", None)
+        return (
+            match.view_name if match else request.path,
+            metrics.current_serializer(),
+        )
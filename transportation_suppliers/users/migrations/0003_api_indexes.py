@@ -0,0 +1,33 @@
+# Generated by Django 2.2.3 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0002_auto_20190731_2306")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(fields=["city"], name="users_address_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["postcode"], name="users_address_postcode_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["country"], name="users_address_country_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["-date_joined", "id"], name="users_user_joined_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.3 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0003_api_indexes")]
+
+    operations = [
+        migrations.AddField(
+            model_name="address",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="updated at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="updated at"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.3 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0005_apitoken")]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_renditions",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                verbose_name="avatar renditions",
+            ),
+        ),
+    ]
@@ -2,9 +2,14 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from transportation_suppliers.users.utils import user_avatar_path
+from transportation_suppliers.users.utils import (
+    api_token_digest,
+    generate_api_token,
+    user_avatar_path,
+)
 
 
 COUNTRIES_LIST = (
@@ -295,10 +300,20 @@ class Address(models.Model):
         verbose_name=_("country"),
         help_text=_("Input country."),
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("updated at")
+    )
 
     class Meta:
         verbose_name = _("address")
         verbose_name_plural = _("addresses")
+        indexes = [
+            models.Index(fields=["city"], name="users_address_city_idx"),
+            models.Index(
+                fields=["postcode"], name="users_address_postcode_idx"
+            ),
+            models.Index(fields=["country"], name="users_address_country_idx"),
+        ]
 
     def __str__(self):
         return "{},{},{},{}".format(
@@ -341,6 +356,14 @@ class User(AbstractUser):
         verbose_name=_("avatar"),
         help_text=_("Upload user avatar here."),
     )
+    # Path prefix of the renditions of the current avatar, see
+    # `transportation_suppliers.users.avatars`; empty until they are made.
+    avatar_renditions = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name=_("avatar renditions"),
+    )
     bio = models.CharField(
         max_length=500,
         blank=True,
@@ -397,9 +420,79 @@ class User(AbstractUser):
         related_name="address_users",
         help_text=_("Select addresses of the user."),
     )
+    # Also touched when the user's addresses change, so it dates the whole
+    # profile representation.
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name=_("updated at")
+    )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Matches the `(-date_joined, id)` ordering of the user and
+            # profile lists and their keyset pagination, and serves plain
+            # `date_joined` lookups through its leading column.
+            models.Index(
+                fields=["-date_joined", "id"], name="users_user_joined_id_idx"
+            )
+        ]
 
     def __str__(self) -> str:
         return self.username
 
     def get_absolute_url(self):
         return reverse("users:detail", kwargs={"username": self.username})
+
+
+class ApiTokenManager(models.Manager):
+    def issue(self, user, lifetime):
+        """
+        Create a token for `user` valid for the `lifetime` timedelta and
+        return `(api_token, token)`. The token itself is not stored, it can
+        only be handed out now.
+        """
+        prefix, token = generate_api_token()
+        api_token = self.create(
+            user=user,
+            prefix=prefix,
+            digest=api_token_digest(token),
+            expires_at=timezone.now() + lifetime,
+        )
+        return api_token, token
+
+
+class ApiToken(models.Model):
+    """
+    Expiring API token, stored as a SHA-256 digest and found by its prefix.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="api_tokens",
+        verbose_name=_("user"),
+    )
+    prefix = models.CharField(
+        max_length=8, db_index=True, verbose_name=_("prefix")
+    )
+    digest = models.CharField(
+        max_length=64, unique=True, verbose_name=_("digest")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("created at")
+    )
+    expires_at = models.DateTimeField(
+        db_index=True, verbose_name=_("expires at")
+    )
+
+    objects = ApiTokenManager()
+
+    class Meta:
+        verbose_name = _("API token")
+        verbose_name_plural = _("API tokens")
+
+    def __str__(self):
+        return f"{self.prefix}…"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
@@ -0,0 +1,197 @@
+"""
+Sampling profiler for single requests.
+
+A `Sampler` thread reads the stack of the request's thread every
+`PROFILING_INTERVAL` seconds, which costs the request little more than the
+GIL switches, unlike `cProfile` tracing every call. The samples are
+written as collapsed stacks (one `frame;frame;frame count` line per
+stack), the input of flamegraph.pl and speedscope, next to a summary of
+the time spent in the view, its serializers and SQL. Only the latest
+`PROFILING_MAX_PROFILES` profiles are kept.
+"""
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from types import CodeType
+from typing import Counter as CounterType, Tuple
+
+from django.conf import settings
+from django.core import signing
+
+
+SIGNATURE_SALT = "transportation_suppliers.users.profiling"
+
+# Categories of a sample, by the innermost matching frame.
+_SQL_MODULES = ("django/db/backends/",)
+_SERIALIZER_MODULES = (
+    "rest_framework/serializers.py",
+    "rest_framework/fields.py",
+    "rest_framework/relations.py",
+    "transportation_suppliers/users/api/serializers.py",
+    "transportation_suppliers/users/api/fields.py",
+    "transportation_suppliers/users/api/compiled.py",
+)
+# Frames below the one calling the view (and the view middleware).
+_VIEW_MODULE = "django/core/handlers/base.py"
+_VIEW_FUNCTION = "_get_response"
+CATEGORIES = ("sql", "serializer", "view", "middleware")
+
+
+def sign_profile_request():
+    """
+    Return a value for the `X-Profile` header, valid for
+    `PROFILING_HEADER_MAX_AGE` seconds.
+    """
+    return signing.TimestampSigner(salt=SIGNATURE_SALT).sign("profile")
+
+
+def is_profile_signature(value):
+    try:
+        signing.TimestampSigner(salt=SIGNATURE_SALT).unsign(
+            value, max_age=settings.PROFILING_HEADER_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Sampler:
+    """
+    Count the stacks of a thread, from the frame below `stop_code` down,
+    sampled from a background thread.
+    """
+
+    def __init__(self, thread_id, stop_code, interval):
+        self.thread_id = thread_id
+        self.stop_code = stop_code
+        self.interval = interval
+        self.stacks: CounterType[Tuple[CodeType, ...]] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.stop_code:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+
+
+def categorize(stack):
+    """
+    Return the category of a stack of code objects, outermost first.
+    """
+    for code in reversed(stack):
+        filename = code.co_filename.replace(os.sep, "/")
+        if filename.endswith(_SERIALIZER_MODULES):
+            return "serializer"
+        if any(module in filename for module in _SQL_MODULES):
+            return "sql"
+    for code in stack:
+        if code.co_name == _VIEW_FUNCTION and code.co_filename.replace(
+            os.sep, "/"
+        ).endswith(_VIEW_MODULE):
+            return "view"
+    return "middleware"
+
+
+def summarize(stacks, duration):
+    """
+    Return the milliseconds spent in each category, shared out from
+    `duration` in proportion to the samples.
+    """
+    counts: CounterType[str] = Counter()
+    for stack, count in stacks.items():
+        counts[categorize(stack)] += count
+    total = sum(counts.values())
+    scale = duration * 1000 / total if total else 0.0
+    return {
+        category: round(counts[category] * scale, 1)
+        for category in CATEGORIES
+    }
+
+
+def collapse(stacks, root):
+    """
+    Yield the collapsed stack lines of the samples, under a `root` frame.
+    """
+    for stack, count in sorted(
+        stacks.items(), key=lambda item: item[1], reverse=True
+    ):
+        frames = ";".join([root] + [_label(code) for code in stack])
+        yield f"{frames} {count}\n"
+
+
+def write_profile(name, stacks, summary):
+    """
+    Write the collapsed stacks and the summary of a request in
+    `PROFILING_DIR` and return the path of the stacks.
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    base = os.path.join(
+        settings.PROFILING_DIR,
+        "{}-{}-{}-{}".format(
+            datetime.now().strftime("%Y%m%dT%H%M%S.%f"),
+            name.replace(":", "-").replace("/", "-"),
+            os.getpid(),
+            threading.get_ident(),
+        ),
+    )
+    with open(f"{base}.collapsed", "w") as collapsed:
+        collapsed.writelines(collapse(stacks, name))
+    with open(f"{base}.json", "w") as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    prune_profiles(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+    return f"{base}.collapsed"
+
+
+def prune_profiles(directory, keep):
+    """
+    Delete all but the latest `keep` profiles of `directory`.
+    """
+    # The names start with the time of the request.
+    bases = sorted(
+        os.path.splitext(name)[0]
+        for name in os.listdir(directory)
+        if name.endswith(".collapsed")
+    )
+    stale = max(len(bases) - keep, 0)
+    for base in bases[:stale]:
+        for extension in (".collapsed", ".json"):
+            try:
+                os.remove(os.path.join(directory, base + extension))
+            except FileNotFoundError:
+                # Pruned by another worker.
+                pass
+
+
+@lru_cache(maxsize=None)
+def _label(code):
+    filename = code.co_filename.replace(os.sep, "/")
+    if "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    else:
+        root = str(settings.ROOT_DIR).replace(os.sep, "/").rstrip("/") + "/"
+        if filename.startswith(root):
+            start = len(root)
+            filename = filename[start:]
+    # Semicolons separate the frames of collapsed stacks.
+    return "{} ({}:{})".format(
+        code.co_name, filename, code.co_firstlineno
+    ).replace(";", ":")
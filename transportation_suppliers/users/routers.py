@@ -0,0 +1,68 @@
+import random
+import threading
+
+from django.conf import settings
+
+
+_state = threading.local()
+
+
+def use_replicas():
+    """
+    Send the remaining reads of the current request to a replica, unless
+    it is pinned to the primary.
+    """
+    _state.use_replicas = True
+
+
+def pin_primary():
+    """
+    Keep every read of the current request on the primary.
+    """
+    _state.pinned = True
+
+
+def has_written():
+    return getattr(_state, "written", False)
+
+
+def reset():
+    _state.__dict__.clear()
+
+
+class ReplicaRouter:
+    """
+    Route the reads of views using replicas to `DATABASE_REPLICAS`.
+
+    Reads only leave the primary once a view opts in with `use_replicas()`
+    (see `ReplicaReadsMixin`), so authentication, sessions and commands
+    always read from the primary. Any write pins the rest of the request
+    to the primary, and `ReplicaPinningMiddleware` keeps the client's
+    next requests there for `DATABASE_REPLICA_STICKY_SECONDS`, long
+    enough for the replicas to catch up.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and getattr(_state, "use_replicas", False)
+            and not getattr(_state, "pinned", False)
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _state.written = True
+        _state.pinned = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,243 @@
+from typing import Any, Dict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from transportation_suppliers.users.api.authentication import (
+    invalidate_tokens,
+    invalidate_user_api_tokens,
+    verified_api_tokens,
+)
+from transportation_suppliers.users.api.caching import invalidate_profiles
+from transportation_suppliers.users.api.pagination import count_cache_key
+from transportation_suppliers.users.avatars import (
+    schedule_delete_renditions,
+    schedule_render_avatar,
+)
+from transportation_suppliers.users.models import Address, ApiToken, User
+
+# Sent with the saved `addresses` after `bulk_create`/`bulk_update`, which
+# do not send `post_save`.
+addresses_bulk_saved = Signal(providing_args=["addresses", "created"])
+# Sent with the deleted `addresses` and the `(pk, username)` of the users
+# that had them after they are deleted in bulk, without the model signals.
+addresses_bulk_deleted = Signal(providing_args=["addresses", "users"])
+# `User` fields the cached profile responses render, see `ProfileSerializer`.
+PROFILE_FIELDS = frozenset(
+    [
+        "id",
+        "username",
+        "first_name",
+        "last_name",
+        "name",
+        "avatar",
+        "avatar_renditions",
+        "bio",
+        "salutation",
+        "gender",
+        "date_joined",
+    ]
+)
+
+
+def _adjust_cached_count(model, delta):
+    # Rolled back writes must leave the shared count alone.
+    def adjust():
+        try:
+            cache.incr(count_cache_key(model), delta)
+        except ValueError:
+            # Nothing cached yet, the next list request will count afresh.
+            pass
+
+    transaction.on_commit(adjust)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Address)
+def increment_cached_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _adjust_cached_count(sender, 1)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Address)
+def decrement_cached_count(sender, instance, **kwargs):
+    _adjust_cached_count(sender, -1)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_values(sender, instance, update_fields=None, **kwargs):
+    instance._previous_username = None
+    instance._avatar_changed = False
+    instance._stale_renditions = ""
+    fields = [
+        field
+        for field in ("username", "avatar")
+        if update_fields is None or field in update_fields
+    ]
+    if not fields:
+        return
+    if "avatar" in fields:
+        fields.append("avatar_renditions")
+    if instance.pk is None:
+        previous: Dict[str, Any] = {}
+    else:
+        previous = (
+            User.objects.filter(pk=instance.pk).values(*fields).first() or {}
+        )
+    instance._previous_username = previous.get("username")
+    if "avatar" in fields and (instance.avatar.name or "") != (
+        previous.get("avatar") or ""
+    ):
+        # The renditions of the previous avatar no longer apply.
+        instance._avatar_changed = True
+        instance._stale_renditions = previous.get("avatar_renditions") or ""
+        instance.avatar_renditions = ""
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profile(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and PROFILE_FIELDS.isdisjoint(update_fields):
+        # Such as the `last_login` save of every login.
+        return
+    usernames = {instance.username}
+    previous_username = getattr(instance, "_previous_username", None)
+    if previous_username:
+        usernames.add(previous_username)
+    invalidate_profiles(usernames)
+
+
+@receiver(post_save, sender=Address)
+@receiver(pre_delete, sender=Address)
+def invalidate_address_profiles(
+    sender, instance, created=False, raw=False, **kwargs
+):
+    if raw:
+        return
+    if created:
+        # A new address belongs to no user yet, only the list can change.
+        invalidate_profiles()
+    else:
+        invalidate_profiles(
+            instance.address_users.values_list("username", flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=User.addresses.through)
+def invalidate_user_addresses_profiles(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_profiles([instance.username])
+    elif pk_set is None:
+        invalidate_profiles(
+            instance.address_users.values_list("username", flat=True)
+        )
+    else:
+        invalidate_profiles(
+            User.objects.filter(pk__in=pk_set).values_list(
+                "username", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Address)
+@receiver(pre_delete, sender=Address)
+def touch_address_users(sender, instance, created=False, raw=False, **kwargs):
+    # `updated_at` of a user dates its whole profile, addresses included.
+    if not (created or raw):
+        User.objects.filter(addresses=instance).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(m2m_changed, sender=User.addresses.through)
+def touch_users_of_changed_addresses(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        users = User.objects.filter(pk=instance.pk)
+    elif pk_set is None:
+        users = User.objects.filter(addresses=instance)
+    else:
+        users = User.objects.filter(pk__in=pk_set)
+    users.update(updated_at=timezone.now())
+
+
+@receiver(addresses_bulk_saved, sender=Address)
+def handle_addresses_bulk_saved(sender, addresses, created, **kwargs):
+    if created:
+        _adjust_cached_count(sender, len(addresses))
+        invalidate_profiles()
+        return
+
+    users = User.objects.filter(
+        addresses__in=[address.pk for address in addresses]
+    )
+    invalidate_profiles(set(users.values_list("username", flat=True)))
+    User.objects.filter(pk__in=users.values("pk")).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(addresses_bulk_deleted, sender=Address)
+def handle_addresses_bulk_deleted(sender, addresses, users, **kwargs):
+    _adjust_cached_count(sender, -len(addresses))
+    invalidate_profiles([username for pk, username in users])
+    if users:
+        User.objects.filter(pk__in=[pk for pk, username in users]).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, raw=False, **kwargs):
+    # Cached tokens carry the user, including `is_active`.
+    if not (created or raw):
+        invalidate_tokens(
+            Token.objects.filter(user=instance).values_list("key", flat=True)
+        )
+        invalidate_user_api_tokens(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def render_changed_avatar(sender, instance, raw=False, **kwargs):
+    if not instance._avatar_changed or raw:
+        return
+    if instance.avatar:
+        schedule_render_avatar(
+            instance.pk, instance.avatar.name, instance._stale_renditions
+        )
+    elif instance._stale_renditions:
+        schedule_delete_renditions(instance._stale_renditions)
+
+
+@receiver(post_delete, sender=User)
+def delete_avatar_renditions(sender, instance, **kwargs):
+    if instance.avatar_renditions:
+        schedule_delete_renditions(instance.avatar_renditions)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_delete, sender=ApiToken)
+def invalidate_deleted_api_token(sender, instance, **kwargs):
+    verified_api_tokens.delete(instance.digest)
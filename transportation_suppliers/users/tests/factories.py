@@ -3,6 +3,8 @@ from typing import Any, Sequence
 from django.contrib.auth import get_user_model
 from factory import DjangoModelFactory, Faker, post_generation
 
+from transportation_suppliers.users.models import COUNTRIES_LIST, Address
+
 
 class UserFactory(DjangoModelFactory):
 
@@ -25,3 +27,16 @@ class UserFactory(DjangoModelFactory):
     class Meta:
         model = get_user_model()
         django_get_or_create = ["username"]
+
+
+class AddressFactory(DjangoModelFactory):
+
+    address1 = Faker("street_address")
+    city = Faker("city")
+    postcode = Faker("postcode")
+    country = Faker(
+        "random_element", elements=[code for code, name in COUNTRIES_LIST]
+    )
+
+    class Meta:
+        model = Address
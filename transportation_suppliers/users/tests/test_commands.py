@@ -0,0 +1,426 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO, StringIO
+from multiprocessing.pool import ThreadPool
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from transportation_suppliers.db import slow_queries
+from transportation_suppliers.users.api.pagination import count_cache_key
+from transportation_suppliers.users.management.commands import benchmark_api
+from transportation_suppliers.users.management.commands.check_api_indexes import (
+    is_covered,
+)
+from transportation_suppliers.users.management.commands.import_directory import (
+    _map_bounded,
+)
+from transportation_suppliers.users.models import Address, ApiToken, User
+
+
+pytestmark = pytest.mark.django_db
+
+
+def test_check_api_indexes():
+    """
+    Test every ordering, lookup and prefetch of the API is indexed.
+    """
+
+    out = StringIO()
+    call_command("check_api_indexes", "--check", stdout=out)
+    assert "MISSING" not in out.getvalue()
+    assert "users_user(date_joined DESC, id ASC)" in out.getvalue()
+
+
+def test_is_covered():
+    """
+    Test is_covered function.
+    """
+
+    constraints = {
+        "joined_id": {
+            "columns": ["date_joined", "id"],
+            "orders": ["DESC", "ASC"],
+            "index": True,
+            "unique": False,
+            "primary_key": False,
+        }
+    }
+    assert is_covered(constraints, ["date_joined"], ["DESC"])
+    assert is_covered(constraints, ["date_joined", "id"], ["ASC", "DESC"])
+    assert not is_covered(constraints, ["date_joined", "id"], ["DESC", "DESC"])
+    assert not is_covered(constraints, ["id"], ["ASC"])
+
+
+def test_export_directory(user: settings.AUTH_USER_MODEL):
+    """
+    Test export_directory command.
+    """
+
+    out = StringIO()
+    call_command("export_directory", "profiles", "--format=csv", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("id,username,")
+    assert len(lines) == 2
+    assert user.username in lines[1]
+
+
+def test_import_directory(tmpdir):
+    """
+    Test import_directory command with addresses, users and a checkpoint.
+    """
+
+    addresses = tmpdir.join("addresses.ndjson")
+    addresses.write(
+        "\n".join(
+            json.dumps(
+                {
+                    "id": number,
+                    "address1": f"Depot {number}",
+                    "city": "Nairobi",
+                    "postcode": "00100",
+                    "country": "KE",
+                }
+            )
+            for number in (10, 11, 12)
+        )
+    )
+    users = tmpdir.join("users.csv")
+    users.write(
+        "username,email,gender,addresses\n"
+        "haulier,haulier@example.com,male,10;11\n"
+        "courier,courier@example.com,other,\n"
+        "courier,duplicate@example.com,other,\n"
+        "broker,broker@example.com,female,99\n"
+    )
+
+    out = StringIO()
+    err = StringIO()
+    call_command(
+        "import_directory",
+        "addresses",
+        str(addresses),
+        "--batch-size=2",
+        stdout=out,
+    )
+    assert Address.objects.count() == 3
+    assert "Imported 3 addresses" in out.getvalue()
+
+    call_command(
+        "import_directory", "users", str(users), stdout=out, stderr=err
+    )
+    haulier = User.objects.get(username="haulier")
+    assert sorted(haulier.addresses.values_list("id", flat=True)) == [10, 11]
+    assert not haulier.has_usable_password()
+    assert User.objects.filter(username="courier").count() == 0
+    assert "Row 2:" in err.getvalue()
+    assert "Row 3:" in err.getvalue()
+    assert "Row 4:" in err.getvalue()
+
+    # Every batch is recorded in the checkpoint, a rerun imports nothing.
+    out = StringIO()
+    call_command(
+        "import_directory",
+        "addresses",
+        str(addresses),
+        "--batch-size=2",
+        stdout=out,
+    )
+    assert "Resuming, skipping 2 batch(es)." in out.getvalue()
+    assert Address.objects.count() == 3
+
+
+def test_import_directory_across_batches(tmpdir):
+    """
+    Test rows repeating an earlier batch's keys, and rows without an id of
+    a batch an interrupted run started, are reported instead of imported.
+    """
+
+    users = tmpdir.join("users.csv")
+    users.write(
+        "id,username,email\n"
+        "1,haulier,haulier@example.com\n"
+        "2,courier,courier@example.com\n"
+        "3,haulier,other@example.com\n"
+        "2,broker,broker@example.com\n"
+    )
+    err = StringIO()
+    call_command(
+        "import_directory",
+        "users",
+        str(users),
+        "--batch-size=2",
+        stdout=StringIO(),
+        stderr=err,
+    )
+    assert sorted(User.objects.values_list("id", "username")) == [
+        (1, "haulier"),
+        (2, "courier"),
+    ]
+    assert "Row 3: {'username': ['haulier is repeated" in err.getvalue()
+    assert "Row 4: {'id': ['2 is repeated" in err.getvalue()
+
+    addresses = tmpdir.join("addresses.ndjson")
+    addresses.write(
+        "\n".join(
+            json.dumps(
+                {
+                    "address1": f"Depot {number}",
+                    "city": "Nairobi",
+                    "postcode": "00100",
+                    "country": "KE",
+                }
+            )
+            for number in range(4)
+        )
+    )
+    checkpoint = tmpdir.join("addresses.ndjson.checkpoint")
+    checkpoint.write(
+        json.dumps(
+            {
+                "kind": "addresses",
+                "batch_size": 2,
+                "done": [],
+                "started": [0],
+            }
+        )
+    )
+    err = StringIO()
+    call_command(
+        "import_directory",
+        "addresses",
+        str(addresses),
+        "--batch-size=2",
+        stdout=StringIO(),
+        stderr=err,
+    )
+    assert sorted(Address.objects.values_list("address1", flat=True)) == [
+        "Depot 2",
+        "Depot 3",
+    ]
+    assert "Row 1: {'id': ['The interrupted import" in err.getvalue()
+    assert "Row 2: {'id': ['The interrupted import" in err.getvalue()
+
+
+def test_map_bounded():
+    """
+    Test batches are read from the file only a few ahead of the results.
+    """
+
+    read = []
+
+    def tasks():
+        for number in range(10):
+            read.append(number)
+            yield number
+
+    with ThreadPool(2) as pool:
+        for number, result in enumerate(
+            _map_bounded(pool, abs, tasks(), in_flight=3)
+        ):
+            assert result == number
+            assert len(read) <= number + 3
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+def test_benchmark_serializers():
+    """
+    Test benchmark_serializers command.
+    """
+
+    out = StringIO()
+    call_command(
+        "benchmark_serializers", "--profiles=10", "--repeat=1", stdout=out
+    )
+    assert "reverse:" in out.getvalue()
+    assert "Speedup:" in out.getvalue()
+
+
+def test_load_benchmark():
+    """
+    Test load_benchmark command.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    out = StringIO()
+    try:
+        call_command(
+            "load_benchmark",
+            f"http://127.0.0.1:{server.server_port}/api/v2/profiles/",
+            "--connections=1",
+            "--duration=0.5",
+            stdout=out,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "0 errors, statuses {200:" in out.getvalue()
+    assert "latency p50" in out.getvalue()
+
+
+def test_clear_expired_api_tokens(user: settings.AUTH_USER_MODEL):
+    """
+    Test clear_expired_api_tokens command.
+    """
+
+    ApiToken.objects.issue(user, timedelta(days=1))
+    ApiToken.objects.issue(user, timedelta(seconds=-1))
+    out = StringIO()
+    call_command("clear_expired_api_tokens", stdout=out)
+    assert "Deleted 1 expired API token(s)." in out.getvalue()
+    assert ApiToken.objects.count() == 1
+
+
+# SQLite returns no ids from bulk inserts, bulk created addresses are saved
+# one by one there.
+@override_settings(
+    ALLOWED_HOSTS=["localhost"], QUERY_N_PLUS_ONE_THRESHOLD=None
+)
+def test_benchmark_api(tmpdir):
+    """
+    Test benchmark_api command.
+    """
+
+    output = str(tmpdir.join("results.json"))
+    out = StringIO()
+    call_command(
+        "benchmark_api",
+        "--users=5",
+        "--requests=2",
+        "--warmup=1",
+        f"--output={output}",
+        stdout=out,
+    )
+    assert "Seeded 5 users and 10 addresses" in out.getvalue()
+    assert User.objects.filter(username__startswith="bench-").count() == 5
+    assert Address.objects.count() == 10
+
+    with open(output) as results_file:
+        results = json.load(results_file)
+    assert results["dataset"]["users"] == 5
+    assert len(results["results"]) == 30
+    assert not any(result["errors"] for result in results["results"])
+    assert {result["name"] for result in results["results"]} >= {
+        "ProfileViewSet.list GET v1",
+        "AddressViewSet.bulk POST v2",
+    }
+
+    # The dataset is reused, and the runs compared.
+    out = StringIO()
+    call_command(
+        "benchmark_api",
+        "--users=5",
+        "--requests=2",
+        "--api-version=v2",
+        f"--compare={output}",
+        stdout=out,
+    )
+    assert "Seeded" not in out.getvalue()
+    assert "UserViewSet.list GET v2: p50 " in out.getvalue()
+    assert Address.objects.count() == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_delete_dataset():
+    """
+    Test the benchmark dataset is deleted with its tokens and cached counts.
+    """
+
+    kept = User.objects.create(username="kept")
+    kept.addresses.create(address1="Depot", city="Nairobi", country="KE")
+    for index in (1, 2):
+        user = User.objects.create(username=f"bench-{index:07d}")
+        user.addresses.create(address1="Yard", city="Nakuru", country="KE")
+        ApiToken.objects.issue(user, timedelta(days=1))
+    for model in (User, Address):
+        cache.set(count_cache_key(model), 3)
+
+    with CaptureQueriesContext(connection) as context:
+        benchmark_api.delete_dataset()
+    # A statement per table, whatever the size of the dataset.
+    assert max(len(query["sql"]) for query in context.captured_queries) < 500
+    assert list(User.objects.values_list("username", flat=True)) == ["kept"]
+    assert list(Address.objects.values_list("address1", flat=True)) == [
+        "Depot"
+    ]
+    assert not ApiToken.objects.exists()
+    assert cache.get(count_cache_key(User)) is None
+    assert cache.get(count_cache_key(Address)) is None
+
+
+def test_slow_queries():
+    slow_queries.clear_slow_queries()
+    for duration in (0.3, 0.5):
+        slow_queries.record_slow_query(
+            "default",
+            "SELECT * FROM users_user WHERE id = %s",
+            [1],
+            duration,
+            "api_users:users-list",
+            "UserSerializer",
+        )
+
+    out = StringIO()
+    call_command("slow_queries", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].endswith(
+        "(default): 2 runs, 800.0 ms total, 400.0 ms average, 500.0 ms max"
+    )
+    assert lines[1] == "  SELECT * FROM users_user WHERE id = %s"
+    assert lines[2] == "  views: api_users:users-list (2)"
+    assert lines[3] == "  serializers: UserSerializer (2)"
+
+    call_command("slow_queries", "--clear", stdout=StringIO())
+    out = StringIO()
+    call_command("slow_queries", stdout=out)
+    assert out.getvalue() == "No slow queries recorded.\n"
+
+
+def test_render_avatars(tmpdir, settings):
+    settings.MEDIA_ROOT = str(tmpdir)
+    settings.AVATAR_RENDITION_SIZES = {"small": 64}
+    content = BytesIO()
+    Image.new("RGB", (300, 300), "navy").save(content, "JPEG")
+    default_storage.save("avatars/bob/1.jpg", ContentFile(content.getvalue()))
+    default_storage.save("avatars/eve/1.jpg", ContentFile(b"not an image"))
+    # Bulk created, so no rendition is scheduled.
+    User.objects.bulk_create(
+        [
+            User(username="bob", avatar="avatars/bob/1.jpg"),
+            User(username="eve", avatar="avatars/eve/1.jpg"),
+            User(username="ann"),
+        ]
+    )
+
+    out, err = StringIO(), StringIO()
+    call_command("render_avatars", stdout=out, stderr=err)
+    assert out.getvalue() == "Made the renditions of 1 avatars.\n"
+    assert err.getvalue().startswith("Cannot render avatars/eve/1.jpg")
+    assert User.objects.get(username="bob").avatar_renditions == (
+        "avatars/bob/renditions/1"
+    )
+    assert default_storage.exists("avatars/bob/renditions/1-small.webp")
+    assert default_storage.exists("avatars/bob/renditions/1-small.jpeg")
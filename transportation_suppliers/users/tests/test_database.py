@@ -0,0 +1,130 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.backends.sqlite3 import base
+
+from transportation_suppliers.db.health import (
+    HealthCheckMixin,
+    get_connection_stats,
+)
+from transportation_suppliers.db.queries import (
+    QueryBudgetExceeded,
+    query_budget,
+    query_shape,
+)
+from transportation_suppliers.users.models import User
+
+
+pytestmark = pytest.mark.django_db
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
+
+
+@pytest.fixture
+def wrapper(tmpdir):
+    wrapper = DatabaseWrapper(
+        {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(tmpdir.join("health.sqlite3")),
+            "ATOMIC_REQUESTS": False,
+            "AUTOCOMMIT": True,
+            "CONN_MAX_AGE": None,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "USER": "",
+            "PASSWORD": "",
+            "HOST": "",
+            "PORT": "",
+        },
+        alias="health",
+    )
+    yield wrapper
+    wrapper.close()
+
+
+def test_health_checks(wrapper, monkeypatch):
+    """
+    Test reused connections are checked once per request and replaced
+    when they are no longer usable.
+    """
+
+    checks = []
+
+    def is_usable():
+        checks.append(True)
+        return len(checks) > 1
+
+    monkeypatch.setattr(wrapper, "is_usable", is_usable)
+
+    # A new connection is not checked.
+    wrapper.ensure_connection()
+    assert checks == []
+    assert get_connection_stats("health")["connects"] == 1
+
+    # A new request checks the connection on its first use, only once.
+    wrapper.close_if_unusable_or_obsolete()
+    wrapper.cursor().close()
+    wrapper.cursor().close()
+    assert len(checks) == 1
+    assert get_connection_stats("health") == {
+        "connects": 2,
+        "connect_ms": pytest.approx(0, abs=100),
+        "health_check_failures": 1,
+    }
+
+    # Transactions check the connection before they begin.
+    wrapper.close_if_unusable_or_obsolete()
+    wrapper.set_autocommit(False)
+    wrapper.set_autocommit(True)
+    assert len(checks) == 2
+    assert get_connection_stats("health")["connects"] == 2
+
+
+def test_health_checks_disabled(wrapper, monkeypatch):
+    """
+    Test connections are not checked without CONN_HEALTH_CHECKS.
+    """
+
+    wrapper.settings_dict["CONN_HEALTH_CHECKS"] = False
+    monkeypatch.setattr(wrapper, "is_usable", lambda: False)
+    wrapper.ensure_connection()
+    wrapper.close_if_unusable_or_obsolete()
+    wrapper.cursor().close()
+    assert get_connection_stats("health")["connects"] == 1
+
+
+def test_database_stats():
+    """
+    Test database_stats command.
+    """
+
+    out = StringIO()
+    call_command("database_stats", stdout=out)
+    assert "default: 0 connects" in out.getvalue()
+    assert "pgbouncer" not in out.getvalue()
+
+
+def test_query_budget(user):
+    """
+    Test query_budget counts queries and finds repeated query shapes.
+    """
+
+    with query_budget(2) as recorder:
+        User.objects.filter(pk__in=[user.pk]).count()
+        User.objects.filter(pk__in=[user.pk, 0]).count()
+    assert len(recorder) == 2
+    assert recorder.repeated(2) == {query_shape(recorder.queries[0]): 2}
+
+    with pytest.raises(QueryBudgetExceeded, match="over the budget of 1"):
+        with query_budget(1, n_plus_one_threshold=None):
+            User.objects.count()
+            User.objects.exists()
+
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1 query, run 3 times"):
+        with query_budget():
+            for _ in range(3):
+                User.objects.get(pk=user.pk)
@@ -0,0 +1,53 @@
+import importlib
+
+from config import gunicorn
+
+MIB = 1024 * 1024
+
+
+def test_default_workers():
+    """
+    Test default_workers function.
+    """
+
+    assert gunicorn.default_workers(2, None, 128 * MIB, 0.75) == 5
+    assert gunicorn.default_workers(2, 4096 * MIB, 128 * MIB, 0.75) == 5
+    assert gunicorn.default_workers(8, 1024 * MIB, 128 * MIB, 0.75) == 6
+    assert gunicorn.default_workers(1, 64 * MIB, 128 * MIB, 0.75) == 1
+
+
+def test_environment_overrides(monkeypatch):
+    """
+    Test every default of the gunicorn config can be overridden from the
+    environment.
+    """
+
+    assert gunicorn.workers >= 1
+    assert gunicorn.threads == 1
+    assert gunicorn.preload_app
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setenv("GUNICORN_THREADS", "4")
+    monkeypatch.setenv("GUNICORN_MAX_REQUESTS", "0")
+    monkeypatch.setenv("GUNICORN_PRELOAD", "no")
+    try:
+        importlib.reload(gunicorn)
+        assert gunicorn.workers == 2
+        assert gunicorn.threads == 4
+        assert gunicorn.max_requests == 0
+        assert not gunicorn.preload_app
+    finally:
+        monkeypatch.undo()
+        importlib.reload(gunicorn)
+
+
+def test_metrics_directory(monkeypatch, tmpdir):
+    """
+    Test the metric files of earlier workers are removed on start.
+    """
+
+    tmpdir.join("counter_1.db").write("")
+    tmpdir.join("keep.txt").write("")
+    monkeypatch.setenv("prometheus_multiproc_dir", str(tmpdir))
+    gunicorn.on_starting(None)
+    assert [path.basename for path in tmpdir.listdir()] == ["keep.txt"]
@@ -0,0 +1,65 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
+
+from transportation_suppliers.users.hashers import (
+    PooledArgon2PasswordHasher,
+    get_argon2_cost,
+)
+
+
+@pytest.fixture
+def argon2_settings(settings):
+    settings.PASSWORD_HASHERS = [
+        "transportation_suppliers.users.hashers.PooledArgon2PasswordHasher",
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+    ]
+    return settings
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_pooled_argon2_hasher(argon2_settings, workers):
+    """
+    Test passwords hashed inline or in the pool verify.
+    """
+
+    argon2_settings.PASSWORD_HASHING_WORKERS = workers
+    encoded = make_password("lorry-driver")
+    assert encoded.startswith("argon2$argon2i$v=19$m=512,t=2,p=2$")
+    assert check_password("lorry-driver", encoded)
+    assert not check_password("lorry-rider", encoded)
+
+
+def test_profile_change_upgrades_hashes(argon2_settings):
+    """
+    Test hashes made with other costs are marked for upgrade.
+    """
+
+    hasher = PooledArgon2PasswordHasher()
+    encoded = hasher.encode("lorry-driver", hasher.salt())
+    assert not hasher.must_update(encoded)
+
+    argon2_settings.ARGON2_PROFILE = "interactive"
+    argon2_settings.ARGON2_MEMORY_COST = 1024
+    assert get_argon2_cost() == (2, 1024, 1)
+    assert hasher.must_update(encoded)
+    assert hasher.verify("lorry-driver", encoded)
+
+
+def test_calibrate_argon2():
+    """
+    Test calibrate_argon2 command.
+    """
+
+    out = StringIO()
+    call_command(
+        "calibrate_argon2",
+        "--target-ms=5",
+        "--max-memory=256",
+        "--parallelism=1",
+        "--samples=1",
+        stdout=out,
+    )
+    assert "DJANGO_ARGON2_MEMORY_COST=256" in out.getvalue()
@@ -0,0 +1,127 @@
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APIClient
+
+from transportation_suppliers.users import routers
+from transportation_suppliers.users.middleware import ReplicaPinningMiddleware
+from transportation_suppliers.users.models import Address, User
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def reset_router():
+    routers.reset()
+    yield
+    routers.reset()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+def test_replica_router():
+    """
+    Test reads only go to replicas when a view asks for them and nothing
+    pinned the request to the primary.
+    """
+
+    router = routers.ReplicaRouter()
+    assert router.db_for_read(User) is None
+
+    routers.use_replicas()
+    assert router.db_for_read(User) in ("replica1", "replica2")
+    assert User.objects.all().db in ("replica1", "replica2")
+
+    assert router.db_for_write(User) == "default"
+    assert router.db_for_read(User) is None
+    assert routers.has_written()
+
+    assert router.allow_migrate("default", "users") is None
+    assert router.allow_migrate("replica1", "users") is False
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+def test_replica_pinning_middleware():
+    """
+    Test writes set the pinning cookie and the cookie pins reads.
+    """
+
+    pinned = []
+
+    def view(request):
+        routers.use_replicas()
+        pinned.append(routers.ReplicaRouter().db_for_read(User) is None)
+        return HttpResponse()
+
+    middleware = ReplicaPinningMiddleware(view)
+    factory = RequestFactory()
+
+    response = middleware(factory.get("/"))
+    assert pinned.pop() is False
+    assert ReplicaPinningMiddleware.cookie_name not in response.cookies
+
+    response = middleware(factory.post("/"))
+    assert pinned.pop() is True
+    cookie = response.cookies[ReplicaPinningMiddleware.cookie_name]
+    assert cookie["max-age"] == settings.DATABASE_REPLICA_STICKY_SECONDS
+
+    request = factory.get("/")
+    request.COOKIES[ReplicaPinningMiddleware.cookie_name] = "1"
+    response = middleware(request)
+    assert pinned.pop() is True
+    assert ReplicaPinningMiddleware.cookie_name not in response.cookies
+
+
+# The test database has no replica, "default" stands in for one.
+@override_settings(DATABASE_REPLICAS=["default"])
+def test_replica_reads(user: settings.AUTH_USER_MODEL):
+    """
+    Test profile and address reads go to replicas, and other reads and the
+    reads of a client that has just written do not.
+    """
+
+    Address.objects.create(address1="Moi Avenue", city="Nairobi")
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with mock.patch.object(
+        routers.random, "choice", wraps=routers.random.choice
+    ) as choice, override_settings(API_RESPONSE_CACHE_TIMEOUT=0):
+        client.get("/api/v2/profiles/")
+        assert choice.called
+        choice.reset_mock()
+        client.get("/api/v1/addresses/")
+        assert choice.called
+
+        choice.reset_mock()
+        client.get("/api/v2/user/")
+        assert not choice.called
+
+        response = client.patch(
+            f"/api/v2/addresses/{Address.objects.get().pk}/",
+            {"city": "Mombasa"},
+        )
+        assert response.status_code == 200
+        client.get("/api/v2/addresses/")
+        assert not choice.called
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+def test_response_cache_misses_read_primary(user: settings.AUTH_USER_MODEL):
+    """
+    Test cached responses are rendered from the primary, so a lagging
+    replica never has its body cached under a version bumped since.
+    """
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with mock.patch.object(routers.random, "choice") as choice:
+        response = client.get(f"/api/v2/profiles/{user.username}/")
+        assert response["X-Cache"] == "MISS"
+        response = client.get(f"/api/v2/profiles/{user.username}/")
+        assert response["X-Cache"] == "HIT"
+    assert not choice.called
@@ -0,0 +1,35 @@
+from contextlib import ExitStack
+from functools import wraps
+
+from django.db import connections, transaction
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def atomic_writes(view):
+    """
+    Run `view` in a transaction only for unsafe methods.
+
+    `ATOMIC_REQUESTS` wraps every request in BEGIN/COMMIT, which only adds
+    two round trips and holds the connection longer when nothing is
+    written. Reads of the decorated view run in autocommit; POST, PUT,
+    PATCH and DELETE stay atomic on every database with
+    `ATOMIC_REQUESTS`, exactly as before.
+    """
+
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with ExitStack() as stack:
+            for conn in connections.all():
+                if conn.settings_dict["ATOMIC_REQUESTS"]:
+                    stack.enter_context(transaction.atomic(using=conn.alias))
+            return view(request, *args, **kwargs)
+
+    for alias in connections:
+        wrapped_view = transaction.non_atomic_requests(using=alias)(
+            wrapped_view
+        )
+    return wrapped_view
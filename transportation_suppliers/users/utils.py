@@ -1,6 +1,13 @@
+import hashlib
 import os
+import secrets
 import time
 
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+API_TOKEN_CHECK_SALT = "transportation_suppliers.users.api_token"
+
 
 def get_extension(filename):
     return os.path.splitext(filename)[1]
@@ -14,3 +21,39 @@ def user_avatar_path(instance, filename):
     new_filename = str(time.time()).replace(".", "_") + get_extension(filename)
 
     return "avatars/{0}/{1}".format(instance.username, new_filename)
+
+
+def _api_token_check(prefix, secret):
+    return salted_hmac(API_TOKEN_CHECK_SALT, f"{prefix}.{secret}").hexdigest()[
+        :16
+    ]
+
+
+def generate_api_token():
+    """
+    Return a new `(prefix, token)`.
+
+    Tokens read `<prefix>.<secret>.<check>`, where the check is an HMAC of
+    the rest keyed with SECRET_KEY, so forged or mistyped tokens can be
+    rejected without a database lookup.
+    """
+    prefix = secrets.token_hex(4)
+    secret = secrets.token_urlsafe(32)
+    return prefix, f"{prefix}.{secret}.{_api_token_check(prefix, secret)}"
+
+
+def parse_api_token(token):
+    """
+    Return the prefix of a well-formed token with a valid check, or `None`.
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    prefix, secret, check = parts
+    if not constant_time_compare(check, _api_token_check(prefix, secret)):
+        return None
+    return prefix
+
+
+def api_token_digest(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
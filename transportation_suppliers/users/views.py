@@ -1,10 +1,16 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse
 from django.urls import reverse
-from django.views.generic import DetailView, RedirectView, UpdateView
+from django.utils.crypto import constant_time_compare
+from django.views.generic import DetailView, RedirectView, UpdateView, View
 from django.contrib import messages
 from django.utils.translation import ugettext_lazy as _
 
+from transportation_suppliers.users import metrics
+from transportation_suppliers.users.transactions import atomic_writes
+
 User = get_user_model()
 
 
@@ -15,7 +21,7 @@ class UserDetailView(LoginRequiredMixin, DetailView):
     slug_url_kwarg = "username"
 
 
-user_detail_view = UserDetailView.as_view()
+user_detail_view = atomic_writes(UserDetailView.as_view())
 
 
 class UserUpdateView(LoginRequiredMixin, UpdateView):
@@ -38,7 +44,7 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
-user_update_view = UserUpdateView.as_view()
+user_update_view = atomic_writes(UserUpdateView.as_view())
 
 
 class UserRedirectView(LoginRequiredMixin, RedirectView):
@@ -51,4 +57,22 @@ class UserRedirectView(LoginRequiredMixin, RedirectView):
         )
 
 
-user_redirect_view = UserRedirectView.as_view()
+user_redirect_view = atomic_writes(UserRedirectView.as_view())
+
+
+class MetricsView(View):
+    """
+    Prometheus metrics in the text exposition format, of every worker.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_BEARER_TOKEN
+        if token and not constant_time_compare(
+            request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+        ):
+            return HttpResponse(status=401)
+        content_type, content = metrics.render_latest()
+        return HttpResponse(content, content_type=content_type)
+
+
+metrics_view = atomic_writes(MetricsView.as_view())